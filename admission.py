@@ -0,0 +1,214 @@
+import os
+import math
+import time
+import heapq
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from metrics import observe, inc, register_gauges
+from executors import STAGE_WORKERS
+
+# Priority classes, lower is served first
+INTERACTIVE = 0  # /search-news, /verify-topic
+STANDARD = 1     # single-item analysis endpoints
+BATCH = 2        # bulk endpoints and background work
+
+request_priority = contextvars.ContextVar("request_priority", default=STANDARD)
+# Monotonic time after which the caller no longer wants the result (None: no deadline)
+request_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+# Per-stage limits. MODEL_CONCURRENCY overrides per model, e.g. "summarizer=2,interpreter=2"
+DEFAULT_STAGE_CONCURRENCY = int(os.getenv("STAGE_CONCURRENCY", "8"))
+STAGE_CONCURRENCY = {
+    name.strip(): int(value) for name, value in
+    (item.split("=", 1) for item in os.getenv("MODEL_CONCURRENCY", "").split(",") if "=" in item)
+}
+STAGE_QUEUE_SIZE = int(os.getenv("STAGE_QUEUE_SIZE", "64"))
+QUEUE_SLO_SECONDS = float(os.getenv("QUEUE_SLO_SECONDS", "10"))
+# In-flight request caps. Every admitted analysis holds a request thread and up to 4
+# stage threads, so the analysis cap stays within the stage pool: queued work the
+# stage limiters can't see never builds up behind it. Interactive endpoints get
+# their own cap, and the request threadpool is sized for both (see app startup).
+ANALYSIS_MAX_INFLIGHT = min(int(os.getenv("ANALYSIS_MAX_INFLIGHT", "16")), max(1, STAGE_WORKERS // 4))
+INTERACTIVE_MAX_INFLIGHT = int(os.getenv("INTERACTIVE_MAX_INFLIGHT", "32"))
+REQUEST_THREADS = ANALYSIS_MAX_INFLIGHT + INTERACTIVE_MAX_INFLIGHT + 16  # + other endpoints and streams
+
+
+def time_left():
+    """
+    Seconds until the current request's deadline, or None when it has none.
+    """
+    deadline = request_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class Overloaded(Exception):
+    """
+    Raised when work is rejected because its queue is full or the expected
+    queue wait would exceed the SLO. Mapped to 503 with Retry-After.
+    """
+
+    def __init__(self, stage: str, retry_after: float):
+        super().__init__(f"Stage '{stage}' is overloaded, retry in {retry_after:.0f}s")
+        self.stage = stage
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class StageLimiter:
+    """
+    Admission control for one stage: at most `concurrency` callers run at once,
+    up to `max_queue` wait in priority order, and a caller is rejected up front
+    when its estimated wait (from an EWMA of service time) exceeds `queue_slo`.
+    """
+
+    def __init__(self, name: str, concurrency: int, max_queue: int = STAGE_QUEUE_SIZE,
+                 queue_slo: float = QUEUE_SLO_SECONDS):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.queue_slo = queue_slo
+        self.active = 0
+        self.rejected = 0
+        self.service_time = 0.5  # seconds, EWMA
+        self._waiting = []  # heap of (priority, sequence)
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiting)
+
+    def _estimated_wait(self, ahead: int) -> float:
+        return (ahead + 1) * self.service_time / self.concurrency
+
+    def acquire(self, priority: int = STANDARD):
+        with self._cond:
+            if self.active < self.concurrency and not self._waiting:
+                self.active += 1
+                return
+
+            ahead = sum(1 for entry in self._waiting if entry[0] <= priority)
+            estimated_wait = self._estimated_wait(ahead)
+            if len(self._waiting) >= self.max_queue or estimated_wait > self.queue_slo:
+                self.rejected += 1
+                inc("stage_rejections_total", stage=self.name)
+                raise Overloaded(self.name, estimated_wait)
+
+            entry = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, entry)
+            deadline = time.monotonic() + self.queue_slo
+            while not (self.active < self.concurrency and self._waiting[0] == entry):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    self.rejected += 1
+                    inc("stage_rejections_total", stage=self.name)
+                    self._cond.notify_all()
+                    raise Overloaded(self.name, self._estimated_wait(len(self._waiting)))
+                self._cond.wait(remaining)
+            heapq.heappop(self._waiting)
+            self.active += 1
+
+    def release(self, service_time: float = None):
+        with self._cond:
+            self.active -= 1
+            if service_time is not None:
+                self.service_time = 0.8 * self.service_time + 0.2 * service_time
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: int = None):
+        queued_at = time.monotonic()
+        self.acquire(request_priority.get() if priority is None else priority)
+        start = time.monotonic()
+        observe("stage_queue_wait_seconds", start - queued_at, stage=self.name)
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+
+class RequestGate:
+    """
+    Non-blocking cap on in-flight requests for a class of endpoints, safe to use
+    from async code: a request either gets in immediately or is rejected.
+    """
+
+    def __init__(self, name: str, max_inflight: int):
+        self.name = name
+        self.max_inflight = max_inflight
+        self.inflight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def try_enter(self) -> bool:
+        with self._lock:
+            if self.inflight >= self.max_inflight:
+                self.rejected += 1
+                return False
+            self.inflight += 1
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.inflight -= 1
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+analysis_gate = RequestGate("analysis", ANALYSIS_MAX_INFLIGHT)
+interactive_gate = RequestGate("interactive", INTERACTIVE_MAX_INFLIGHT)
+
+
+def get_limiter(stage: str) -> StageLimiter:
+    limiter = _limiters.get(stage)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(stage)
+            if limiter is None:
+                limiter = StageLimiter(stage, STAGE_CONCURRENCY.get(stage, DEFAULT_STAGE_CONCURRENCY))
+                _limiters[stage] = limiter
+    return limiter
+
+
+def limit(stage: str):
+    """
+    Context manager holding a slot of `stage` at the current request's priority.
+    """
+    return get_limiter(stage).slot()
+
+
+def queue_stats() -> dict:
+    """
+    Queue depth, active slots and rejections per stage, plus the analysis request gate.
+    """
+    stats = {
+        name: {
+            "queue_depth": limiter.queue_depth,
+            "active": limiter.active,
+            "concurrency": limiter.concurrency,
+            "rejected": limiter.rejected,
+            "service_time_ms": round(limiter.service_time * 1000, 1)
+        } for name, limiter in list(_limiters.items())
+    }
+    for gate in (analysis_gate, interactive_gate):
+        stats[gate.name] = {
+            "inflight": gate.inflight,
+            "max_inflight": gate.max_inflight,
+            "rejected": gate.rejected
+        }
+    return stats
+
+
+def _queue_gauges():
+    gauges = []
+    for name, limiter in list(_limiters.items()):
+        gauges.append(("stage_queue_depth", {"stage": name}, limiter.queue_depth))
+        gauges.append(("stage_active", {"stage": name}, limiter.active))
+    gauges.append(("analysis_requests_inflight", {}, analysis_gate.inflight))
+    gauges.append(("interactive_requests_inflight", {}, interactive_gate.inflight))
+    return gauges
+
+register_gauges(_queue_gauges)
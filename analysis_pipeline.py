@@ -0,0 +1,302 @@
+import os
+import time
+import queue
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from model_utils import (classify_news, summarize_news, interpret_news,
+                         classify_news_batch, summarize_news_batch, interpret_news_batch)
+from fake_news_classifier import classify_fake_news, classify_fake_news_batch
+from news_verification import verify_news_topic, analyze_news_credibility
+from executors import model_executor, stage_executor, submit_in_context
+from request_graph import request_scope
+from result_cache import get_result_cache
+from metrics import cache_result
+
+# "concurrent" runs independent stages at the same time, "sequential" keeps the old behaviour
+ANALYSIS_EXECUTION_MODE = os.getenv("ANALYSIS_EXECUTION_MODE", "concurrent")
+
+# Bulk analysis: items per batched forward pass, and concurrent topic verifications
+BATCH_WINDOW = int(os.getenv("BATCH_WINDOW", "8"))
+BATCH_VERIFY_WORKERS = int(os.getenv("BATCH_VERIFY_WORKERS", "4"))
+
+MODEL_SECTIONS = ("classification", "summary", "interpretation", "fake_news_detection")
+
+
+def topic_from_summary(summary: str) -> str:
+    """
+    Default topic when none is given: the first three words of the summary.
+    """
+    return ' '.join(summary.split()[:3])
+
+
+def _timed(timings: dict, stage: str, func, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        timings[stage] = round((time.perf_counter() - start) * 1000, 1)
+
+
+def _on_done(future, name: str, on_section):
+    # Hand a stage's result to on_section as soon as it is ready
+    if on_section is not None:
+        future.add_done_callback(lambda f: f.exception() is None and on_section(name, f.result()))
+    return future
+
+
+def _run_stages(text: str, topic, derive_topic, mode: str, timings: dict, labels=None, on_section=None,
+                exclude_urls=()):
+    """
+    Run the model stages and topic verification.
+    Returns (model_fields, topic, verification).
+    on_section(name, value), if given, is called as each model stage finishes.
+    Articles at exclude_urls are left out of verification.
+
+    In concurrent mode the model stages run on the stage pool, where concurrent
+    requests meet in the micro-batchers, while
+    verification (World News + Twitter) runs on the calling thread and the I/O pool.
+    Verification only waits for the summary when the topic has to be derived from it.
+    """
+    if mode == "sequential":
+        emit = on_section or (lambda name, value: None)
+        classification = _timed(timings, "classification", classify_news, text, labels)
+        emit("classification", classification)
+        summary = _timed(timings, "summary", summarize_news, text)
+        emit("summary", summary)
+        interpretation = _timed(timings, "interpretation", interpret_news, text)
+        emit("interpretation", interpretation)
+        fake_news_result = _timed(timings, "fake_news_detection", classify_fake_news, text)
+        emit("fake_news_detection", fake_news_result)
+        topic = topic or derive_topic(summary)
+        verification = _timed(timings, "verification", verify_news_topic, topic, exclude_urls=exclude_urls)
+    else:
+        classification_future = _on_done(submit_in_context(stage_executor, _timed, timings, "classification",
+                                                            classify_news, text, labels), "classification", on_section)
+        summary_future = _on_done(submit_in_context(stage_executor, _timed, timings, "summary", summarize_news, text),
+                                  "summary", on_section)
+        interpretation_future = _on_done(submit_in_context(stage_executor, _timed, timings, "interpretation",
+                                                            interpret_news, text), "interpretation", on_section)
+        fake_news_future = _on_done(submit_in_context(stage_executor, _timed, timings, "fake_news_detection",
+                                                       classify_fake_news, text), "fake_news_detection", on_section)
+
+        if not topic:
+            topic = derive_topic(summary_future.result())
+        verification = _timed(timings, "verification", verify_news_topic, topic, exclude_urls=exclude_urls)
+
+        classification = classification_future.result()
+        summary = summary_future.result()
+        interpretation = interpretation_future.result()
+        fake_news_result = fake_news_future.result()
+
+    model_fields = {
+        "classification": classification,
+        "summary": summary,
+        "interpretation": interpretation,
+        "fake_news_detection": fake_news_result
+    }
+    return model_fields, topic, verification
+
+
+def _run_cached(cache, text: str, topic, derive_topic, mode: str, timings: dict, labels=None, on_section=None,
+                exclude_urls=()):
+    """
+    _run_stages through the persistent result cache. A hit reuses the model
+    fields and re-runs verification only when it is stale or for another topic.
+    """
+    key = cache.key(text, labels)
+    cached = cache.get(key)
+    cache_result("analysis_results", cached is not None)
+
+    if cached is None:
+        def compute():
+            model_fields, used_topic, verification = _run_stages(text, topic, derive_topic, mode, timings, labels,
+                                                                 on_section, exclude_urls)
+            cache.put(key, model_fields, used_topic,
+                      verification if verification.get("status") == "success" else None)
+            return model_fields, used_topic, verification
+        # Concurrent submissions of the same text share one computation
+        return cache.single_flight(f"{key}:{topic}", compute)
+
+    model_fields, cached_topic, verification = cached
+    if on_section is not None:
+        for name in MODEL_SECTIONS:
+            on_section(name, model_fields[name])
+    used_topic = topic or derive_topic(model_fields["summary"])
+    if verification is None or cached_topic != used_topic:
+        verification = _timed(timings, "verification", verify_news_topic, used_topic, exclude_urls=exclude_urls)
+        if verification.get("status") == "success":
+            cache.put_verification(key, used_topic, verification)
+    return model_fields, used_topic, verification
+
+
+def _once(on_section):
+    """
+    Wrap on_section so each section is delivered exactly once, whichever path produced it.
+    """
+    if on_section is None:
+        return None
+    sent = set()
+    lock = threading.Lock()
+
+    def emit(name, value):
+        with lock:
+            if name in sent:
+                return
+            sent.add(name)
+        on_section(name, value)
+    return emit
+
+
+def run_analysis(text: str, topic=None, derive_topic=topic_from_summary, mode: str = None, labels=None,
+                 on_section=None, exclude_urls=()):
+    """
+    Run classification, summary, interpretation and credibility analysis on a text.
+    `labels` replaces the default classification labels; `exclude_urls` (the
+    text's own URL, when it came from one) never corroborate it.
+    Returns (raw_output, timings) where timings holds per-stage milliseconds.
+    Results are served from the persistent result cache when it is enabled.
+
+    on_section(name, value) is called once per section as soon as it is known:
+    the model stages in completion order, then "credibility_analysis".
+    """
+    mode = mode or ANALYSIS_EXECUTION_MODE
+    timings = {}
+    start = time.perf_counter()
+    on_section = _once(on_section)
+
+    cache = get_result_cache()
+    if cache is None:
+        model_fields, topic, verification = _run_stages(text, topic, derive_topic, mode, timings, labels, on_section,
+                                                        exclude_urls)
+    else:
+        model_fields, topic, verification = _run_cached(cache, text, topic, derive_topic, mode, timings, labels,
+                                                        on_section, exclude_urls)
+    if on_section is not None:
+        # A result shared with a concurrent identical request never ran our callbacks
+        for name in MODEL_SECTIONS:
+            on_section(name, model_fields[name])
+    credibility = analyze_news_credibility(text, topic, verification=verification,
+                                           fake_news_result=model_fields["fake_news_detection"])
+    if on_section is not None:
+        on_section("credibility_analysis", credibility)
+
+    timings["total"] = round((time.perf_counter() - start) * 1000, 1)
+
+    raw_output = {
+        "classification": model_fields["classification"],
+        "summary": model_fields["summary"],
+        "interpretation": model_fields["interpretation"],
+        "credibility_analysis": credibility
+    }
+    return raw_output, timings
+
+
+def stream_analysis(text: str, topic=None, derive_topic=topic_from_summary, labels=None, exclude_urls=()):
+    """
+    Start run_analysis in the background and return an iterator of (section, value)
+    pairs in the order they are computed, ending with ("result", (raw_output, timings))
+    or ("error", message). The analysis starts right away, in the caller's context.
+    """
+    sections = queue.Queue()
+    context = contextvars.copy_context()
+
+    def produce():
+        try:
+            with request_scope():
+                result = run_analysis(text, topic, derive_topic, labels=labels,
+                                      on_section=lambda name, value: sections.put((name, value)),
+                                      exclude_urls=exclude_urls)
+            sections.put(("result", result))
+        except Exception as e:
+            sections.put(("error", str(e)))
+
+    # A thread of its own: run_analysis blocks on the model and I/O pools, so it can't run on them
+    threading.Thread(target=context.run, args=(produce,), name="analysis-stream", daemon=True).start()
+
+    def drain():
+        while True:
+            name, value = sections.get()
+            yield name, value
+            if name in ("result", "error"):
+                return
+    return drain()
+
+
+def _run_model_stages_batch(texts, label_sets=None):
+    """
+    Run the four model stages over a window of texts, one batched call per model.
+    """
+    futures = [
+        submit_in_context(model_executor, classify_news_batch, texts, label_sets),
+        submit_in_context(model_executor, summarize_news_batch, texts),
+        submit_in_context(model_executor, interpret_news_batch, texts),
+        submit_in_context(model_executor, classify_fake_news_batch, texts),
+    ]
+    return [future.result() for future in futures]
+
+
+def run_batch_analysis(items, derive_topic=topic_from_summary, window: int = None, exclude_urls=()):
+    """
+    Analyze many (text, topic) or (text, topic, labels) items, yielding (index, result)
+    in completion order. Articles at exclude_urls (the batch's own URLs) are left
+    out of verification.
+
+    Items are processed in windows: each window gets one batched call per model,
+    and topic verification is deduplicated across the whole batch so each distinct
+    topic is verified once. Verification of one window overlaps model inference
+    of the next, and at most two windows of results are held before being yielded.
+    """
+    window = window or BATCH_WINDOW
+    done = queue.Queue()
+    verifications = {}  # topic -> Future, shared by every item with that topic
+    outstanding = 0
+
+    def finish(index, text, topic, model_outputs, verification_future):
+        try:
+            classification, summary, interpretation, fake_news_result = model_outputs
+            credibility = analyze_news_credibility(text, topic, verification=verification_future.result(),
+                                                   fake_news_result=fake_news_result)
+            done.put((index, {
+                "classification": classification,
+                "summary": summary,
+                "interpretation": interpretation,
+                "credibility_analysis": credibility
+            }))
+        except Exception as e:
+            done.put((index, {"error": str(e)}))
+
+    with ThreadPoolExecutor(max_workers=BATCH_VERIFY_WORKERS, thread_name_prefix="batch-verify") as verifier:
+        for start in range(0, len(items), window):
+            chunk = items[start:start + window]
+            texts = [item[0] for item in chunk]
+            label_sets = [item[2] if len(item) > 2 else None for item in chunk]
+            try:
+                outputs = list(zip(*_run_model_stages_batch(texts, label_sets)))
+            except Exception as e:
+                for offset in range(len(chunk)):
+                    done.put((start + offset, {"error": str(e)}))
+                outstanding += len(chunk)
+                outputs = []
+
+            for offset, model_outputs in enumerate(outputs):
+                text, topic = chunk[offset][:2]
+                topic = topic or derive_topic(model_outputs[1])
+                verification_future = verifications.get(topic)
+                if verification_future is None:
+                    verification_future = submit_in_context(verifier, verify_news_topic, topic,
+                                                            exclude_urls=exclude_urls)
+                    verifications[topic] = verification_future
+                verification_future.add_done_callback(
+                    lambda f, i=start + offset, t=text, tp=topic, m=model_outputs: finish(i, t, tp, m, f)
+                )
+                outstanding += 1
+
+            # Hand back whatever is finished; block if too many results are pending
+            while outstanding and (outstanding > 2 * window or not done.empty()):
+                yield done.get()
+                outstanding -= 1
+
+        while outstanding:
+            yield done.get()
+            outstanding -= 1
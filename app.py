@@ -1,27 +1,165 @@
-from fastapi import FastAPI, HTTPException
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from pydantic import BaseModel, HttpUrl
-from model_utils import classify_news, summarize_news, interpret_news
-from url_utils import extract_text_from_url
-from news_verification import  verify_news_topic, analyze_news_credibility, search_news
-from typing import Optional
-from fastapi import  UploadFile
-from PIL import Image
-from io import BytesIO
-import pytesseract
+from model_utils import interpret_news
+from url_utils import extract_text_from_url, extract_article_from_url
+from url_fetcher import fetch_articles
+from ocr_utils import ocr_image
+from admission import (Overloaded, analysis_gate, interactive_gate, REQUEST_THREADS, request_priority, request_deadline, queue_stats,
+                       INTERACTIVE, STANDARD, BATCH)
+import metrics
+from request_graph import request_scope
+from news_verification import  verify_news_topic, search_news, index_articles
+from executors import io_executor
+from analysis_pipeline import run_analysis, run_batch_analysis, stream_analysis
+from model_registry import ModelDisabledError, warmup, is_ready, model_status
+from headline_prefetcher import HEADLINE_PREFETCH, start_headline_prefetcher, stop_headline_prefetcher
+from typing import Optional, List
+from fastapi import  UploadFile, Request
+from starlette.concurrency import run_in_threadpool
 import logging
+import asyncio
+import anyio
+import time
+import json
+import os
+import threading
 
 app = FastAPI(title="News Analyzer & Verifier")
 
+# Models are loaded lazily; set WARMUP_ON_STARTUP=1 to load them in the background at boot
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "0") == "1"
+
+# Upstream calls are not sent after this many seconds (bulk endpoints: only when the
+# client sets X-Request-Timeout); clients can shorten it with X-Request-Timeout
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "60"))
+
+# Priority class per endpoint; everything except the interactive lane counts against the analysis gate
+INTERACTIVE_PATHS = {"/search-news", "/verify-topic"}
+BATCH_PATHS = {"/analyze-batch", "/analyze-urls", "/analyze-images"}
+STREAM_PATHS = {"/analyze/stream", "/analyze-url/stream"}
+ANALYSIS_PATHS = ({"/analyze", "/analyze-url", "/analyze-image", "/interpret", "/interpret-from-url"}
+                  | BATCH_PATHS | STREAM_PATHS)
+
+
+@app.middleware("http")
+async def admission_control(request, call_next):
+    """
+    Tag each request with its priority class and deadline, and reject analysis
+    and interactive requests immediately with 503 once too many of their class
+    are in flight. The two classes have separate caps, so a flood of analyses
+    never starves searches and topic verifications.
+    """
+    path = request.url.path
+    if path in INTERACTIVE_PATHS:
+        request_priority.set(INTERACTIVE)
+    elif path in BATCH_PATHS:
+        request_priority.set(BATCH)
+    else:
+        request_priority.set(STANDARD)
+
+    timeout = None if path in BATCH_PATHS else REQUEST_TIMEOUT
+    try:
+        if request.headers.get("X-Request-Timeout"):
+            timeout = min(float(request.headers["X-Request-Timeout"]), timeout or float("inf"))
+    except ValueError:
+        pass
+    request_deadline.set(None if timeout is None else time.monotonic() + timeout)
+
+    if path in ANALYSIS_PATHS:
+        gate = analysis_gate
+    elif path in INTERACTIVE_PATHS:
+        gate = interactive_gate
+    else:
+        return await call_next(request)
+
+    if not gate.try_enter():
+        return JSONResponse(status_code=503, headers={"Retry-After": "1"},
+                            content={"detail": f"Too many {gate.name} requests in flight, retry shortly"})
+    try:
+        response = await call_next(request)
+    except Exception:
+        gate.leave()
+        raise
+
+    # Hold the slot until a streamed body has been fully sent
+    body_iterator = response.body_iterator
+
+    async def release_when_done():
+        try:
+            async for chunk in body_iterator:
+                yield chunk
+        finally:
+            gate.leave()
+
+    response.body_iterator = release_when_done()
+    return response
+
+
+@app.middleware("http")
+async def request_metrics(request, call_next):
+    """
+    Record request latency per route. Clients sending "X-Timing-Breakdown: 1" get
+    a Server-Timing header with the time spent in each model and upstream call.
+    """
+    breakdown = {} if request.headers.get("X-Timing-Breakdown") == "1" else None
+    token = metrics.request_timings.set(breakdown)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        metrics.request_timings.reset(token)
+    if breakdown is not None:
+        response.headers["Server-Timing"] = metrics.server_timing_header(breakdown)
+
+    # Label by route template, not the raw path, to keep the label set bounded
+    route = request.scope.get("route")
+    path = getattr(route, "path", "unmatched")
+
+    # Latency runs until the last byte of the body, so streamed responses count in full
+    body_iterator = response.body_iterator
+
+    async def observe_when_done():
+        try:
+            async for chunk in body_iterator:
+                yield chunk
+        finally:
+            metrics.observe("request_seconds", time.perf_counter() - start, path=path)
+
+    response.body_iterator = observe_when_done()
+    return response
+
+
+@app.middleware("http")
+async def request_graph_scope(request, call_next):
+    """
+    Give each request its own computation graph so searches, tweet fetches and
+    verifications shared by several stages run once per request.
+    """
+    with request_scope():
+        return await call_next(request)
+
+
+@app.exception_handler(Overloaded)
+def overloaded_handler(request, exc: Overloaded):
+    return JSONResponse(status_code=503, headers={"Retry-After": str(exc.retry_after)},
+                        content={"detail": str(exc)})
+
 class NewsRequest(BaseModel):
     text: str
     topic: Optional[str] = None
+    labels: Optional[List[str]] = None  # classification labels, default NEWS_LABELS
 
 class NewsURLRequest(BaseModel):
     url: HttpUrl
     topic: Optional[str] = None
 
 
+class NewsURLBatchRequest(BaseModel):
+    urls: List[HttpUrl]
+    topic: Optional[str] = None
+
+
 class NewsSearchRequest(BaseModel):
     query: str
     days_back: Optional[int] = 7
@@ -85,33 +223,83 @@ def analyze_news(req: NewsRequest):
     """
     Analyze news text and provide classification, summary, and real-time verification
     """
-    # Basic analysis
-    classification = classify_news(req.text)
-    summary = summarize_news(req.text)
-    interpretation = interpret_news(req.text)
-    
-    # Get topic if not provided
-    topic = req.topic if req.topic else ' '.join(summary.split()[:3])
-    
-    # Get credibility analysis
-    credibility = analyze_news_credibility(req.text, topic)
-    
-    
-    # Prepare raw output
-    raw_output = {
-        "classification": classification,
-        "summary": summary,
-        "interpretation": interpretation,
-        "credibility_analysis": credibility
-    }
+    return _analyze(req.text, req.topic, labels=req.labels)
+
+
+def _analyze(text: str, topic=None, labels=None, exclude_urls=()):
+    # Independent stages run concurrently; the topic falls back to the summary if not provided
+    raw_output, timings = run_analysis(text, topic, labels=labels, exclude_urls=exclude_urls)
     formatted_output = format_news_analysis(raw_output)
 
     return {
         "raw": raw_output,
-        "formatted": formatted_output
+        "formatted": formatted_output,
+        "timings": timings
     }
 
 
+def _section_stream(sections, as_sse: bool, extra=None):
+    """
+    Encode (section, value) pairs from stream_analysis as SSE events or NDJSON
+    lines; the formatted block and timings come last.
+    """
+    def encode(event, data):
+        if as_sse:
+            return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        return json.dumps({"section": event, "data": data}) + "\n"
+
+    if extra:
+        for event, data in extra.items():
+            yield encode(event, data)
+    for name, value in sections:
+        if name == "result":
+            raw_output, timings = value
+            yield encode("formatted", format_news_analysis(raw_output))
+            yield encode("timings", timings)
+        elif name == "error":
+            yield encode("error", {"detail": value})
+        else:
+            yield encode(name, value)
+
+
+def _stream_response(request: Request, sections, extra=None):
+    # SSE by default; clients asking for NDJSON get one JSON object per line
+    as_sse = "application/x-ndjson" not in request.headers.get("accept", "")
+    return StreamingResponse(_section_stream(sections, as_sse, extra),
+                             media_type="text/event-stream" if as_sse else "application/x-ndjson",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.post("/analyze/stream")
+def analyze_news_stream(req: NewsRequest, request: Request):
+    """
+    Streaming /analyze: classification, summary, interpretation, fake news detection
+    and credibility are sent as server-sent events as soon as each is computed,
+    followed by the formatted block and timings.
+    """
+    return _stream_response(request, stream_analysis(req.text, req.topic, labels=req.labels))
+
+
+@app.post("/analyze-batch")
+def analyze_batch(items: List[NewsRequest]):
+    """
+    Analyze many news items at once. Results stream back as NDJSON, one line per
+    item in completion order, each tagged with the item's index in the request.
+    """
+    def stream():
+        for index, raw_output in run_batch_analysis([(item.text, item.topic, item.labels) for item in items]):
+            if "error" in raw_output:
+                yield json.dumps({"index": index, "error": raw_output["error"]}) + "\n"
+            else:
+                yield json.dumps({
+                    "index": index,
+                    "raw": raw_output,
+                    "formatted": format_news_analysis(raw_output)
+                }) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 logger = logging.getLogger("news_analyzer")
 logging.basicConfig(level=logging.INFO)
 
@@ -122,32 +310,23 @@ async def analyze_image(file: UploadFile):
         if file.content_type not in ["image/png", "image/jpeg"]:
             raise HTTPException(status_code=415, detail="Unsupported file type. Only PNG and JPEG images are supported.")
 
-        # 2️⃣ Read and process image
+        # 2️⃣ Read image
         image_data = await file.read()
-        image = Image.open(BytesIO(image_data))
 
-        # 3️⃣ OCR using pytesseract with language support (optional)
+        # 3️⃣ OCR in the worker process pool (downscaled + binarized, cached by image hash)
         # Make sure you have the language packs installed for 'eng' and 'hin'!
-        extracted_text = pytesseract.image_to_string(image, lang='eng+hin')
+        extracted_text = await ocr_image(image_data, lang='eng+hin')
         logger.info(f"Extracted text length: {len(extracted_text.strip())}")
 
         if not extracted_text.strip():
             raise HTTPException(status_code=400, detail="No text found in the image.")
 
-        # 4️⃣ Analyze text using your existing pipeline
-        classification = classify_news(extracted_text)
-        summary = summarize_news(extracted_text)
-        interpretation = interpret_news(extracted_text)
-        credibility = analyze_news_credibility(extracted_text, topic=summary[:30])  # short summary as topic
+        # 4️⃣ Analyze text using your existing pipeline (short summary as topic)
+        raw_output, timings = await run_in_threadpool(
+            run_analysis, extracted_text, derive_topic=lambda summary: summary[:30]
+        )
 
         # 5️⃣ Package result
-        raw_output = {
-            "classification": classification,
-            "summary": summary,
-            "interpretation": interpretation,
-            "credibility_analysis": credibility
-        }
-
         formatted_output = format_news_analysis(raw_output)
 
         logger.info(f"Image analysis completed successfully.")
@@ -155,14 +334,54 @@ async def analyze_image(file: UploadFile):
         return {
             "extracted_text": extracted_text,
             "raw": raw_output,
-            "formatted": formatted_output
+            "formatted": formatted_output,
+            "timings": timings
         }
 
+    except Overloaded:
+        raise
     except Exception as e:
         logger.error(f"Error in analyze-image endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/analyze-images")
+async def analyze_images(files: List[UploadFile]):
+    """
+    Analyze several screenshots at once. OCR runs concurrently in the worker pool,
+    then the texts are analyzed in batches; results stream back as NDJSON lines
+    tagged with the file's index in the request.
+    """
+    for file in files:
+        if file.content_type not in ["image/png", "image/jpeg"]:
+            raise HTTPException(status_code=415, detail=f"Unsupported file type for {file.filename}. Only PNG and JPEG images are supported.")
+
+    images = [await file.read() for file in files]
+    texts = await asyncio.gather(*(ocr_image(image, lang='eng+hin') for image in images), return_exceptions=True)
+
+    def stream():
+        with_text = []  # (request index, extracted text)
+        for index, text in enumerate(texts):
+            if isinstance(text, Exception):
+                yield json.dumps({"index": index, "error": f"OCR failed: {str(text)}"}) + "\n"
+            elif not text.strip():
+                yield json.dumps({"index": index, "error": "No text found in the image."}) + "\n"
+            else:
+                with_text.append((index, text))
+
+        items = [(text, None) for _, text in with_text]
+        for position, raw_output in run_batch_analysis(items, derive_topic=lambda summary: summary[:30]):
+            index, text = with_text[position]
+            line = {"index": index, "extracted_text": text}
+            if "error" in raw_output:
+                line["error"] = raw_output["error"]
+            else:
+                line.update({"raw": raw_output, "formatted": format_news_analysis(raw_output)})
+            yield json.dumps(line) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 
 @app.post("/analyze-url")
 async def analyze_from_url(req: NewsURLRequest):
@@ -170,16 +389,72 @@ async def analyze_from_url(req: NewsURLRequest):
     Analyze news from URL and provide comprehensive analysis
     """
     try:
-        text = extract_text_from_url(str(req.url))
-        news_request = NewsRequest(text=text, topic=req.topic)
-        return analyze_news(news_request)
+        article = await run_in_threadpool(extract_article_from_url, str(req.url))
+        # The article is indexed below; it must not corroborate itself
+        result = await run_in_threadpool(_analyze, article["text"], req.topic,
+                                         exclude_urls={str(req.url), article.get("url")})
+
+        # Remember the article locally so later verifications can find it offline
+        io_executor.submit(index_articles, [{**article, "description": article["text"]}])
+        return result
+
+    except Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error processing URL: {str(e)}")
 
+
+@app.post("/analyze-url/stream")
+def analyze_from_url_stream(req: NewsURLRequest, request: Request):
+    """
+    Streaming /analyze-url: the article is fetched first, then its analysis is
+    streamed like /analyze/stream.
+    """
+    try:
+        article = extract_article_from_url(str(req.url))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error processing URL: {str(e)}")
 
+    io_executor.submit(index_articles, [{**article, "description": article["text"]}])
+    sections = stream_analysis(article["text"], req.topic, exclude_urls={str(req.url), article.get("url")})
+    return _stream_response(request, sections,
+                            extra={"article": {"url": str(req.url), "title": article.get("title")}})
+
+
+@app.post("/analyze-urls")
+def analyze_from_urls(req: NewsURLBatchRequest):
+    """
+    Analyze N URLs at once. Articles are fetched concurrently (cached, polite per
+    domain), then analyzed in batches; results stream back as NDJSON lines
+    tagged with the URL's index in the request.
+    """
+    def stream():
+        articles = fetch_articles([str(url) for url in req.urls])
+        fetched = []  # (request index, article)
+        for index, article in enumerate(articles):
+            if article.get("status") == "error":
+                yield json.dumps({"index": index, "url": str(req.urls[index]), "error": article["message"]}) + "\n"
+            else:
+                fetched.append((index, article))
+
+        io_executor.submit(index_articles, [{**article, "description": article["text"]} for _, article in fetched])
+
+        items = [(article["text"], req.topic) for _, article in fetched]
+        own_urls = {str(url) for url in req.urls} | {article.get("url") for _, article in fetched}
+        for position, raw_output in run_batch_analysis(items, exclude_urls=own_urls):
+            index = fetched[position][0]
+            line = {"index": index, "url": str(req.urls[index])}
+            if "error" in raw_output:
+                line["error"] = raw_output["error"]
+            else:
+                line.update({"raw": raw_output, "formatted": format_news_analysis(raw_output)})
+            yield json.dumps(line) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 
 @app.post("/verify-topic")
-async def verify_topic(topic: str, days_back: int = 7):
+def verify_topic(topic: str, days_back: int = 7):
     """
     Verify a news topic against current headlines
     """
@@ -198,7 +473,7 @@ def interpret_text(req: NewsRequest):
 
 @app.post("/interpret-from-url")
 def interpret_from_url(req: NewsURLRequest):
-    text = extract_text_from_url(req.url)
+    text = extract_text_from_url(str(req.url))
     result = interpret_news(text)
     return {"analysis": result}
 
@@ -211,3 +486,74 @@ def search_news_endpoint(
 ):
     result = search_news(query, offset=offset, number=number, language=language)
     return result
+
+
+@app.on_event("startup")
+def warmup_on_startup():
+    if WARMUP_ON_STARTUP:
+        threading.Thread(target=warmup, name="model-warmup", daemon=True).start()
+    if HEADLINE_PREFETCH:
+        start_headline_prefetcher()
+
+
+@app.on_event("startup")
+async def size_request_threadpool():
+    # Sync endpoints run on anyio's threadpool (40 threads by default); make room
+    # for every admitted analysis and interactive request at once
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = max(limiter.total_tokens, REQUEST_THREADS)
+
+
+@app.on_event("shutdown")
+def stop_background_tasks():
+    stop_headline_prefetcher()
+
+
+@app.exception_handler(ModelDisabledError)
+def model_disabled_handler(request, exc: ModelDisabledError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
+@app.post("/warmup")
+def warmup_models():
+    """
+    Load every model enabled on this worker so the first request doesn't pay for it
+    """
+    models = warmup()
+    return {"ready": is_ready(), "models": models}
+
+
+@app.get("/ready")
+def readiness():
+    """
+    Readiness flag: 200 once all enabled models are loaded, 503 before that
+    """
+    ready = is_ready()
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "models": model_status()})
+
+
+@app.get("/queue-stats")
+def queue_stats_endpoint():
+    """
+    Queue depth, active slots and rejections per stage
+    """
+    return queue_stats()
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """
+    Prometheus metrics: latency histograms, cache hit ratios and queue depths
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/debug/profile")
+def profile(seconds: float = Query(5.0, gt=0, le=60)):
+    """
+    Sample every thread's stack for a few seconds and return collapsed stacks
+    (flamegraph format). Only available when ENABLE_PROFILER=1.
+    """
+    if not metrics.ENABLE_PROFILER:
+        raise HTTPException(status_code=404, detail="Profiler is disabled")
+    return PlainTextResponse(metrics.sample_stacks(seconds))
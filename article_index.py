@@ -0,0 +1,192 @@
+import os
+import json
+import fcntl
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+# Persistent local index of articles we've already seen. Disabled unless a directory is configured.
+ARTICLE_INDEX_DIR = os.getenv("ARTICLE_INDEX_DIR")
+ARTICLE_INDEX_DIM = int(os.getenv("ARTICLE_INDEX_DIM", "384"))  # all-MiniLM-L6-v2
+METADATA_DESCRIPTION_CHARS = 300
+METADATA_FIELDS = ("title", "description", "source", "url", "publishedAt")
+
+
+class ArticleIndex:
+    """
+    Append-only article store: L2-normalized float32 embeddings in a memory-mapped
+    .npy matrix, plus one compact JSON line of metadata per row in a sidecar file.
+    A row-count file written after the embeddings and before the metadata decides
+    how many rows are valid, so a crash between the writes never exposes a
+    half-written row.
+
+    Several processes (e.g. uvicorn workers) can share one directory: writers
+    take an exclusive fcntl lock on index.lock, and every process picks up rows
+    appended by the others before searching or writing.
+    """
+
+    def __init__(self, directory: str, dim: int = ARTICLE_INDEX_DIM, initial_capacity: int = 1024):
+        os.makedirs(directory, exist_ok=True)
+        self.dim = dim
+        self.embeddings_path = os.path.join(directory, "embeddings.npy")
+        self.metadata_path = os.path.join(directory, "articles.jsonl")
+        self.rows_path = os.path.join(directory, "rows")
+        self.lock_path = os.path.join(directory, "index.lock")
+        self._lock = threading.RLock()
+        self.metadata = []
+        self._keys = set()
+        self._metadata_offset = 0
+        self.embeddings = None
+        self._embeddings_id = None
+
+        with self._lock, self._file_lock():
+            if not os.path.exists(self.embeddings_path):
+                np.lib.format.open_memmap(
+                    self.embeddings_path, mode="w+", dtype=np.float32, shape=(initial_capacity, dim)
+                ).flush()
+            self._sync()
+
+    def __len__(self):
+        return len(self.metadata)
+
+    @staticmethod
+    def _key(meta: dict) -> str:
+        return meta.get("url") or f"{meta.get('title', '')}|{meta.get('source', '')}"
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _stored_rows(self):
+        try:
+            with open(self.rows_path, encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return None  # index written before the row count was stored
+
+    def _sync(self):
+        """
+        Pick up rows other processes appended since the last sync (caller holds self._lock).
+        """
+        # Metadata first: rows are written before their metadata, so the matrix is never behind it
+        if os.path.exists(self.metadata_path) and os.path.getsize(self.metadata_path) > self._metadata_offset:
+            with open(self.metadata_path, "rb") as f:
+                f.seek(self._metadata_offset)
+                chunk = f.read()
+            complete = chunk[:chunk.rfind(b"\n") + 1]  # never read a line still being written
+            self._metadata_offset += len(complete)
+            for line in complete.decode("utf-8").splitlines():
+                if line.strip():
+                    meta = json.loads(line)
+                    self.metadata.append(meta)
+                    self._keys.add(self._key(meta))
+
+        stat = os.stat(self.embeddings_path)
+        if (stat.st_ino, stat.st_size) != self._embeddings_id:
+            self.embeddings = np.lib.format.open_memmap(self.embeddings_path, mode="r+")
+            self._embeddings_id = (stat.st_ino, stat.st_size)
+
+        # Metadata past the stored row count belongs to a write that never completed
+        stored = self._stored_rows()
+        rows = min(len(self.metadata) if stored is None else stored, self.embeddings.shape[0])
+        if len(self.metadata) > rows:
+            del self.metadata[rows:]
+            self._keys = {self._key(meta) for meta in self.metadata}
+            with open(self.metadata_path, "rb") as f:
+                self._metadata_offset = sum(len(f.readline()) for _ in range(rows))
+
+    def _write_rows(self, rows: int):
+        tmp_path = self.rows_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(rows))
+        os.replace(tmp_path, self.rows_path)
+
+    def _grow(self, needed: int):
+        capacity = self.embeddings.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(capacity * 2, needed)
+        tmp_path = self.embeddings_path + ".tmp"
+        grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(new_capacity, self.dim))
+        grown[:len(self)] = self.embeddings[:len(self)]
+        grown.flush()
+        del grown
+        self.embeddings = None  # release the old mapping before swapping files
+        os.replace(tmp_path, self.embeddings_path)
+        self._embeddings_id = None
+        self._sync()
+
+    def add(self, articles, embeddings) -> int:
+        """
+        Add articles with their embeddings, skipping ones already indexed (by URL).
+        Returns the number of new rows.
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock, self._file_lock():
+            self._sync()
+            new_rows, new_meta, seen = [], [], set()
+            for article, embedding in zip(articles, embeddings):
+                meta = {field: article.get(field, "") for field in METADATA_FIELDS}
+                meta["description"] = (meta["description"] or "")[:METADATA_DESCRIPTION_CHARS]
+                key = self._key(meta)
+                if key in self._keys or key in seen:
+                    continue
+                seen.add(key)
+                new_rows.append(embedding / (np.linalg.norm(embedding) or 1.0))
+                new_meta.append(meta)
+
+            if not new_rows:
+                return 0
+
+            start = len(self)
+            self._grow(start + len(new_rows))
+            self.embeddings[start:start + len(new_rows)] = np.stack(new_rows)
+            self.embeddings.flush()
+            self._write_rows(start + len(new_rows))
+            with open(self.metadata_path, "a", encoding="utf-8") as f:
+                f.truncate(self._metadata_offset)  # drop lines of an incomplete earlier write
+                for meta in new_meta:
+                    f.write(json.dumps(meta, separators=(",", ":")) + "\n")
+            self._sync()
+            return len(new_rows)
+
+    def search(self, query_embedding, k: int = 10):
+        """
+        Top-k cosine search. Returns (articles, embeddings, similarities), best first.
+        """
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        query = query / (np.linalg.norm(query) or 1.0)
+        with self._lock:
+            self._sync()
+            count = len(self)
+            if count == 0:
+                return [], np.zeros((0, self.dim), dtype=np.float32), np.zeros(0, dtype=np.float32)
+            matrix = self.embeddings[:count]
+            similarities = matrix @ query
+            k = min(k, count)
+            top = np.argpartition(-similarities, k - 1)[:k]
+            top = top[np.argsort(-similarities[top])]
+            return [dict(self.metadata[i]) for i in top], np.array(matrix[top]), similarities[top]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_article_index():
+    """
+    The process-wide article index, or None when ARTICLE_INDEX_DIR is not set.
+    """
+    global _index
+    if not ARTICLE_INDEX_DIR:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ArticleIndex(ARTICLE_INDEX_DIR)
+    return _index
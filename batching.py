@@ -0,0 +1,98 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from metrics import observe, register_gauges, SIZE_BUCKETS
+
+# Dynamic micro-batching in front of the model pipelines
+MICRO_BATCHING_ENABLED = os.getenv("MICRO_BATCHING", "1") == "1"
+MICRO_BATCH_SIZE = int(os.getenv("MICRO_BATCH_SIZE", "8"))
+MICRO_BATCH_WAIT_MS = float(os.getenv("MICRO_BATCH_WAIT_MS", "10"))
+
+
+_batchers = []
+
+
+class MicroBatcher:
+    """
+    Queues single inputs from concurrent callers and runs them through `batch_fn`
+    in batches of up to `max_batch_size`, waiting at most `max_wait_ms` for a batch
+    to fill. `batch_fn` takes a list of inputs and returns a list of outputs in the
+    same order; each caller gets back its own output (or the batch's exception).
+    """
+
+    def __init__(self, batch_fn, name: str, max_batch_size: int = None, max_wait_ms: float = None,
+                 enabled: bool = None):
+        self.batch_fn = batch_fn
+        self.name = name
+        self.max_batch_size = max_batch_size or MICRO_BATCH_SIZE
+        self.max_wait = (MICRO_BATCH_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000
+        self.enabled = MICRO_BATCHING_ENABLED if enabled is None else enabled
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        _batchers.append(self)
+
+    def submit(self, item) -> Future:
+        """
+        Queue one input and return a Future for its output.
+        """
+        future = Future()
+        if not self.enabled:
+            try:
+                future.set_result(self.batch_fn([item])[0])
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._ensure_worker()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item):
+        return self.submit(item).result()
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name=f"batcher-{self.name}", daemon=True)
+                    self._worker.start()
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            # Drop callers that gave up before the batch ran
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            observe("model_batch_size", len(batch), buckets=SIZE_BUCKETS, model=self.name)
+            start = time.perf_counter()
+            try:
+                outputs = self.batch_fn([item for item, _ in batch])
+                observe("model_batch_seconds", time.perf_counter() - start, model=self.name)
+                for (_, future), output in zip(batch, outputs):
+                    future.set_result(output)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+
+def _batcher_queue_depths():
+    return [("batcher_queue_depth", {"model": batcher.name}, batcher._queue.qsize()) for batcher in _batchers]
+
+register_gauges(_batcher_queue_depths)
@@ -0,0 +1,88 @@
+"""
+Cascade threshold sweep on the local sample set.
+
+    python benchmarks/cascade_eval.py --thresholds 0.4 0.5 0.6 0.7 0.8
+
+For each confidence threshold, reports how many samples the cheap tier answers,
+how often the cascade agrees with the large model alone, and the mean
+per-sample model time, for classify_news (MiniLM prototype head vs
+bart-large-mnli) and classify_fake_news (bert-tiny vs NLI escalation).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model_utils
+import fake_news_classifier
+from cascade import prototype_classify, FAKE_NEWS_NLI_LABELS
+
+SAMPLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples.json")
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def _sweep(cheap, large, cheap_seconds, large_seconds, thresholds):
+    rows = []
+    for threshold in thresholds:
+        answered = [conf >= threshold for _, conf in cheap]
+        agree = [cheap[i][0] == large[i] if answered[i] else True for i in range(len(large))]
+        seconds = [cheap_seconds[i] + (0 if answered[i] else large_seconds[i]) for i in range(len(large))]
+        rows.append({
+            "threshold": threshold,
+            "escalation_rate": round(1 - sum(answered) / len(answered), 3),
+            "agreement": round(sum(agree) / len(agree), 3),
+            "mean_ms": round(1000 * sum(seconds) / len(seconds), 1),
+            "large_only_ms": round(1000 * sum(large_seconds) / len(large_seconds), 1),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95])
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    with open(SAMPLES_PATH, encoding="utf-8") as f:
+        texts = json.load(f)
+    labels = tuple(model_utils.NEWS_LABELS)
+    nli_labels = tuple(FAKE_NEWS_NLI_LABELS)
+
+    classify_cheap, classify_large, fake_cheap, fake_large = [], [], [], []
+    classify_cheap_s, classify_large_s, fake_cheap_s, fake_large_s = [], [], [], []
+    for text in texts:
+        (result, confidence), seconds = _timed(lambda t: prototype_classify([t], labels)[0], text)
+        classify_cheap.append((result["labels"][0], confidence))
+        classify_cheap_s.append(seconds)
+        result, seconds = _timed(model_utils.zero_shot_classify, text, labels)
+        classify_large.append(result["labels"][0])
+        classify_large_s.append(seconds)
+
+        result, seconds = _timed(lambda t: fake_news_classifier._classify_fake_news_batch([t])[0], text)
+        fake_cheap.append(("fake" if result["label"].lower() == "spam" else "real", result["score"]))
+        fake_cheap_s.append(seconds)
+        result, seconds = _timed(model_utils.zero_shot_classify, text, nli_labels)
+        fake_large.append("fake" if result["labels"][0] == "fake news" else "real")
+        fake_large_s.append(seconds)
+
+    report = {
+        "samples": len(texts),
+        "classify_news": _sweep(classify_cheap, classify_large, classify_cheap_s, classify_large_s, args.thresholds),
+        "classify_fake_news": _sweep(fake_cheap, fake_large, fake_cheap_s, fake_large_s, args.thresholds),
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Accuracy-vs-latency comparison of model backends on a fixed local sample set.
+
+    python benchmarks/compare_backends.py --backends torch int8 onnx --output backends.json
+
+Every backend is compared against the fp32 torch baseline: label agreement for
+the classifiers, token F1 for generated text and cosine similarity for embeddings.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model_utils  # noqa: F401  (registers zero_shot, summarizer, interpreter)
+import fake_news_classifier  # noqa: F401  (registers fake_news)
+import news_verification  # noqa: F401  (registers embedding)
+from model_registry import load_model
+from model_utils import NEWS_LABELS
+
+SAMPLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples.json")
+MODELS = ["zero_shot", "summarizer", "interpreter", "fake_news", "embedding"]
+
+
+def _run(name, model, text):
+    if name == "zero_shot":
+        return model(text, NEWS_LABELS)["labels"][0]
+    if name == "summarizer":
+        return model(text, max_length=100, min_length=30, do_sample=False)[0]["summary_text"]
+    if name == "interpreter":
+        return model(model_utils._interpret_prompt(text), max_length=256, do_sample=False)[0]["generated_text"]
+    if name == "fake_news":
+        return model(text, truncation=True)[0]["label"]
+    return model.encode(text)
+
+
+def _token_f1(a: str, b: str) -> float:
+    a_tokens, b_tokens = a.lower().split(), b.lower().split()
+    common = sum(min(a_tokens.count(t), b_tokens.count(t)) for t in set(a_tokens))
+    if not common:
+        return 0.0
+    precision, recall = common / len(a_tokens), common / len(b_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def _cosine(a, b) -> float:
+    import numpy as np
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    return float(a @ b / ((np.linalg.norm(a) * np.linalg.norm(b)) or 1.0))
+
+
+def _agreement(name, output, baseline) -> float:
+    if name in ("zero_shot", "fake_news"):
+        return float(output == baseline)
+    if name in ("summarizer", "interpreter"):
+        return _token_f1(output, baseline)
+    return _cosine(output, baseline)
+
+
+def compare(models, backends, samples):
+    report = {}
+    for name in models:
+        report[name] = {}
+        baseline = None
+        for backend in ["torch"] + [b for b in backends if b != "torch"]:
+            load_start = time.perf_counter()
+            model = load_model(name, backend)
+            load_seconds = time.perf_counter() - load_start
+
+            _run(name, model, samples[0])  # warm up
+            outputs, latencies = [], []
+            for text in samples:
+                start = time.perf_counter()
+                outputs.append(_run(name, model, text))
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            if baseline is None:
+                baseline = outputs
+            latencies.sort()
+            report[name][backend] = {
+                "load_seconds": round(load_seconds, 2),
+                "latency_ms_mean": round(statistics.mean(latencies), 1),
+                "latency_ms_p50": round(latencies[len(latencies) // 2], 1),
+                "latency_ms_p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+                "agreement_with_torch": round(statistics.mean(
+                    _agreement(name, out, base) for out, base in zip(outputs, baseline)), 3),
+            }
+            print(f"{name:12s} {backend:6s} {report[name][backend]}", flush=True)
+            del model
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=MODELS, choices=MODELS)
+    parser.add_argument("--backends", nargs="+", default=["torch", "int8", "onnx"])
+    parser.add_argument("--samples", default=SAMPLES_PATH)
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    with open(args.samples, encoding="utf-8") as f:
+        samples = json.load(f)
+
+    report = compare(args.models, args.backends, samples)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Local fake of the upstream APIs the service calls, for offline benchmarks:
+
+    GET /search-news                 World News API search (JSON, 429 with Retry-After over the limit)
+    GET /2/tweets/search/recent      Twitter recent search (JSON, honors since_id,
+                                     sends x-rate-limit-* headers, 429 with Retry-After over the limit)
+    GET /article/<n>                 a static news article page (HTML, with ETag)
+
+    python benchmarks/fake_upstream.py --port 9000 --latency-ms 80 --articles 10
+
+Point the service at it with WORLD_NEWS_API_URL=http://127.0.0.1:9000 and
+TWITTER_API_URL=http://127.0.0.1:9000.
+"""
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+WORDS = ("government officials said the report shows economy markets storm city council vote health "
+         "ministry cases police investigation election campaign court ruling company shares quarter "
+         "climate energy prices minister agreement talks protest school students scientists study").split()
+
+DEFAULT_CONFIG = {
+    "latency_ms": 50.0,   # added to every response
+    "jitter_ms": 10.0,    # uniform +/- jitter
+    "articles": 10,       # articles per search response (capped by the request's "number")
+    "article_words": 120,  # words per article text
+    "tweets": 20,         # tweets per topic at start (responses capped by "max_results")
+    "tweet_rate": 0.5,    # new tweets per second per topic
+    "twitter_rate_limit": 450,   # searches per rate-limit window, 0 for unlimited
+    "news_rate_limit": 0,        # news searches per rate-limit window, 0 for unlimited
+    "rate_limit_window": 900.0,  # seconds
+}
+
+
+def _words(seed: str, count: int) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def _search_news(config, query):
+    text = query.get("text", [""])[0]
+    number = min(int(query.get("number", ["10"])[0]), config["articles"])
+    news = []
+    for i in range(number):
+        seed = f"{text}-{i}"
+        news.append({
+            "title": f"{text} {_words(seed, 6)}",
+            "text": f"{text}. {_words(seed, config['article_words'])}",
+            "url": f"https://{random.Random(seed).choice(['bbc.com', 'cnn.com', 'reuters.com', 'example.org'])}/news/{i}",
+            "source": "fake-upstream",
+            "publish_date": "2024-01-01 00:00:00",
+        })
+    return {"available": number * 10, "news": news}
+
+
+def _search_tweets(config, query, started):
+    topic = query.get("query", [""])[0]
+    count = min(int(query.get("max_results", ["10"])[0]), config["tweets"])
+    since_id = int(query.get("since_id", ["0"])[0])
+    # The topic's stream grows over time; ids increase, newest first like the real API
+    available = config["tweets"] + int((time.time() - started) * config["tweet_rate"])
+    numbers = [i for i in range(available - 1, -1, -1) if 1000 + i > since_id][:count]
+    tweets = []
+    for i in numbers:
+        rng = random.Random(f"{topic}-tweet-{i}")
+        tweets.append({
+            "id": str(1000 + i),
+            "text": f"{topic} {_words(f'{topic}-tweet-{i}', 12)}",
+            "author_id": str(rng.randint(1, 10 ** 6)),
+            "created_at": "2024-01-01T00:00:00.000Z",
+            "public_metrics": {"like_count": rng.randint(0, 200), "retweet_count": rng.randint(0, 50),
+                               "reply_count": rng.randint(0, 20)},
+        })
+    if not tweets:
+        return {"meta": {"result_count": 0}}
+    return {"data": tweets, "meta": {"newest_id": tweets[0]["id"], "oldest_id": tweets[-1]["id"],
+                                     "result_count": len(tweets)}}
+
+
+class RateLimit:
+    """
+    Fixed-window request limit, reported the way Twitter does in x-rate-limit-* headers.
+    """
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.reset_at = time.time() + window
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def take(self):
+        """
+        Count one request; returns (allowed, headers).
+        """
+        with self.lock:
+            now = time.time()
+            if now >= self.reset_at:
+                self.reset_at = now + self.window
+                self.used = 0
+            allowed = not self.limit or self.used < self.limit
+            if allowed:
+                self.used += 1
+            headers = {"x-rate-limit-reset": str(int(self.reset_at))}
+            if self.limit:
+                headers["x-rate-limit-limit"] = str(self.limit)
+                headers["x-rate-limit-remaining"] = str(max(self.limit - self.used, 0))
+            if not allowed:
+                headers["Retry-After"] = str(max(int(self.reset_at - now + 0.999), 1))
+            return allowed, headers
+
+
+def _article_page(config, number):
+    body = _words(f"article-{number}", config["article_words"] * 3)
+    return (f"<html><head><title>Article {number}</title></head><body><article>"
+            f"<h1>Article {number}</h1><p>{body}</p></article></body></html>")
+
+
+def make_handler(config):
+    started = time.time()
+    twitter_limit = RateLimit(config["twitter_rate_limit"], config["rate_limit_window"])
+    news_limit = RateLimit(config["news_rate_limit"], config["rate_limit_window"])
+
+    class FakeUpstreamHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status, body: bytes, content_type, headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            delay = config["latency_ms"] + random.uniform(-config["jitter_ms"], config["jitter_ms"])
+            time.sleep(max(delay, 0) / 1000)
+
+            parts = urlsplit(self.path)
+            query = parse_qs(parts.query)
+            if parts.path == "/search-news":
+                allowed, headers = news_limit.take()
+                if not allowed:
+                    self._send(429, b'{"detail": "Too Many Requests"}', "application/json", headers)
+                else:
+                    self._send(200, json.dumps(_search_news(config, query)).encode(), "application/json", headers)
+            elif parts.path == "/2/tweets/search/recent":
+                allowed, headers = twitter_limit.take()
+                if not allowed:
+                    self._send(429, b'{"title": "Too Many Requests", "detail": "Too Many Requests"}',
+                               "application/json", headers)
+                else:
+                    self._send(200, json.dumps(_search_tweets(config, query, started)).encode(),
+                               "application/json", headers)
+            elif parts.path.startswith("/article/"):
+                html = _article_page(config, parts.path.rsplit("/", 1)[-1]).encode()
+                etag = '"' + hashlib.sha1(html).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    self._send(304, b"", "text/html", {"ETag": etag})
+                else:
+                    self._send(200, html, "text/html; charset=utf-8", {"ETag": etag})
+            else:
+                self._send(404, b'{"detail": "not found"}', "application/json")
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeUpstreamHandler
+
+
+def start_fake_upstream(port: int = 0, **overrides):
+    """
+    Start the fake upstream in a background thread and return the server
+    (its port is server.server_port).
+    """
+    config = {**DEFAULT_CONFIG, **overrides}
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config))
+    server.daemon_threads = True
+    server.config = config
+    threading.Thread(target=server.serve_forever, name="fake-upstream", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9000)
+    for key, value in DEFAULT_CONFIG.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args()
+
+    server = start_fake_upstream(args.port, **{key: getattr(args, key) for key in DEFAULT_CONFIG})
+    print(f"Fake upstream listening on http://127.0.0.1:{server.server_port}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
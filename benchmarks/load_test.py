@@ -0,0 +1,256 @@
+"""
+Load generator for the service, run fully offline against the fake upstream
+and stub (or real) models.
+
+    python benchmarks/load_test.py --endpoints analyze verify-topic --concurrency 8 \\
+        --requests 200 --output runs/baseline.json
+    python benchmarks/load_test.py --compare runs/baseline.json runs/candidate.json
+
+By default it starts the fake upstream and a uvicorn worker with MODEL_BACKEND=stub,
+drives the chosen endpoints from a thread pool, and reports throughput,
+p50/p95/p99 latency per endpoint and the server's peak RSS as JSON.
+Use --base-url to benchmark an already running server instead.
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from fake_upstream import start_fake_upstream, DEFAULT_CONFIG  # noqa: E402
+
+ENDPOINTS = ["analyze", "analyze-url", "analyze-image", "verify-topic"]
+SAMPLE_TEXTS = json.load(open(os.path.join(BENCHMARK_DIR, "samples.json"), encoding="utf-8"))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _screenshot_png(text: str) -> bytes:
+    from PIL import Image, ImageDraw
+    image = Image.new("RGB", (1200, 400), "white")
+    draw = ImageDraw.Draw(image)
+    for line in range(0, len(text), 80):
+        draw.text((20, 20 + line // 80 * 24), text[line:line + 80], fill="black")
+    buffer = BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def make_request(endpoint: str, base_url: str, upstream_url: str, rng: random.Random, topics: int):
+    """
+    Build (method, url, kwargs) for one request to `endpoint`.
+    """
+    text = rng.choice(SAMPLE_TEXTS)
+    topic = f"topic {rng.randrange(topics)}"
+    if endpoint == "analyze":
+        return "POST", f"{base_url}/analyze", {"json": {"text": text, "topic": topic}}
+    if endpoint == "analyze-url":
+        return "POST", f"{base_url}/analyze-url", {"json": {"url": f"{upstream_url}/article/{rng.randrange(topics)}", "topic": topic}}
+    if endpoint == "analyze-image":
+        return "POST", f"{base_url}/analyze-image", {"files": {"file": ("shot.png", _screenshot_png(text), "image/png")}}
+    return "POST", f"{base_url}/verify-topic", {"params": {"topic": topic}}
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def _peak_rss_mb(pid: int):
+    """
+    Peak resident set size of a process (VmHWM on Linux), in MB.
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import psutil
+        return round(psutil.Process(pid).memory_info().rss / 2 ** 20, 1)
+    except Exception:
+        return None
+
+
+def start_server(port: int, upstream_url: str, extra_env: dict, cache_dir: str, result_cache: bool = False):
+    env = {
+        **os.environ,
+        "MODEL_BACKEND": "stub",
+        "WORLD_NEWS_API_URL": upstream_url,
+        "TWITTER_API_URL": upstream_url,
+        # Caches live in a directory of this run only, so repeat runs don't measure earlier runs' hits.
+        # The samples repeat, so the result cache is off unless asked for.
+        "URL_CACHE_DIR": os.path.join(cache_dir, "articles"),
+        "RESULT_CACHE_PATH": os.path.join(cache_dir, "results.sqlite") if result_cache else "",
+        # Every fetched URL is on the fake upstream; politeness delays would dominate /analyze-url
+        "POLITENESS_DELAY": "0",
+        "UPSTREAM_RATE_LIMITS": "",  # measure the service, not the quota
+        **extra_env,
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=REPO_DIR, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            requests.post(f"{base_url}/warmup", timeout=60)
+            return process, base_url
+        except requests.ConnectionError:
+            time.sleep(0.25)
+    process.kill()
+    raise RuntimeError("Server did not start in time")
+
+
+def run_load(base_url, upstream_url, endpoints, concurrency, total_requests, topics, seed):
+    rng = random.Random(seed)
+    plan = [(endpoint,) + make_request(endpoint, base_url, upstream_url, rng, topics)
+            for endpoint in (rng.choice(endpoints) for _ in range(total_requests))]
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+
+    def send(item):
+        endpoint, method, url, kwargs = item
+        start = time.perf_counter()
+        try:
+            status = session.request(method, url, timeout=300, **kwargs).status_code
+        except requests.RequestException:
+            status = None
+        return endpoint, status, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(send, plan))
+    wall_seconds = time.perf_counter() - start
+
+    report = {}
+    for endpoint in endpoints:
+        latencies = sorted(seconds * 1000 for name, status, seconds in results if name == endpoint and status == 200)
+        attempted = sum(1 for name, _, _ in results if name == endpoint)
+        report[endpoint] = {
+            "requests": attempted,
+            "errors": attempted - len(latencies),
+            "rejected_503": sum(1 for name, status, _ in results if name == endpoint and status == 503),
+            "throughput_rps": round(len(latencies) / wall_seconds, 2),
+            "latency_ms_p50": _round(_percentile(latencies, 0.50)),
+            "latency_ms_p95": _round(_percentile(latencies, 0.95)),
+            "latency_ms_p99": _round(_percentile(latencies, 0.99)),
+            "latency_ms_mean": _round(statistics.mean(latencies) if latencies else None),
+        }
+    ok = sum(1 for _, status, _ in results if status == 200)
+    return {"wall_seconds": round(wall_seconds, 2), "throughput_rps": round(ok / wall_seconds, 2),
+            "endpoints": report}
+
+
+def _round(value):
+    return None if value is None else round(value, 1)
+
+
+def compare(baseline_path, candidate_path):
+    """
+    Print per-endpoint deltas between two saved runs.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+    keys = ["throughput_rps", "latency_ms_p50", "latency_ms_p95", "latency_ms_p99"]
+    print(f"{'endpoint':15s} " + " ".join(f"{key:>24s}" for key in keys))
+    for endpoint, stats in candidate["results"]["endpoints"].items():
+        before = baseline["results"]["endpoints"].get(endpoint, {})
+        cells = []
+        for key in keys:
+            old, new = before.get(key), stats.get(key)
+            change = f"{(new - old) / old * 100:+.0f}%" if old and new is not None else "n/a"
+            cells.append(f"{str(old):>8s} -> {str(new):>8s} {change:>5s}")
+        print(f"{endpoint:15s} " + " ".join(f"{cell:>24s}" for cell in cells))
+    print(f"peak RSS MB: {baseline.get('peak_rss_mb')} -> {candidate.get('peak_rss_mb')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", nargs="+", default=["analyze", "verify-topic"], choices=ENDPOINTS)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--topics", type=int, default=20, help="Distinct topics/articles to draw from")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--upstream-latency-ms", type=float, default=DEFAULT_CONFIG["latency_ms"])
+    parser.add_argument("--upstream-articles", type=int, default=DEFAULT_CONFIG["articles"])
+    parser.add_argument("--upstream-article-words", type=int, default=DEFAULT_CONFIG["article_words"])
+    parser.add_argument("--env", nargs="*", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the server, e.g. STUB_ITEM_LATENCY_MS=20")
+    parser.add_argument("--result-cache", action="store_true",
+                        help="Enable the result cache (in a fresh directory for this run)")
+    parser.add_argument("--base-url", help="Benchmark an already running server instead of starting one")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    upstream = start_fake_upstream(latency_ms=args.upstream_latency_ms, articles=args.upstream_articles,
+                                   article_words=args.upstream_article_words)
+    upstream_url = f"http://127.0.0.1:{upstream.server_port}"
+    extra_env = dict(item.split("=", 1) for item in args.env)
+
+    process = None
+    base_url = args.base_url
+    cache_dir = tempfile.mkdtemp(prefix="news_analyzer_load_")
+    if base_url is None:
+        process, base_url = start_server(_free_port(), upstream_url, extra_env, cache_dir, args.result_cache)
+    try:
+        results = run_load(base_url, upstream_url, args.endpoints, args.concurrency, args.requests,
+                           args.topics, args.seed)
+        peak_rss = _peak_rss_mb(process.pid) if process else None
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=30)
+        upstream.shutdown()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "peak_rss_mb": peak_rss,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
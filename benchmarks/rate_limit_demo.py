@@ -0,0 +1,81 @@
+"""
+Outbound rate limiting against the fake upstream.
+
+    python benchmarks/rate_limit_demo.py --quota 20 --window 10 --calls 60
+    python benchmarks/rate_limit_demo.py --no-limiter
+
+Starts the fake upstream with a World News quota of --quota searches per
+--window seconds, then fires --calls distinct news searches at once, a third
+each in the interactive, standard and batch lanes, every call with a
+--deadline. Reports per lane how many searches succeeded, how many were
+throttled or dropped at their deadline, and the median latency, plus the 429s
+the upstream actually returned. With --no-limiter the same burst goes out
+unthrottled, the way it did before client-side limiting.
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_upstream import start_fake_upstream
+
+LANES = ("interactive", "standard", "batch")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quota", type=int, default=20, help="Upstream searches per window")
+    parser.add_argument("--window", type=float, default=10.0, help="Upstream rate-limit window (seconds)")
+    parser.add_argument("--calls", type=int, default=60)
+    parser.add_argument("--deadline", type=float, default=12.0, help="Per-call deadline (seconds)")
+    parser.add_argument("--no-limiter", action="store_true", help="Disable client-side rate limiting")
+    args = parser.parse_args()
+
+    upstream = start_fake_upstream(0, latency_ms=20, news_rate_limit=args.quota, rate_limit_window=args.window)
+    os.environ["WORLD_NEWS_API_URL"] = f"http://127.0.0.1:{upstream.server_port}"
+    os.environ["WORLD_NEWS_CACHE_TTL"] = "0"
+    os.environ["UPSTREAM_RATE_LIMITS"] = "" if args.no_limiter else f"world_news={args.quota}/{args.window}"
+
+    import metrics
+    from admission import request_priority, request_deadline, INTERACTIVE, STANDARD, BATCH
+    from news_verification import search_news
+
+    priorities = {"interactive": INTERACTIVE, "standard": STANDARD, "batch": BATCH}
+    results = {lane: [] for lane in LANES}  # (status, seconds)
+    lock = threading.Lock()
+
+    def call(i, lane):
+        request_priority.set(priorities[lane])
+        request_deadline.set(time.monotonic() + args.deadline)
+        start = time.perf_counter()
+        result = search_news(f"demo query {i}")
+        with lock:
+            results[lane].append((result["status"], time.perf_counter() - start))
+
+    threads = [threading.Thread(target=call, args=(i, LANES[i % 3])) for i in range(args.calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"{'lane':<12}{'ok':>6}{'failed':>8}{'p50 ms':>10}")
+    for lane in LANES:
+        ok = [seconds for status, seconds in results[lane] if status == "success"]
+        failed = len(results[lane]) - len(ok)
+        p50 = round(1000 * statistics.median(ok), 1) if ok else "-"
+        print(f"{lane:<12}{len(ok):>6}{failed:>8}{p50:>10}")
+
+    print()
+    for line in metrics.render().splitlines():
+        if line.startswith(("news_analyzer_http_responses_total", "news_analyzer_http_retries_total",
+                            "news_analyzer_rate_limit_rejections_total", "news_analyzer_http_deadline_exceeded_total")):
+            print(line)
+    upstream.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import os
+import threading
+import torch
+from collections import Counter
+from metrics import inc, register_gauges
+
+# Cascade mode: cheap models answer first and the large NLI model only sees the inputs
+# they are unsure about. The confidence thresholds trade CPU for agreement with the
+# large model; benchmarks/cascade_eval.py reports both for a range of thresholds.
+CASCADE_MODE = os.getenv("CASCADE_MODE", "0") == "1"
+CASCADE_CLASSIFY_CONFIDENCE = float(os.getenv("CASCADE_CLASSIFY_CONFIDENCE", "0.6"))
+CASCADE_FAKE_NEWS_CONFIDENCE = float(os.getenv("CASCADE_FAKE_NEWS_CONFIDENCE", "0.9"))
+CASCADE_TEMPERATURE = float(os.getenv("CASCADE_TEMPERATURE", "0.05"))  # softmax temperature over cosine similarities
+
+# Example sentences per label for the MiniLM prototype head; other labels use the NLI hypothesis
+LABEL_PROTOTYPES = {
+    "biased": [
+        "This article presents only one side of the story.",
+        "The report is slanted to favor one party and attacks its opponents.",
+    ],
+    "factual": [
+        "This article reports facts, figures and official statements.",
+        "Officials confirmed the figures in a statement on Tuesday.",
+    ],
+    "opinionated": [
+        "In my opinion this policy is a terrible mistake.",
+        "This column argues what the government should do.",
+    ],
+    "fake": [
+        "Shocking secret they don't want you to know, share before it gets deleted!",
+        "Miracle cure discovered, doctors hate this one weird trick.",
+    ],
+}
+FAKE_NEWS_NLI_LABELS = ["real news", "fake news"]
+ESCALATED_TIERS = {"zero_shot", "nli"}
+
+_answers = Counter()  # (model, escalated) -> count
+_answers_lock = threading.Lock()
+
+
+def record_tier(model: str, tier: str, count: int = 1):
+    """
+    Count which tier answered; the escalation rate is the share answered by the large model.
+    """
+    inc("cascade_answers_total", count, help="Cascade answers by model and answering tier", model=model, tier=tier)
+    with _answers_lock:
+        _answers[(model, tier in ESCALATED_TIERS)] += count
+
+
+def _collect_gauges():
+    with _answers_lock:
+        answers = dict(_answers)
+    rates = []
+    for model in {model for model, _ in answers}:
+        escalated = answers.get((model, True), 0)
+        total = escalated + answers.get((model, False), 0)
+        if total:
+            rates.append(("cascade_escalation_rate", {"model": model}, round(escalated / total, 4)))
+    return rates
+
+
+register_gauges(_collect_gauges)
+
+
+def _prototype_matrix(labels):
+    from news_verification import encode_texts
+    sentences, owners = [], []
+    for i, label in enumerate(labels):
+        for sentence in LABEL_PROTOTYPES.get(label, [f"This example is {label}."]):
+            sentences.append(sentence)
+            owners.append(i)
+    # Prototype embeddings are served from the embedding cache after the first call
+    embeddings = torch.nn.functional.normalize(encode_texts(sentences).float(), dim=1)
+    owners = torch.tensor(owners)
+    prototypes = torch.stack([embeddings[owners == i].mean(dim=0) for i in range(len(labels))])
+    return torch.nn.functional.normalize(prototypes, dim=1)
+
+
+def prototype_classify(texts, labels):
+    """
+    Classify texts by cosine similarity of their MiniLM embeddings to label prototypes.
+    Returns [(classification, confidence)] with classification in the zero-shot format.
+    """
+    from news_verification import encode_texts
+    labels = list(labels)
+    # Article bodies are one-off inputs; keep them out of the shared embedding cache
+    embeddings = torch.nn.functional.normalize(encode_texts(list(texts), cache=False).float(), dim=1)
+    probabilities = (embeddings @ _prototype_matrix(labels).T / CASCADE_TEMPERATURE).softmax(dim=1)
+    results = []
+    for row in probabilities.tolist():
+        ranked = sorted(zip(labels, row), key=lambda item: item[1], reverse=True)
+        results.append(({"labels": [label for label, _ in ranked], "scores": [score for _, score in ranked]},
+                        ranked[0][1]))
+    return results
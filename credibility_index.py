@@ -0,0 +1,283 @@
+"""
+Compiled source-credibility index.
+
+Ratings are compiled into a compact file: an open-addressing hash table of
+(domain hash, string offset, score) slots followed by a blob of domain names.
+The file is memory-mapped, so loading is O(1) regardless of size. A lookup
+tries the host and each parent domain down to the registrable domain (one
+label above the public suffix), one hash probe each, so a lookup is O(label
+count). The file is re-opened automatically when it changes on disk.
+
+    python credibility_index.py build ratings.csv credibility.crix
+
+ratings.csv has one "domain,score" row per source, with scores in 0..1.
+"""
+import os
+import io
+import csv
+import sys
+import mmap
+import time
+import struct
+import hashlib
+import threading
+from urllib.parse import urlsplit
+from source_credibility import SOURCE_CREDIBILITY
+
+CREDIBILITY_INDEX_PATH = os.getenv("CREDIBILITY_INDEX_PATH")
+CREDIBILITY_RELOAD_INTERVAL = float(os.getenv("CREDIBILITY_RELOAD_INTERVAL", "30"))
+PUBLIC_SUFFIX_LIST = os.getenv("PUBLIC_SUFFIX_LIST")  # optional path to public_suffix_list.dat
+DEFAULT_CREDIBILITY = 0.5
+
+_MAGIC = b"CRIX"
+_VERSION = 1
+_HEADER = struct.Struct("<4sIIIQ")  # magic, version, slot count, entry count, strings offset
+_SLOT = struct.Struct("<QIHxxf")    # domain hash, string offset, string length, score
+
+# Multi-label public suffixes used when no public suffix list file is configured
+_BUILTIN_SUFFIXES = {
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "ltd.uk", "plc.uk", "me.uk", "net.uk",
+    "com.au", "net.au", "org.au", "gov.au", "edu.au",
+    "co.nz", "org.nz", "govt.nz", "co.za", "org.za", "gov.za",
+    "co.in", "org.in", "gov.in", "net.in", "ac.in", "nic.in",
+    "co.jp", "ne.jp", "or.jp", "go.jp", "ac.jp",
+    "com.br", "gov.br", "org.br", "com.cn", "gov.cn", "org.cn", "net.cn",
+    "com.mx", "gob.mx", "com.ar", "gob.ar", "com.tr", "gov.tr", "com.sg", "gov.sg",
+    "com.hk", "gov.hk", "co.kr", "or.kr", "go.kr", "com.pk", "gov.pk", "com.ng", "gov.ng",
+    "co.il", "gov.il", "com.eg", "gov.eg", "com.my", "gov.my", "com.ph", "gov.ph",
+    "blogspot.com", "wordpress.com", "github.io", "substack.com", "medium.com", "tumblr.com",
+}
+
+
+def _load_public_suffixes(path):
+    rules, wildcards, exceptions = set(), set(), set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            rule = line.strip().split(" ")[0].lower()
+            if not rule or rule.startswith("//"):
+                continue
+            if rule.startswith("!"):
+                exceptions.add(rule[1:])
+            elif rule.startswith("*."):
+                wildcards.add(rule[2:])
+            else:
+                rules.add(rule)
+    return rules, wildcards, exceptions
+
+
+if PUBLIC_SUFFIX_LIST:
+    _SUFFIXES, _WILDCARDS, _EXCEPTIONS = _load_public_suffixes(PUBLIC_SUFFIX_LIST)
+else:
+    _SUFFIXES, _WILDCARDS, _EXCEPTIONS = _BUILTIN_SUFFIXES, set(), set()
+
+
+def normalize_host(url_or_host: str) -> str:
+    """
+    Lower-case ASCII (IDNA) host name from a URL or bare domain, without port,
+    trailing dot or leading "www.".
+    """
+    value = (url_or_host or "").strip()
+    host = urlsplit(value if "//" in value else f"//{value}").hostname or ""
+    host = host.rstrip(".").lower()
+    try:
+        host = host.encode("idna").decode("ascii")
+    except UnicodeError:
+        pass
+    while host.startswith("www."):
+        host = host[4:]
+    return host
+
+
+def public_suffix_labels(labels) -> int:
+    """
+    Number of trailing labels that form the public suffix.
+    """
+    for i in range(len(labels)):
+        candidate = ".".join(labels[i:])
+        if candidate in _EXCEPTIONS:
+            return len(labels) - i - 1
+        if candidate in _SUFFIXES:
+            return len(labels) - i
+        if i + 1 < len(labels) and ".".join(labels[i + 1:]) in _WILDCARDS:
+            return len(labels) - i
+    return 1
+
+
+def candidate_domains(url_or_host: str):
+    """
+    The host and its parent domains, most specific first, stopping at the
+    registrable domain: feeds.bbc.co.uk -> [feeds.bbc.co.uk, bbc.co.uk].
+    """
+    host = normalize_host(url_or_host)
+    if not host:
+        return []
+    labels = host.split(".")
+    registrable = min(len(labels), public_suffix_labels(labels) + 1)
+    return [".".join(labels[i:]) for i in range(len(labels) - registrable + 1)]
+
+
+def _hash(domain: bytes) -> int:
+    # Never 0, so a zero hash marks an empty slot
+    return int.from_bytes(hashlib.blake2b(domain, digest_size=8).digest(), "little") | 1
+
+
+def compile_ratings(ratings: dict) -> bytes:
+    """
+    Compile {domain: score} into the on-disk index format.
+    """
+    entries = {}
+    for domain, score in ratings.items():
+        host = normalize_host(domain)
+        if host:
+            entries[host.encode("utf-8")] = float(score)
+
+    slot_count = 8
+    while slot_count < 2 * len(entries):
+        slot_count *= 2
+
+    slots = [None] * slot_count
+    strings = io.BytesIO()
+    for domain, score in entries.items():
+        key = _hash(domain)
+        position = key % slot_count
+        while slots[position] is not None:
+            position = (position + 1) % slot_count
+        slots[position] = (key, strings.tell(), len(domain), score)
+        strings.write(domain)
+
+    out = io.BytesIO()
+    strings_offset = _HEADER.size + slot_count * _SLOT.size
+    out.write(_HEADER.pack(_MAGIC, _VERSION, slot_count, len(entries), strings_offset))
+    for slot in slots:
+        out.write(_SLOT.pack(*(slot or (0, 0, 0, 0.0))))
+    out.write(strings.getvalue())
+    return out.getvalue()
+
+
+def build_index(ratings: dict, path: str):
+    """
+    Write a compiled index atomically, so running workers pick it up on their next reload check.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(compile_ratings(ratings))
+    os.replace(tmp_path, path)
+
+
+def read_ratings_csv(path: str) -> dict:
+    ratings = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if len(row) < 2 or row[0].startswith("#"):
+                continue
+            try:
+                ratings[row[0]] = float(row[1])
+            except ValueError:
+                continue  # header row
+    return ratings
+
+
+class CredibilityIndex:
+    """
+    Read-only view over a compiled index held in a memory map (or bytes).
+    """
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        magic, version, self.slot_count, self.entry_count, self._strings_offset = _HEADER.unpack_from(buffer, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("Not a credibility index file")
+
+    @classmethod
+    def open(cls, path: str):
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @classmethod
+    def from_ratings(cls, ratings: dict):
+        return cls(compile_ratings(ratings))
+
+    def __len__(self):
+        return self.entry_count
+
+    def _get(self, domain: str):
+        encoded = domain.encode("utf-8")
+        key = _hash(encoded)
+        position = key % self.slot_count
+        while True:
+            slot_hash, offset, length, score = _SLOT.unpack_from(self._buffer, _HEADER.size + position * _SLOT.size)
+            if slot_hash == 0:
+                return None
+            if slot_hash == key:
+                start = self._strings_offset + offset
+                if self._buffer[start:start + length] == encoded:
+                    return score
+            position = (position + 1) % self.slot_count
+
+    def lookup(self, url_or_host: str):
+        """
+        Score of the most specific rated domain for a URL or host, or None.
+        """
+        for domain in candidate_domains(url_or_host):
+            score = self._get(domain)
+            if score is not None:
+                return round(score, 4)
+        return None
+
+
+class ReloadingCredibilityIndex:
+    """
+    Serves lookups from the index file at `path`, re-opening it when its
+    modification time changes (checked at most every `interval` seconds).
+    Falls back to the built-in SOURCE_CREDIBILITY table without a file.
+    """
+
+    def __init__(self, path: str = None, interval: float = CREDIBILITY_RELOAD_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._index = CredibilityIndex.from_ratings(SOURCE_CREDIBILITY)
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        if path:
+            self._maybe_reload(force=True)
+
+    def _maybe_reload(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                return
+            if mtime != self._mtime:
+                self._index = CredibilityIndex.open(self.path)
+                self._mtime = mtime
+
+    def lookup(self, url_or_host: str, default: float = DEFAULT_CREDIBILITY) -> float:
+        if self.path:
+            self._maybe_reload()
+        score = self._index.lookup(url_or_host)
+        return default if score is None else score
+
+
+credibility_index = ReloadingCredibilityIndex(CREDIBILITY_INDEX_PATH)
+
+
+def source_credibility(url_or_host: str, default: float = DEFAULT_CREDIBILITY) -> float:
+    """
+    Credibility score for the source of a URL, matching subdomains to their
+    rated parent domain.
+    """
+    return credibility_index.lookup(url_or_host, default)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "build":
+        print(__doc__)
+        sys.exit(1)
+    ratings = read_ratings_csv(sys.argv[2])
+    build_index(ratings, sys.argv[3])
+    print(f"Compiled {len(ratings)} domains into {sys.argv[3]}")
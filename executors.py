@@ -0,0 +1,24 @@
+import os
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+# Bounded pools shared by the whole service. Model inference gets a small pool
+# (torch already parallelises inside each op), network I/O gets a wider one.
+MODEL_WORKERS = int(os.getenv("MODEL_WORKERS", "4"))
+IO_WORKERS = int(os.getenv("IO_WORKERS", "16"))
+# Per-request analysis stages mostly wait on the micro-batchers, which do the actual
+# inference; the pool must hold enough waiting stages for batches to fill
+# (4 stages per request, two full MICRO_BATCH_SIZE batches of requests by default).
+STAGE_WORKERS = int(os.getenv("STAGE_WORKERS", "64"))
+
+model_executor = ThreadPoolExecutor(max_workers=MODEL_WORKERS, thread_name_prefix="model")
+stage_executor = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix="stage")
+io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+
+
+def submit_in_context(executor, func, *args, **kwargs):
+    """
+    Submit to a pool while carrying over the caller's contextvars (e.g. request priority).
+    """
+    context = contextvars.copy_context()
+    return executor.submit(context.run, func, *args, **kwargs)
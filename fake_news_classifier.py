@@ -1,33 +1,98 @@
 # fake_news_classifier.py
 
-from transformers import pipeline
+from batching import MicroBatcher
+from model_registry import register_model, get_model
+from model_backends import load_pipeline
+from admission import limit, Overloaded
+from metrics import timer
+from model_utils import classify_batcher
+from cascade import CASCADE_MODE, CASCADE_FAKE_NEWS_CONFIDENCE, FAKE_NEWS_NLI_LABELS, record_tier
 
-# Use a small, available model like "mrm8488/bert-tiny-finetuned-sms-spam-detection"
-fake_news_classifier = pipeline(
-    "text-classification",
-    model="mrm8488/bert-tiny-finetuned-sms-spam-detection"
-)
+def _load_fake_news_classifier(backend):
+    # Use a small, available model like "mrm8488/bert-tiny-finetuned-sms-spam-detection"
+    return load_pipeline(
+        "text-classification",
+        "mrm8488/bert-tiny-finetuned-sms-spam-detection",
+        backend
+    )
+
+register_model("fake_news", _load_fake_news_classifier)
+
+def _classify_fake_news_batch(texts):
+    fake_news_classifier = get_model("fake_news")
+    return fake_news_classifier(texts, batch_size=len(texts), truncation=True)
+
+fake_news_batcher = MicroBatcher(_classify_fake_news_batch, name="fake_news")
+
+def _format_fake_news_result(result):
+    label = result['label']
+    score = result['score']
+
+    # We'll interpret "spam" as "fake" and "ham" as "real" here for demonstration.
+    classification = "fake" if label.lower() == "spam" else "real"
+    confidence = round(score, 2)
+
+    return {
+        "status": "success",
+        "classification": classification,
+        "confidence": confidence,
+        "tier": "bert_tiny"
+    }
+
+def _nli_fake_news(texts):
+    """
+    Cascade escalation: fake/real by bart-large-mnli zero-shot for texts bert-tiny is unsure about.
+    """
+    with timer("model_call_seconds", model="zero_shot"), limit("zero_shot"):
+        futures = [classify_batcher.submit((text, tuple(FAKE_NEWS_NLI_LABELS))) for text in texts]
+        results = [future.result() for future in futures]
+    return [{
+        "status": "success",
+        "classification": "fake" if result["labels"][0] == "fake news" else "real",
+        "confidence": round(result["scores"][0], 2),
+        "tier": "nli"
+    } for result in results]
+
+def _cascade(texts, results):
+    """
+    Format bert-tiny results, escalating the low-confidence ones in cascade mode.
+    """
+    formatted = [_format_fake_news_result(result) for result in results]
+    if not CASCADE_MODE:
+        return formatted
+    escalated = [i for i, result in enumerate(results) if result["score"] < CASCADE_FAKE_NEWS_CONFIDENCE]
+    record_tier("fake_news", "bert_tiny", len(results) - len(escalated))
+    record_tier("fake_news", "nli", len(escalated))
+    if escalated:
+        for i, result in zip(escalated, _nli_fake_news([texts[i] for i in escalated])):
+            formatted[i] = result
+    return formatted
 
 def classify_fake_news(text: str):
     """
     Classify news text as fake or real using a pre-trained model.
     """
     try:
-        result = fake_news_classifier(text)
-        label = result[0]['label']
-        score = result[0]['score']
-
-        # We'll interpret "spam" as "fake" and "ham" as "real" here for demonstration.
-        classification = "fake" if label.lower() == "spam" else "real"
-        confidence = round(score, 2)
-
-        return {
-            "status": "success",
-            "classification": classification,
-            "confidence": confidence
-        }
+        with timer("model_call_seconds", model="fake_news"), limit("fake_news"):
+            result = fake_news_batcher(text)
+        return _cascade([text], [result])[0]
+    except Overloaded:
+        raise  # 503, not a degraded result
     except Exception as e:
         return {
             "status": "error",
             "message": str(e)
         }
+
+def classify_fake_news_batch(texts):
+    """
+    Classify several texts in one forward pass.
+    """
+    try:
+        with timer("model_call_seconds", model="fake_news"), limit("fake_news"):
+            results = _classify_fake_news_batch(texts)
+        return _cascade(texts, results)
+    except Overloaded:
+        raise
+    except Exception as e:
+        return [{"status": "error", "message": str(e)} for _ in texts]
@@ -0,0 +1,186 @@
+import os
+import time
+import logging
+import threading
+import torch
+from admission import request_priority, BATCH
+from metrics import inc, register_gauges, timer
+
+logger = logging.getLogger("news_analyzer")
+
+# Background prefetch of headlines into an in-memory, pre-embedded corpus that
+# verify_news_topic searches before calling the World News API. Off by default.
+HEADLINE_PREFETCH = os.getenv("HEADLINE_PREFETCH", "0") == "1"
+HEADLINE_QUERIES = [q.strip() for q in os.getenv(
+    "HEADLINE_QUERIES", "politics,world,business,economy,technology,science,health,sports,climate,elections"
+).split(",") if q.strip()]
+HEADLINE_LANGUAGES = [l.strip() for l in os.getenv("HEADLINE_LANGUAGES", "en").split(",") if l.strip()]
+HEADLINE_FETCH_SIZE = int(os.getenv("HEADLINE_FETCH_SIZE", "50"))  # articles per query per refresh
+HEADLINE_REFRESH_SECONDS = float(os.getenv("HEADLINE_REFRESH_SECONDS", "600"))
+HEADLINE_MAX_AGE_HOURS = float(os.getenv("HEADLINE_MAX_AGE_HOURS", "48"))
+HEADLINE_CORPUS_MB = float(os.getenv("HEADLINE_CORPUS_MB", "64"))
+HEADLINE_EMBED_BATCH = int(os.getenv("HEADLINE_EMBED_BATCH", "64"))
+
+
+def _article_bytes(article: dict, dim: int) -> int:
+    # Embedding row plus a rough size of the metadata strings
+    return dim * 4 + sum(len(str(value)) for value in article.values()) + 200
+
+
+class HeadlineCorpus:
+    """
+    Rolling window of recent headlines with L2-normalized embeddings.
+
+    Refreshes build a new immutable snapshot and swap it in, so searches never
+    lock. Headlines older than `max_age` seconds are expired, and the oldest are
+    dropped first when the corpus exceeds `max_bytes`.
+    """
+
+    def __init__(self, max_age: float, max_bytes: int):
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._snapshot = ([], None, [])  # articles, embeddings, fetched_at
+        self._lock = threading.Lock()  # serializes writers only
+
+    def __len__(self):
+        return len(self._snapshot[0])
+
+    def known_urls(self):
+        return {article.get("url") for article in self._snapshot[0]}
+
+    def add(self, articles, embeddings, now: float = None):
+        """
+        Merge freshly fetched articles (replacing older copies of the same URL), then expire and trim.
+        """
+        now = now or time.time()
+        embeddings = torch.nn.functional.normalize(embeddings.float(), dim=1)
+        with self._lock:
+            old_articles, old_embeddings, old_fetched = self._snapshot
+            new_urls = {article.get("url") for article in articles}
+            keep = [i for i, article in enumerate(old_articles)
+                    if article.get("url") not in new_urls and now - old_fetched[i] <= self.max_age]
+
+            merged = [old_articles[i] for i in keep] + list(articles)
+            fetched = [old_fetched[i] for i in keep] + [now] * len(articles)
+            parts = [old_embeddings[keep]] if keep else []
+            merged_embeddings = torch.cat(parts + [embeddings]) if merged else None
+            self._snapshot = self._trim(merged, merged_embeddings, fetched)
+
+    def expire(self, now: float = None):
+        now = now or time.time()
+        with self._lock:
+            articles, embeddings, fetched = self._snapshot
+            keep = [i for i in range(len(articles)) if now - fetched[i] <= self.max_age]
+            if len(keep) != len(articles):
+                self._snapshot = ([articles[i] for i in keep], embeddings[keep] if keep else None,
+                                  [fetched[i] for i in keep])
+
+    def _trim(self, articles, embeddings, fetched):
+        if not articles:
+            return [], None, []
+        dim = embeddings.shape[1]
+        sizes = [_article_bytes(article, dim) for article in articles]
+        total = sum(sizes)
+        if total <= self.max_bytes:
+            return articles, embeddings, fetched
+        # Oldest first out
+        order = sorted(range(len(articles)), key=lambda i: fetched[i], reverse=True)
+        keep = []
+        total = 0
+        for i in order:
+            if total + sizes[i] > self.max_bytes:
+                break
+            keep.append(i)
+            total += sizes[i]
+        keep.sort()
+        return [articles[i] for i in keep], embeddings[keep], [fetched[i] for i in keep]
+
+    def search(self, topic_embedding, k: int = 10):
+        """
+        Top-k articles by cosine similarity to the topic embedding, with their similarities.
+        """
+        articles, embeddings, _ = self._snapshot
+        if not articles:
+            return [], torch.empty(0)
+        similarities = embeddings @ torch.nn.functional.normalize(topic_embedding.float(), dim=0)
+        top = torch.topk(similarities, min(k, len(articles)))
+        return [articles[i] for i in top.indices.tolist()], top.values
+
+    def size_bytes(self) -> int:
+        articles, embeddings, _ = self._snapshot
+        if not articles:
+            return 0
+        return sum(_article_bytes(article, embeddings.shape[1]) for article in articles)
+
+
+headline_corpus = HeadlineCorpus(HEADLINE_MAX_AGE_HOURS * 3600, int(HEADLINE_CORPUS_MB * 1024 * 1024))
+
+
+def refresh_headlines(corpus: HeadlineCorpus = headline_corpus):
+    """
+    Pull the configured queries through search_news, embed new headlines in batches and merge them into the corpus.
+    """
+    from news_verification import search_news, encode_texts, article_text
+
+    # Background work yields to user requests at every model and search slot
+    request_priority.set(BATCH)
+    known = corpus.known_urls()
+    fresh, seen = [], set()
+    for language in HEADLINE_LANGUAGES:
+        for query in HEADLINE_QUERIES:
+            results = search_news(query, number=HEADLINE_FETCH_SIZE, language=language, collapse_duplicates=True)
+            if results.get("status") != "success":
+                inc("headline_prefetch_errors_total", help="Failed headline prefetch queries", query=query)
+                continue
+            for article in results["articles"]:
+                url = article.get("url")
+                if url and url not in seen:
+                    seen.add(url)
+                    fresh.append(article)
+
+    # Headlines already in the corpus keep their embedding; only new ones are encoded
+    new = [article for article in fresh if article.get("url") not in known]
+    with timer("headline_refresh_seconds"):
+        for start in range(0, len(new), HEADLINE_EMBED_BATCH):
+            batch = new[start:start + HEADLINE_EMBED_BATCH]
+            corpus.add(batch, encode_texts([article_text(article) for article in batch]))
+    corpus.expire()
+    inc("headline_prefetch_articles_total", len(new), help="New headlines added to the corpus")
+    return len(new)
+
+
+_stop = threading.Event()
+_thread = None
+
+
+def _run(interval: float):
+    while not _stop.is_set():
+        try:
+            added = refresh_headlines()
+            logger.info(f"Headline prefetch added {added} articles, corpus holds {len(headline_corpus)}")
+        except Exception as e:
+            logger.warning(f"Headline prefetch failed: {e}")
+        _stop.wait(interval)
+
+
+def start_headline_prefetcher(interval: float = HEADLINE_REFRESH_SECONDS):
+    """
+    Start the background refresh thread (once).
+    """
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        _stop.clear()
+        _thread = threading.Thread(target=_run, args=(interval,), name="headline-prefetch", daemon=True)
+        _thread.start()
+
+
+def stop_headline_prefetcher():
+    _stop.set()
+
+
+def _collect_gauges():
+    return [("headline_corpus_articles", {}, len(headline_corpus)),
+            ("headline_corpus_bytes", {}, headline_corpus.size_bytes())]
+
+
+register_gauges(_collect_gauges)
@@ -0,0 +1,213 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import timer, inc, cache_result
+from admission import time_left
+import rate_limiter
+
+# Shared HTTP client for the upstream APIs: one pooled keep-alive session,
+# per-endpoint timeouts, a TTL cache and single-flight request coalescing.
+# Calls that reach the network go through the provider's rate limiter, are
+# retried on 429/5xx, and are never sent once the caller's deadline has passed.
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+HTTP_CACHE_SIZE = int(os.getenv("HTTP_CACHE_SIZE", "1024"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+
+# Read timeout and cache TTL (seconds) and quota provider per named endpoint
+ENDPOINTS = {
+    "world_news_search": {
+        "provider": "world_news",
+        "timeout": float(os.getenv("WORLD_NEWS_TIMEOUT", "10")),
+        "ttl": float(os.getenv("WORLD_NEWS_CACHE_TTL", "300")),
+    },
+    "twitter_search": {
+        "provider": "twitter",
+        "timeout": float(os.getenv("TWITTER_TIMEOUT", "8")),
+        "ttl": float(os.getenv("TWITTER_CACHE_TTL", "60")),
+    },
+}
+DEFAULT_ENDPOINT = {"timeout": 10.0, "ttl": 0.0}
+
+HTTPResult = namedtuple("HTTPResult", ["status_code", "data", "headers"])
+
+session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+session.mount("https://", _adapter)
+session.mount("http://", _adapter)
+
+_cache = OrderedDict()  # key -> (expires_at, HTTPResult)
+_cache_lock = threading.Lock()
+_inflight = {}  # key -> Future shared by every concurrent caller
+_inflight_lock = threading.Lock()
+
+
+def normalize_params(params: dict) -> dict:
+    """
+    Normalize query parameters so equivalent requests share one cache entry:
+    keys sorted, None values dropped, whitespace in string values collapsed.
+    """
+    normalized = {}
+    for key in sorted(params or {}):
+        value = params[key]
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = re.sub(r"\s+", " ", value).strip()
+        normalized[key] = value
+    return normalized
+
+
+def _cache_get(key):
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            del _cache[key]
+            return None
+        _cache.move_to_end(key)
+        return result
+
+
+def _cache_put(key, result, ttl):
+    with _cache_lock:
+        _cache[key] = (time.monotonic() + ttl, result)
+        _cache.move_to_end(key)
+        while len(_cache) > HTTP_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def _local_failure(status_code: int, detail: str, reason: str) -> HTTPResult:
+    return HTTPResult(status_code, {"detail": detail, "reason": reason}, {})
+
+
+def rate_limited(result: HTTPResult) -> bool:
+    """
+    True when the call failed for lack of quota: the upstream answered 429 or
+    the client-side limiter had no token before the caller's deadline.
+    """
+    return result.status_code == 429 or (isinstance(result.data, dict) and result.data.get("reason") == "rate_limited")
+
+
+def _fetch_once(endpoint, url, params, headers, timeout):
+    with timer("http_request_seconds", endpoint=endpoint):
+        response = session.get(url, params=params, headers=headers, timeout=(HTTP_CONNECT_TIMEOUT, timeout))
+    inc("http_responses_total", endpoint=endpoint, status=response.status_code)
+    try:
+        data = response.json()
+    except ValueError:
+        data = {"detail": response.text}
+    return HTTPResult(response.status_code, data, dict(response.headers))
+
+
+def _fetch(endpoint, url, params, headers):
+    """
+    Send the request within the provider's quota, retrying 429/5xx responses and
+    connection errors with jittered backoff (Retry-After when given) while the
+    caller's deadline allows. Returns a 504 result instead of calling upstream
+    once the deadline has passed, and a 503 when no quota is left before it.
+    """
+    config = ENDPOINTS.get(endpoint, DEFAULT_ENDPOINT)
+    provider = config.get("provider")
+    result, error = None, None
+    for attempt in range(1, rate_limiter.HTTP_MAX_ATTEMPTS + 1):
+        left = time_left()
+        if left is not None and left <= 0:
+            inc("http_deadline_exceeded_total", help="Upstream calls skipped because the caller's deadline passed",
+                endpoint=endpoint)
+            return result or _local_failure(504, "Request deadline passed before the upstream call", "deadline")
+        if not rate_limiter.acquire(provider):
+            return result or _local_failure(503, f"Rate limit for {provider} exhausted, retry later", "rate_limited")
+
+        timeout = config["timeout"] if left is None else max(min(config["timeout"], left), 0.1)
+        try:
+            result = _fetch_once(endpoint, url, params, headers, timeout)
+        except requests.RequestException as e:
+            if isinstance(e, requests.Timeout) and timeout < config["timeout"]:
+                # Cut short by the caller's deadline, not an upstream failure
+                inc("http_deadline_exceeded_total", endpoint=endpoint)
+                return _local_failure(504, "Request deadline passed during the upstream call", "deadline")
+            if attempt == rate_limiter.HTTP_MAX_ATTEMPTS:
+                raise
+            result, error = None, e
+            reason, delay = "connection", rate_limiter.backoff(attempt)
+        else:
+            rate_limiter.record_response(provider, result.status_code, result.headers)
+            if result.status_code not in rate_limiter.RETRY_STATUSES or attempt == rate_limiter.HTTP_MAX_ATTEMPTS:
+                return result
+            reason, delay = str(result.status_code), rate_limiter.backoff(attempt, result.headers)
+            if result.status_code == 429 and rate_limiter.get_bucket(provider) is not None:
+                delay = 0  # the paused bucket holds the retry until the upstream's window resets
+
+        left = time_left()
+        if delay > rate_limiter.HTTP_RETRY_MAX_DELAY or (left is not None and delay >= left):
+            if result is None:
+                raise error
+            return result
+        inc("http_retries_total", help="Upstream calls retried", endpoint=endpoint, reason=reason)
+        time.sleep(delay)
+    return result
+
+
+def get_json(endpoint: str, url: str, params: dict = None, headers: dict = None) -> HTTPResult:
+    """
+    GET a JSON endpoint through the shared session.
+    Successful responses are cached for the endpoint's TTL, and concurrent calls
+    with the same normalized parameters wait on a single upstream request.
+    Waiting callers keep their own deadline, and when the shared request fails
+    only because of the first caller's deadline or lane, they retry it once.
+    """
+    params = normalize_params(params)
+    key = (endpoint, url, tuple(params.items()))
+
+    cached = _cache_get(key)
+    cache_result("http", cached is not None)
+    if cached is not None:
+        return cached
+
+    for retry in (False, True):
+        with _inflight_lock:
+            future = _inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                _inflight[key] = future
+        if leader:
+            break
+
+        inc("http_coalesced_total", endpoint=endpoint)
+        left = time_left()
+        try:
+            result = future.result(timeout=None if left is None else max(left, 0))
+        except FutureTimeout:
+            inc("http_deadline_exceeded_total", endpoint=endpoint)
+            return _local_failure(504, "Request deadline passed while waiting for the upstream call", "deadline")
+        local_failure = isinstance(result.data, dict) and result.data.get("reason") in ("deadline", "rate_limited")
+        left = time_left()
+        if retry or not local_failure or (left is not None and left <= 0):
+            return result
+
+    try:
+        result = _fetch(endpoint, url, params, headers)
+        ttl = ENDPOINTS.get(endpoint, DEFAULT_ENDPOINT)["ttl"]
+        if result.status_code == 200 and ttl > 0:
+            _cache_put(key, result, ttl)
+        future.set_result(result)
+        return result
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
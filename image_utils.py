@@ -7,24 +7,20 @@ import io
 import cv2
 import numpy as np
 import exifread
+from ocr_utils import run_ocr
+
+FACE_DETECTION_MAX_SIDE = 800  # Haar cascades don't need more resolution than this
 
 def analyze_image(file: bytes, lang: str = "eng", enable_face_detection: bool = True):
     results = {}
 
-    # 1️⃣ Load the image with PIL
+    # 1️⃣ Load the image with PIL (header only; pixels are decoded lazily)
     image = Image.open(io.BytesIO(file))
     results["format"] = image.format
     results["size"] = image.size
     results["mode"] = image.mode
 
-    # 2️⃣ OCR Text Extraction
-    try:
-        text = pytesseract.image_to_string(image, lang=lang)
-        results["text"] = text.strip() if text else "No text detected."
-    except Exception as e:
-        results["text"] = f"OCR error: {str(e)}"
-
-    # 3️⃣ EXIF Metadata
+    # 2️⃣ EXIF Metadata (exifread covers the Exif and GPS sub-IFDs, not just IFD0)
     try:
         exif_file = io.BytesIO(file)
         exif_file.seek(0)
@@ -34,11 +30,21 @@ def analyze_image(file: bytes, lang: str = "eng", enable_face_detection: bool =
     except Exception as e:
         results["exif"] = f"EXIF extraction error: {str(e)}"
 
-    # 4️⃣ Object Detection (Optional)
+    # 3️⃣ OCR Text Extraction (downscaled, binarized)
+    try:
+        text = run_ocr(file, lang=lang)
+        results["text"] = text.strip() if text else "No text detected."
+    except Exception as e:
+        results["text"] = f"OCR error: {str(e)}"
+
+    # 4️⃣ Object Detection (Optional), on a reduced-size grayscale decode
     if enable_face_detection:
         try:
-            np_image = np.array(image.convert("RGB"))
-            gray = cv2.cvtColor(np_image, cv2.COLOR_RGB2GRAY)
+            scale = min(1.0, FACE_DETECTION_MAX_SIDE / max(image.size))
+            target = (max(1, int(image.size[0] * scale)), max(1, int(image.size[1] * scale)))
+            if image.format == "JPEG":
+                image.draft("L", target)
+            gray = np.array(image.convert("L").resize(target))
             face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
             faces = face_cascade.detectMultiScale(gray, 1.3, 5)
             results["faces_detected"] = len(faces)
@@ -0,0 +1,206 @@
+import os
+import sys
+import time
+import bisect
+import threading
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+
+# In-process metrics rendered in Prometheus text format on /metrics
+METRIC_PREFIX = "news_analyzer_"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+ENABLE_PROFILER = os.getenv("ENABLE_PROFILER", "0") == "1"
+
+_lock = threading.Lock()
+_histograms = {}  # name -> {labels: [bucket counts..., overflow, sum, count]}
+_histogram_buckets = {}
+_counters = {}  # name -> {labels: value}
+_gauge_collectors = []  # callables returning [(name, labels dict, value)]
+_help = {}
+
+# Per-request timing breakdown: a dict of "kind:label" -> seconds while a request opts in
+request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def _labels_key(labels: dict):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def observe(name: str, value: float, buckets=LATENCY_BUCKETS, help: str = "", **labels):
+    """
+    Record one observation in a histogram.
+    """
+    key = _labels_key(labels)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        _histogram_buckets.setdefault(name, buckets)
+        if help:
+            _help.setdefault(name, help)
+        counts = series.get(key)
+        if counts is None:
+            counts = series[key] = [0] * (len(buckets) + 3)
+        counts[bisect.bisect_left(buckets, value)] += 1  # len(buckets) is the overflow slot
+        counts[-2] += value
+        counts[-1] += 1
+
+
+def inc(name: str, value: float = 1, help: str = "", **labels):
+    """
+    Increment a counter.
+    """
+    key = _labels_key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        if help:
+            _help.setdefault(name, help)
+        series[key] = series.get(key, 0) + value
+
+
+def cache_result(cache: str, hit: bool, count: int = 1):
+    """
+    Count a cache lookup; hit ratios are derived from these on /metrics.
+    """
+    inc("cache_requests_total", count, help="Cache lookups by cache and result",
+        cache=cache, result="hit" if hit else "miss")
+
+
+def register_gauges(collector):
+    """
+    Register a callable returning [(name, labels, value)] sampled on every scrape.
+    """
+    _gauge_collectors.append(collector)
+
+
+@contextmanager
+def timer(name: str, **labels):
+    """
+    Time a block into histogram `name` and, when the current request asked for
+    it, into the request's timing breakdown.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe(name, elapsed, **labels)
+        breakdown = request_timings.get()
+        if breakdown is not None:
+            key = ":".join(str(value) for value in labels.values()) or name
+            with _lock:
+                breakdown[key] = breakdown.get(key, 0.0) + elapsed
+
+
+def timed(name: str, **labels):
+    """
+    Decorator form of timer().
+    """
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            with timer(name, **labels):
+                return func(*args, **kwargs)
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        return wrapper
+    return decorator
+
+
+def server_timing_header(breakdown: dict) -> str:
+    """
+    Format a timing breakdown as a Server-Timing header value.
+    """
+    return ", ".join(
+        f"{key.replace(':', '.').replace(' ', '_')};dur={seconds * 1000:.1f}" for key, seconds in breakdown.items()
+    )
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def render() -> str:
+    """
+    All metrics in Prometheus text exposition format.
+    """
+    lines = []
+    with _lock:
+        histograms = {name: {k: list(v) for k, v in series.items()} for name, series in _histograms.items()}
+        counters = {name: dict(series) for name, series in _counters.items()}
+
+    for name, series in sorted(histograms.items()):
+        full_name = METRIC_PREFIX + name
+        buckets = _histogram_buckets[name]
+        if name in _help:
+            lines.append(f"# HELP {full_name} {_help[name]}")
+        lines.append(f"# TYPE {full_name} histogram")
+        for labels, counts in series.items():
+            cumulative = 0
+            for bound, count in zip(buckets, counts):
+                cumulative += count
+                lines.append(f"{full_name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{full_name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {counts[-1]}")
+            lines.append(f"{full_name}_sum{_format_labels(labels)} {counts[-2]}")
+            lines.append(f"{full_name}_count{_format_labels(labels)} {counts[-1]}")
+
+    for name, series in sorted(counters.items()):
+        full_name = METRIC_PREFIX + name
+        if name in _help:
+            lines.append(f"# HELP {full_name} {_help[name]}")
+        lines.append(f"# TYPE {full_name} counter")
+        for labels, value in series.items():
+            lines.append(f"{full_name}{_format_labels(labels)} {value}")
+
+    gauges = {}
+    for collector in _gauge_collectors:
+        for name, labels, value in collector():
+            gauges.setdefault(name, []).append((_labels_key(labels), value))
+    for name, labels, value in _cache_hit_ratios(counters.get("cache_requests_total", {})):
+        gauges.setdefault(name, []).append((_labels_key(labels), value))
+    for name, series in sorted(gauges.items()):
+        full_name = METRIC_PREFIX + name
+        lines.append(f"# TYPE {full_name} gauge")
+        for labels, value in series:
+            lines.append(f"{full_name}{_format_labels(labels)} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _cache_hit_ratios(cache_counts: dict):
+    totals, hits = Counter(), Counter()
+    for labels, value in cache_counts.items():
+        labels = dict(labels)
+        totals[labels["cache"]] += value
+        if labels["result"] == "hit":
+            hits[labels["cache"]] += value
+    return [("cache_hit_ratio", {"cache": cache}, round(hits[cache] / total, 4))
+            for cache, total in totals.items() if total]
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> str:
+    """
+    Sampling profiler: snapshot every thread's stack each `interval` for
+    `seconds` and return them in collapsed-stack format (one "frame;frame;... count"
+    line per distinct stack), ready for flamegraph.pl or speedscope.
+    """
+    samples = Counter()
+    own_thread = threading.get_ident()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            samples[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return "\n".join(f"{stack} {count}" for stack, count in samples.most_common()) + "\n"
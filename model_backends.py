@@ -0,0 +1,96 @@
+import os
+
+# Inference backend per model: "torch" (fp32, default), "int8" (dynamic quantization),
+# "onnx" (exported ONNX Runtime graph) or "stub" (tiny deterministic fakes for benchmarks),
+# e.g. MODEL_BACKENDS="summarizer=int8,zero_shot=onnx"
+DEFAULT_BACKEND = os.getenv("MODEL_BACKEND", "torch")
+MODEL_BACKENDS = dict(
+    item.split("=", 1) for item in os.getenv("MODEL_BACKENDS", "").split(",") if "=" in item
+)
+BACKENDS = ("torch", "int8", "onnx", "stub")
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", str(os.cpu_count() or 1)))
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "news_analyzer_onnx"))
+
+_ORT_CLASSES = {
+    "zero-shot-classification": "ORTModelForSequenceClassification",
+    "text-classification": "ORTModelForSequenceClassification",
+    "summarization": "ORTModelForSeq2SeqLM",
+    "text2text-generation": "ORTModelForSeq2SeqLM",
+}
+
+
+def backend_for(name: str) -> str:
+    backend = MODEL_BACKENDS.get(name, DEFAULT_BACKEND).strip()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}' for model '{name}', expected one of {BACKENDS}")
+    return backend
+
+
+def quantize_int8(model):
+    """
+    Dynamic int8 quantization of all Linear layers (weights int8, activations quantized on the fly).
+    """
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _onnx_session_options():
+    import onnxruntime
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = ONNX_THREADS
+    options.inter_op_num_threads = 1
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return options
+
+
+def _load_onnx_model(task: str, model_name: str):
+    import optimum.onnxruntime
+    model_class = getattr(optimum.onnxruntime, _ORT_CLASSES[task])
+    export_dir = os.path.join(ONNX_CACHE_DIR, model_name.replace("/", "__"))
+    options = _onnx_session_options()
+
+    # Export once, then load the saved graph on later boots
+    if os.path.isdir(export_dir):
+        return model_class.from_pretrained(export_dir, session_options=options, provider="CPUExecutionProvider")
+    model = model_class.from_pretrained(model_name, export=True, session_options=options,
+                                        provider="CPUExecutionProvider")
+    model.save_pretrained(export_dir)
+    return model
+
+
+def load_pipeline(task: str, model_name: str, backend: str = "torch"):
+    """
+    Build a transformers pipeline on the requested backend.
+    """
+    if backend == "stub":
+        from stub_models import StubPipeline
+        return StubPipeline(task)
+
+    from transformers import pipeline, AutoTokenizer
+    if backend == "onnx":
+        model = _load_onnx_model(task, model_name)
+        return pipeline(task, model=model, tokenizer=AutoTokenizer.from_pretrained(model_name))
+
+    pipe = pipeline(task, model=model_name)
+    if backend == "int8":
+        pipe.model = quantize_int8(pipe.model)
+    return pipe
+
+
+def load_sentence_transformer(model_name: str, backend: str = "torch"):
+    """
+    Load a SentenceTransformer on the requested backend.
+    """
+    if backend == "stub":
+        from stub_models import StubSentenceEncoder
+        return StubSentenceEncoder()
+
+    from sentence_transformers import SentenceTransformer
+    if backend == "onnx":
+        return SentenceTransformer(model_name, backend="onnx",
+                                   model_kwargs={"provider": "CPUExecutionProvider",
+                                                 "session_options": _onnx_session_options()})
+    model = SentenceTransformer(model_name)
+    if backend == "int8":
+        model = quantize_int8(model)
+    return model
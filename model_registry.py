@@ -0,0 +1,110 @@
+import os
+import threading
+import logging
+from model_backends import backend_for
+from model_server import server_socket_for, connect_model
+
+logger = logging.getLogger("news_analyzer")
+
+# Comma separated list of models this worker may load, e.g. "embedding,fake_news".
+# "all" (the default) enables every registered model.
+ENABLED_MODELS = os.getenv("ENABLED_MODELS", "all")
+
+
+class ModelDisabledError(RuntimeError):
+    """
+    Raised when a model is requested that is not enabled for this deployment.
+    """
+
+
+_loaders = {}
+_models = {}
+_load_locks = {}
+_registry_lock = threading.Lock()
+
+
+def is_enabled(name: str) -> bool:
+    if ENABLED_MODELS.strip().lower() == "all":
+        return True
+    return name in {m.strip() for m in ENABLED_MODELS.split(",") if m.strip()}
+
+
+def register_model(name: str, loader):
+    """
+    Register a loader for a model. The loader takes the backend name configured
+    for the model ("torch", "int8" or "onnx"). Nothing is loaded until the model
+    is first requested with get_model() or warmed up.
+    """
+    with _registry_lock:
+        _loaders[name] = loader
+        _load_locks.setdefault(name, threading.Lock())
+
+
+def get_model(name: str):
+    """
+    Return the loaded model, loading it on first use.
+    """
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    if name not in _loaders:
+        raise KeyError(f"Unknown model: {name}")
+    if not is_enabled(name):
+        raise ModelDisabledError(f"Model '{name}' is not enabled on this worker")
+
+    with _load_locks[name]:
+        model = _models.get(name)
+        if model is None:
+            socket_path = server_socket_for(name)
+            if socket_path:
+                # Weights live in the shared model server; this worker only holds a proxy
+                logger.info(f"Using model '{name}' from model server at {socket_path}")
+                model = connect_model(name, socket_path)
+            else:
+                backend = backend_for(name)
+                logger.info(f"Loading model '{name}' ({backend} backend)")
+                model = _loaders[name](backend)
+            _models[name] = model
+    return model
+
+
+def load_model(name: str, backend: str):
+    """
+    Load a fresh, uncached instance of a registered model on a given backend.
+    Used by offline tooling such as the backend comparison script.
+    """
+    return _loaders[name](backend)
+
+
+def enabled_models():
+    return [name for name in _loaders if is_enabled(name)]
+
+
+def model_status() -> dict:
+    """
+    Load state of every registered model: "loaded", "not_loaded" or "disabled".
+    """
+    status = {}
+    for name in _loaders:
+        if not is_enabled(name):
+            status[name] = "disabled"
+        else:
+            status[name] = "loaded" if name in _models else "not_loaded"
+    return status
+
+
+def is_ready() -> bool:
+    """
+    True once every enabled model has been loaded.
+    """
+    return all(name in _models for name in enabled_models())
+
+
+def warmup(names=None) -> dict:
+    """
+    Load the given (or all enabled) models now instead of on first request.
+    """
+    for name in names or enabled_models():
+        get_model(name)
+    return model_status()
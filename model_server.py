@@ -0,0 +1,285 @@
+"""
+Shared model server.
+
+Runs the models in one local process so several API workers can share a
+single copy of the weights:
+
+    python model_server.py --socket /tmp/news_analyzer_models.sock
+    MODEL_SERVER_SOCKET=/tmp/news_analyzer_models.sock uvicorn app:app --workers 8
+
+With MODEL_SERVER_SOCKET set, get_model() returns a RemoteModel proxy instead
+of loading weights. Models can be split over several servers with
+"--models embedding,fake_news" on the server and
+MODEL_SERVER_SOCKETS="embedding=/tmp/a.sock,fake_news=/tmp/a.sock" on the workers.
+
+Requests and replies are pickled over the Unix socket (protocol 5); large
+array payloads such as embedding matrices are passed out-of-band through a
+shared memory block instead of being copied through the socket.
+"""
+import os
+import sys
+import pickle
+import socket
+import struct
+import logging
+import argparse
+import threading
+import socketserver
+from multiprocessing import shared_memory, resource_tracker
+
+logger = logging.getLogger("news_analyzer")
+
+MODEL_SERVER_SOCKET = os.getenv("MODEL_SERVER_SOCKET", "")
+MODEL_SERVER_SOCKETS = dict(
+    item.split("=", 1) for item in os.getenv("MODEL_SERVER_SOCKETS", "").split(",") if "=" in item
+)
+MODEL_SERVER_TIMEOUT = float(os.getenv("MODEL_SERVER_TIMEOUT", "300"))
+SHM_MIN_BYTES = int(os.getenv("MODEL_SERVER_SHM_MIN_BYTES", str(64 * 1024)))  # smaller payloads go inline
+
+_FRAME = struct.Struct("!I")
+
+
+def server_socket_for(name: str):
+    """
+    Socket of the model server hosting a model, or None to load it in-process.
+    """
+    return MODEL_SERVER_SOCKETS.get(name, MODEL_SERVER_SOCKET).strip() or None
+
+
+def _recv_exactly(sock, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Model server connection closed")
+        data += chunk
+    return bytes(data)
+
+
+def send_message(sock, obj):
+    """
+    Send a pickled object, moving large out-of-band buffers into shared memory.
+    The receiver unlinks the block; if the frame never gets sent, we do.
+    """
+    buffers = []
+    payload = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    raw = [buffer.raw() for buffer in buffers]
+    total = sum(view.nbytes for view in raw)
+    shm_name, sizes = None, []
+    if total >= SHM_MIN_BYTES:
+        block = shared_memory.SharedMemory(create=True, size=total)
+        # Ownership passes to the receiver, so don't let our tracker unlink it at exit
+        resource_tracker.unregister(block._name, "shared_memory")
+        offset = 0
+        for view in raw:
+            block.buf[offset:offset + view.nbytes] = view
+            offset += view.nbytes
+            sizes.append(view.nbytes)
+        shm_name = block.name
+        block.close()
+    elif buffers:
+        payload = pickle.dumps(obj, protocol=5)
+    try:
+        frame = pickle.dumps((payload, shm_name, sizes), protocol=5)
+        sock.sendall(_FRAME.pack(len(frame)) + frame)
+    except BaseException:
+        if shm_name is not None:
+            _unlink_shared_memory(shm_name)
+        raise
+
+
+def _unlink_shared_memory(name: str):
+    try:
+        block = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    block.close()
+    block.unlink()
+
+
+def recv_message(sock):
+    (size,) = _FRAME.unpack(_recv_exactly(sock, _FRAME.size))
+    payload, shm_name, sizes = pickle.loads(_recv_exactly(sock, size))
+    if shm_name is None:
+        return pickle.loads(payload)
+    block = shared_memory.SharedMemory(name=shm_name)
+    try:
+        buffers, offset = [], 0
+        for nbytes in sizes:
+            buffers.append(bytearray(block.buf[offset:offset + nbytes]))
+            offset += nbytes
+    finally:
+        block.close()
+        block.unlink()
+    return pickle.loads(payload, buffers=buffers)
+
+
+class ModelServerClient:
+    """
+    Connection to one model server; each thread gets its own socket.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(MODEL_SERVER_TIMEOUT)
+            sock.connect(self.path)
+            self._local.sock = sock
+        return sock
+
+    def _drop_connection(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
+
+    def request(self, op: str, name: str, args=(), kwargs=None):
+        message = (op, name, args, kwargs or {})
+        try:
+            send_message(self._connection(), message)
+            status, result = recv_message(self._connection())
+        except socket.timeout:
+            self._drop_connection()
+            raise
+        except (OSError, ConnectionError):
+            # The server may have restarted: reconnect once
+            self._drop_connection()
+            send_message(self._connection(), message)
+            status, result = recv_message(self._connection())
+        if status == "error":
+            raise result
+        return result
+
+
+class RemoteTokenizer:
+    def __init__(self, client: ModelServerClient, name: str):
+        self._client = client
+        self._name = name
+
+    def __call__(self, *args, **kwargs):
+        return self._client.request("tokenize", self._name, args, kwargs)
+
+
+class RemoteModel:
+    """
+    Proxy for a model hosted by a model server, exposing the pipeline call,
+    SentenceTransformer.encode and the tokenizer.
+    """
+
+    def __init__(self, client: ModelServerClient, name: str, info: dict):
+        self._client = client
+        self.name = name
+        self.backend = info.get("backend")
+        self.tokenizer = RemoteTokenizer(client, name) if info.get("tokenizer") else None
+
+    def __call__(self, *args, **kwargs):
+        return self._client.request("call", self.name, args, kwargs)
+
+    def encode(self, *args, **kwargs):
+        result = self._client.request("encode", self.name, args, kwargs)
+        if kwargs.get("convert_to_tensor"):
+            import torch
+            result = torch.from_numpy(result)
+        return result
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def connect_model(name: str, path: str) -> RemoteModel:
+    """
+    Ask the server at `path` to load a model and return a proxy for it.
+    """
+    with _clients_lock:
+        client = _clients.get(path)
+        if client is None:
+            client = _clients[path] = ModelServerClient(path)
+    return RemoteModel(client, name, client.request("load", name))
+
+
+def _handle(op: str, name: str, args, kwargs):
+    from model_registry import get_model
+    from model_backends import backend_for
+    model = get_model(name)
+    if op == "load":
+        return {"backend": backend_for(name), "tokenizer": getattr(model, "tokenizer", None) is not None}
+    if op == "call":
+        return model(*args, **kwargs)
+    if op == "encode":
+        result = model.encode(*args, **kwargs)
+        # Tensors go back as numpy arrays, which pickle out-of-band into shared memory
+        return result.cpu().numpy() if hasattr(result, "cpu") else result
+    if op == "tokenize":
+        return dict(model.tokenizer(*args, **kwargs))
+    raise ValueError(f"Unknown model server operation: {op}")
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                op, name, args, kwargs = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                reply = ("ok", _handle(op, name, args, kwargs))
+            except Exception as e:
+                reply = ("error", e)
+            try:
+                send_message(self.request, reply)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                try:
+                    send_message(self.request, ("error", RuntimeError(str(reply[1]))))
+                except (ConnectionError, OSError):
+                    return
+            except (ConnectionError, OSError):
+                return  # client went away; send_message already released the shared memory
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(path: str, warm: bool = True):
+    """
+    Serve the registered models on a Unix socket until interrupted.
+    """
+    import model_utils  # noqa: F401  (registers zero_shot, summarizer, interpreter)
+    import fake_news_classifier  # noqa: F401
+    import news_verification  # noqa: F401
+    from model_registry import warmup, enabled_models
+
+    if warm:
+        warmup()
+    if os.path.exists(path):
+        os.unlink(path)
+    server = ModelServer(path, _RequestHandler)
+    os.chmod(path, 0o600)
+    logger.info(f"Model server listening on {path} with {', '.join(enabled_models())}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Host the news analyzer models for local API workers")
+    parser.add_argument("--socket", default=MODEL_SERVER_SOCKET or "/tmp/news_analyzer_models.sock")
+    parser.add_argument("--models", help="Comma separated models to host (default: all enabled)")
+    parser.add_argument("--lazy", action="store_true", help="Load models on first request instead of at start")
+    args = parser.parse_args()
+
+    # The server loads the weights itself rather than proxying to another server
+    os.environ.pop("MODEL_SERVER_SOCKET", None)
+    os.environ.pop("MODEL_SERVER_SOCKETS", None)
+    if args.models:
+        os.environ["ENABLED_MODELS"] = args.models
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(serve(args.socket, warm=not args.lazy))
@@ -1,24 +1,209 @@
-from transformers import pipeline
+import os
+from batching import MicroBatcher
+from model_registry import register_model, get_model
+from model_backends import load_pipeline
+from admission import limit
+from metrics import timer
+from zero_shot_engine import ZeroShotEngine
+from cascade import CASCADE_MODE, CASCADE_CLASSIFY_CONFIDENCE, prototype_classify, record_tier
 
-# Load ML pipelines
-zero_shot_classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
-summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-interpreter = pipeline("text2text-generation", model="google/flan-t5-base")
 
-def classify_news(text):
-    labels = ["biased", "factual", "opinionated", "fake"]
-    result = zero_shot_classifier(text, labels)
+def _pipeline(task, model):
+    # transformers is only imported when a model is actually loaded
+    return lambda backend: load_pipeline(task, model, backend)
+
+def _zero_shot(backend):
+    # Single-pass engine over bart-large-mnli (the plain pipeline where it can't drive the model)
+    return ZeroShotEngine.wrap(load_pipeline("zero-shot-classification", "facebook/bart-large-mnli", backend))
+
+# ML pipelines, loaded lazily through the model registry
+register_model("zero_shot", _zero_shot)
+register_model("summarizer", _pipeline("summarization", "facebook/bart-large-cnn"))
+register_model("interpreter", _pipeline("text2text-generation", "google/flan-t5-base"))
+
+NEWS_LABELS = ["biased", "factual", "opinionated", "fake"]
+
+# Long-document mode: token-aware map-reduce summarization and prompt fitting
+LONG_DOCUMENT_MODE = os.getenv("LONG_DOCUMENT_MODE", "1") == "1"
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "900"))  # bart-large-cnn reads 1024
+SUMMARY_CHUNK_OVERLAP = int(os.getenv("SUMMARY_CHUNK_OVERLAP", "64"))
+SUMMARY_MAX_CHUNKS = int(os.getenv("SUMMARY_MAX_CHUNKS", "6"))
+INTERPRET_MAX_TOKENS = 512  # flan-t5 input limit
+CHARS_PER_TOKEN_BOUND = 10  # generous upper bound, used to avoid tokenizing text we'd throw away
+
+
+def _classify_batch(items):
+    """
+    Classify (text, labels) items; texts sharing a label set go through one call.
+    """
+    zero_shot_classifier = get_model("zero_shot")
+    groups = {}
+    for i, (_, labels) in enumerate(items):
+        groups.setdefault(labels, []).append(i)
+    outputs = [None] * len(items)
+    for labels, positions in groups.items():
+        texts = [items[i][0] for i in positions]
+        results = zero_shot_classifier(texts, list(labels), batch_size=len(texts))
+        for i, result in zip(positions, [results] if isinstance(results, dict) else results):
+            outputs[i] = result
+    return outputs
+
+def _label_set(labels):
+    return tuple(labels) if labels else tuple(NEWS_LABELS)
+
+def _token_spans(text, tokenizer, max_tokens):
+    """
+    Character offsets of the tokens of `text`, tokenizing at most roughly `max_tokens`.
+    """
+    text = text[:max_tokens * CHARS_PER_TOKEN_BOUND]
+    encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+    return text, encoding["offset_mapping"]
+
+def chunk_text(text, tokenizer, chunk_tokens=None, overlap=None, max_chunks=None):
+    """
+    Split text into overlapping chunks of at most `chunk_tokens` tokens, keeping
+    at most `max_chunks` chunks. Chunks are cut from the original text by token
+    offsets, so nothing is re-decoded.
+    """
+    chunk_tokens = chunk_tokens or SUMMARY_CHUNK_TOKENS
+    overlap = SUMMARY_CHUNK_OVERLAP if overlap is None else overlap
+    max_chunks = max_chunks or SUMMARY_MAX_CHUNKS
+    step = chunk_tokens - overlap
+
+    text, offsets = _token_spans(text, tokenizer, step * max_chunks + overlap)
+    if len(offsets) <= chunk_tokens:
+        return [text]
+
+    chunks = []
+    for start in range(0, len(offsets), step):
+        end = min(start + chunk_tokens, len(offsets))
+        chunks.append(text[offsets[start][0]:offsets[end - 1][1]])
+        if end == len(offsets) or len(chunks) == max_chunks:
+            break
+    return chunks
+
+def fit_to_tokens(text, tokenizer, max_tokens):
+    """
+    Cut text down to at most `max_tokens` tokens.
+    """
+    text, offsets = _token_spans(text, tokenizer, max_tokens)
+    if len(offsets) <= max_tokens:
+        return text
+    return text[:offsets[max_tokens - 1][1]]
+
+def _summarize_batch(texts):
+    summarizer = get_model("summarizer")
+    return summarizer(texts, batch_size=len(texts), max_length=100, min_length=30, do_sample=False)
+
+def _interpret_batch(prompts):
+    interpreter = get_model("interpreter")
+    return interpreter(prompts, batch_size=len(prompts), max_length=256, do_sample=False)
+
+# Concurrent requests are grouped into one forward pass per pipeline
+classify_batcher = MicroBatcher(_classify_batch, name="zero_shot")
+summarize_batcher = MicroBatcher(_summarize_batch, name="summarizer")
+interpret_batcher = MicroBatcher(_interpret_batch, name="interpreter")
+
+def _format_classification(result, tier="zero_shot"):
     return {
         "labels": result["labels"],
-        "scores": result["scores"]
+        "scores": result["scores"],
+        "tier": tier
     }
 
+def _prototype_answers(items):
+    """
+    Cascade first tier: {index: classification} for the (text, labels) items the
+    MiniLM prototype head is confident about. The rest go to bart-large-mnli.
+    """
+    groups = {}
+    for i, (_, labels) in enumerate(items):
+        groups.setdefault(labels, []).append(i)
+    answers = {}
+    with timer("model_call_seconds", model="prototype_head"):
+        for labels, positions in groups.items():
+            results = prototype_classify([items[i][0] for i in positions], labels)
+            for i, (result, confidence) in zip(positions, results):
+                if confidence >= CASCADE_CLASSIFY_CONFIDENCE:
+                    answers[i] = {**result, "tier": "embedding"}
+    record_tier("zero_shot", "embedding", len(answers))
+    record_tier("zero_shot", "zero_shot", len(items) - len(answers))
+    return answers
+
+def zero_shot_classify(text, labels=None):
+    """
+    Zero-shot classification with bart-large-mnli, bypassing the cascade.
+    """
+    with timer("model_call_seconds", model="zero_shot"), limit("zero_shot"):
+        return _format_classification(classify_batcher((text, _label_set(labels))))
+
+def classify_news(text, labels=None):
+    """
+    Zero-shot classification of a text over `labels` (NEWS_LABELS by default).
+    In cascade mode the MiniLM prototype head answers when it is confident enough.
+    """
+    if CASCADE_MODE:
+        answer = _prototype_answers([(text, _label_set(labels))]).get(0)
+        if answer is not None:
+            return answer
+    return zero_shot_classify(text, labels)
+
+def classify_news_batch(texts, label_sets=None):
+    """
+    Classify many texts; label_sets optionally gives each text its own labels.
+    """
+    label_sets = label_sets or [None] * len(texts)
+    items = [(text, _label_set(labels)) for text, labels in zip(texts, label_sets)]
+    outputs = _prototype_answers(items) if CASCADE_MODE else {}
+    escalated = [i for i in range(len(items)) if i not in outputs]
+    if escalated:
+        with timer("model_call_seconds", model="zero_shot"), limit("zero_shot"):
+            for i, result in zip(escalated, _classify_batch([items[i] for i in escalated])):
+                outputs[i] = _format_classification(result)
+    return [outputs[i] for i in range(len(items))]
+
 def summarize_news(text):
-    summary = summarizer(text, max_length=100, min_length=30, do_sample=False)
-    return summary[0]["summary_text"]
+    with timer("model_call_seconds", model="summarizer"), limit("summarizer"):
+        if LONG_DOCUMENT_MODE:
+            chunks = chunk_text(text, get_model("summarizer").tokenizer)
+            if len(chunks) > 1:
+                return _summarize_long(chunks)
+        summary = summarize_batcher(text)
+        return summary["summary_text"]
 
-def interpret_news(text):
-    prompt = f"""
+def _summarize_long(chunks):
+    """
+    Map-reduce summary: summarize all chunks as one batch, then summarize the
+    concatenated chunk summaries.
+    """
+    futures = [summarize_batcher.submit(chunk) for chunk in chunks]
+    partial_summaries = " ".join(future.result()["summary_text"] for future in futures)
+    return summarize_batcher(partial_summaries)["summary_text"]
+
+def summarize_news_batch(texts):
+    with timer("model_call_seconds", model="summarizer"), limit("summarizer"):
+        return _summarize_news_batch(texts)
+
+def _summarize_news_batch(texts):
+    if not LONG_DOCUMENT_MODE:
+        return [summary["summary_text"] for summary in _summarize_batch(texts)]
+
+    tokenizer = get_model("summarizer").tokenizer
+    chunked = [chunk_text(text, tokenizer) for text in texts]
+    short = [i for i, chunks in enumerate(chunked) if len(chunks) == 1]
+    summaries = [None] * len(texts)
+    for i, summary in zip(short, _summarize_batch([texts[i] for i in short]) if short else []):
+        summaries[i] = summary["summary_text"]
+    for i, chunks in enumerate(chunked):
+        if len(chunks) > 1:
+            summaries[i] = _summarize_long(chunks)
+    return summaries
+
+def _interpret_prompt(text):
+    if LONG_DOCUMENT_MODE:
+        # Leave room for the instructions so truncation never cuts off the format
+        text = fit_to_tokens(text, get_model("interpreter").tokenizer, INTERPRET_MAX_TOKENS - 96)
+    return f"""
     Analyze the tone, intent, and reliability of this news:\n"{text}"\n\n
     Format:\n
     - Tone: [Sarcastic / Neutral / Confusing / Emotional]\n
@@ -26,5 +211,12 @@ def interpret_news(text):
     - Legitimacy: [Likely True / Likely Fake]\n
     - Summary: <short line>
     """
-    result = interpreter(prompt, max_length=256, do_sample=False)
-    return result[0]["generated_text"]
+
+def interpret_news(text):
+    with timer("model_call_seconds", model="interpreter"), limit("interpreter"):
+        result = interpret_batcher(_interpret_prompt(text))
+        return result["generated_text"]
+
+def interpret_news_batch(texts):
+    with timer("model_call_seconds", model="interpreter"), limit("interpreter"):
+        return [result["generated_text"] for result in _interpret_batch([_interpret_prompt(text) for text in texts])]
@@ -0,0 +1,118 @@
+import os
+import re
+import zlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# MinHash + banded LSH for collapsing syndicated copies of the same story
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16  # 16 bands x 4 rows: candidates from roughly 0.5 Jaccard upwards
+SHINGLE_SIZE = 3
+DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", "0.6"))
+NEAR_DUPLICATE_INDEX_SIZE = int(os.getenv("NEAR_DUPLICATE_INDEX_SIZE", "20000"))
+
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.RandomState(1)
+_perm_a = _rng.randint(1, (1 << 31) - 1, size=MINHASH_PERMUTATIONS).astype(np.uint64)
+_perm_b = _rng.randint(0, (1 << 31) - 1, size=MINHASH_PERMUTATIONS).astype(np.uint64)
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """
+    MinHash signature of the word shingles of a text.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # (a * h + b) mod p for every permutation/shingle pair, then the min per permutation
+    return ((np.outer(_perm_a, hashes) + _perm_b[:, None]) % _MERSENNE_PRIME).min(axis=1)
+
+
+def _bands(signature: np.ndarray):
+    rows = MINHASH_PERMUTATIONS // LSH_BANDS
+    return [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(LSH_BANDS)]
+
+
+class NearDuplicateIndex:
+    """
+    Banded LSH index over MinHash signatures, bounded to `max_items` with LRU eviction.
+    Each entry keeps a payload (the canonical text of the story it represents).
+    """
+
+    def __init__(self, max_items: int = NEAR_DUPLICATE_INDEX_SIZE, threshold: float = DUPLICATE_THRESHOLD):
+        self.max_items = max_items
+        self.threshold = threshold
+        self._entries = OrderedDict()  # id -> (signature, payload)
+        self._buckets = {}  # (band, band bytes) -> set of ids
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _find(self, signature):
+        candidates = set()
+        for band in _bands(signature):
+            candidates |= self._buckets.get(band, set())
+        best_id, best_similarity = None, self.threshold
+        for entry_id in candidates:
+            similarity = float(np.mean(self._entries[entry_id][0] == signature))
+            if similarity >= best_similarity:
+                best_id, best_similarity = entry_id, similarity
+        return best_id
+
+    def _evict(self):
+        entry_id, (signature, _) = self._entries.popitem(last=False)
+        for band in _bands(signature):
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[band]
+
+    def lookup_or_add(self, signature, payload):
+        """
+        Return (entry id, canonical payload) of the matching story, adding a new
+        entry with `payload` if none matches.
+        """
+        with self._lock:
+            entry_id = self._find(signature)
+            if entry_id is not None:
+                self._entries.move_to_end(entry_id)
+                return entry_id, self._entries[entry_id][1]
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (signature, payload)
+            for band in _bands(signature):
+                self._buckets.setdefault(band, set()).add(entry_id)
+            while len(self._entries) > self.max_items:
+                self._evict()
+            return entry_id, payload
+
+
+# Shared across requests so repeat stories are recognised cheaply
+near_duplicate_index = NearDuplicateIndex()
+
+
+def collapse_near_duplicates(articles, index: NearDuplicateIndex = None):
+    """
+    Collapse near-duplicate articles, keeping the first copy of each story.
+    Each kept article gets "cluster_size" (number of copies in this result set)
+    and "canonical_text", the text of the first copy ever seen, so embeddings
+    can be reused across requests.
+    """
+    index = near_duplicate_index if index is None else index  # an empty index is falsy
+    representatives = OrderedDict()  # entry id -> article
+    for article in articles:
+        text = f"{article.get('title', '')}. {article.get('description', '')}"
+        entry_id, canonical_text = index.lookup_or_add(minhash_signature(text), text)
+        if entry_id in representatives:
+            representatives[entry_id]["cluster_size"] += 1
+        else:
+            representatives[entry_id] = {**article, "cluster_size": 1, "canonical_text": canonical_text}
+    return list(representatives.values())
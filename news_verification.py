@@ -1,15 +1,27 @@
 import os
+import hashlib
+import threading
 import tweepy
-import requests
-from datetime import datetime, timedelta
+import torch
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from typing import Optional
-from sentence_transformers import SentenceTransformer, util
-from source_credibility import SOURCE_CREDIBILITY
+from credibility_index import source_credibility
 from urllib.parse import urlparse
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 from twitter_utils import get_social_signals
 from fake_news_classifier import classify_fake_news
+from executors import io_executor, submit_in_context
+from admission import limit, Overloaded
+from metrics import timer, timed, cache_result
+from http_client import get_json, rate_limited
+from model_registry import register_model, get_model
+from model_backends import load_sentence_transformer
+from article_index import get_article_index
+from near_duplicates import collapse_near_duplicates
+from headline_prefetcher import headline_corpus
+from request_graph import stage
 
 
 sentiment_analyzer = SentimentIntensityAnalyzer()
@@ -20,6 +32,7 @@ load_dotenv()
 
 # News API setup
 WORLD_NEWS_API_KEY = "32519525455b4abf89df7850efd42ed3"  # World News API key
+WORLD_NEWS_API_URL = os.getenv("WORLD_NEWS_API_URL", "https://api.worldnewsapi.com")
 
 def analyze_sentiment(text: str) -> dict:
     """
@@ -38,12 +51,19 @@ def analyze_sentiment(text: str) -> dict:
 
 
 
-def search_news(query: str, offset: int = 0, number: int = 10, language: str = "en"):
+NO_CONTENT = "Full content not available"
+
+@stage("news_search")
+@timed("stage_seconds", stage="news_search")
+def search_news(query: str, offset: int = 0, number: int = 10, language: str = "en",
+                collapse_duplicates: bool = False):
     """
-    Search news articles using the World News API search endpoint
+    Search news articles using the World News API search endpoint.
+    With collapse_duplicates, near-duplicate (syndicated) copies are collapsed
+    into one article carrying a "cluster_size" before sentiment scoring.
     """
     try:
-        base_url = "https://api.worldnewsapi.com/search-news"
+        base_url = f"{WORLD_NEWS_API_URL}/search-news"
         
         params = {
             "api-key": WORLD_NEWS_API_KEY,
@@ -53,26 +73,43 @@ def search_news(query: str, offset: int = 0, number: int = 10, language: str = "
             "language": language
         }
         
-        response = requests.get(base_url, params=params)
-        data = response.json()
+        response = get_json("world_news_search", base_url, params=params)
+        data = response.data
         
         if response.status_code == 200 and "news" in data:
+            articles = [{
+                "title": article.get("title", "No title"),
+                "description": article.get("text", "No description available"),
+                "source": article.get("source") or article.get("author", "unknown"),
+                "url": article.get("url", ""),
+                "publishedAt": article.get("publish_date", "Unknown date"),
+                "content": article.get("text", NO_CONTENT)
+            } for article in data.get("news", [])]
+            fetched = len(articles)
+
+            if collapse_duplicates:
+                articles = collapse_near_duplicates(articles)
+            for article in articles:
+                article["sentiment"] = analyze_sentiment(article["content"] if article["content"] != NO_CONTENT else "")
+
             return {
                 "status": "success",
                 "total_results": data.get("available", 0),
-                "articles": [{
-                    "title": article.get("title", "No title"),
-                    "description": article.get("text", "No description available"),
-                    "source": article.get("source") or article.get("author", "unknown"),
-                    "url": article.get("url", ""),
-                    "publishedAt": article.get("publish_date", "Unknown date"),
-                    "content": article.get("text", "Full content not available"),
-                    "sentiment": analyze_sentiment(article.get("text", ""))
-                } for article in data.get("news", [])]
+                "fetched_results": fetched,
+                "articles": articles
+            }
+        elif rate_limited(response):
+            return {
+                "status": "error",
+                "status_code": response.status_code,
+                "rate_limited": True,
+                "message": "News API rate limit reached, retry later",
+                "raw_response": data
             }
         else:
             return {
                 "status": "error",
+                "status_code": response.status_code,
                 "message": "Failed to fetch news",
                 "raw_response": data
             }
@@ -93,63 +130,234 @@ def extract_domain(url: str) -> str:
     except Exception:
         return "unknown"
 
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+def _load_embedding_model(backend):
+    return load_sentence_transformer('all-MiniLM-L6-v2', backend)
+
+register_model("embedding", _load_embedding_model)
+
+# Verification is answered from the local article index when it has at least this many relevant articles
+LOCAL_MIN_MATCHES = int(os.getenv("LOCAL_MIN_MATCHES", "3"))
+
+# LRU cache of sentence embeddings keyed by a hash of the text, so headlines
+# that come back for many topics are only ever encoded once.
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+_embedding_cache = OrderedDict()
+_embedding_cache_lock = threading.Lock()
+
+def _text_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def encode_texts(texts, cache: bool = True):
+    """
+    Encode a list of texts with the embedding model, reusing cached embeddings.
+    All cache misses are encoded together in a single batched forward pass.
+    With cache=False the cache is neither read nor filled (for one-off texts
+    such as full article bodies). Returns a tensor of shape (len(texts), embedding_dim).
+    """
+    if not cache:
+        with timer("model_call_seconds", model="embedding"), limit("embedding"):
+            return get_model("embedding").encode(list(texts), convert_to_tensor=True)
+
+    keys = [_text_key(text) for text in texts]
+    embeddings = [None] * len(texts)
+    missing = OrderedDict()  # key -> positions that need this embedding
+
+    with _embedding_cache_lock:
+        for i, key in enumerate(keys):
+            cached = _embedding_cache.get(key)
+            if cached is not None:
+                _embedding_cache.move_to_end(key)
+                embeddings[i] = cached
+            else:
+                missing.setdefault(key, []).append(i)
+
+    cache_result("embedding", True, len(texts) - sum(len(positions) for positions in missing.values()))
+    cache_result("embedding", False, sum(len(positions) for positions in missing.values()))
+
+    if missing:
+        batch = [texts[positions[0]] for positions in missing.values()]
+        with timer("model_call_seconds", model="embedding"), limit("embedding"):
+            encoded = get_model("embedding").encode(batch, convert_to_tensor=True)
+        with _embedding_cache_lock:
+            for (key, positions), embedding in zip(missing.items(), encoded):
+                # Clone so a cached row does not keep the whole batch tensor alive
+                embedding = embedding.clone()
+                for i in positions:
+                    embeddings[i] = embedding
+                _embedding_cache[key] = embedding
+                _embedding_cache.move_to_end(key)
+            while len(_embedding_cache) > EMBEDDING_CACHE_SIZE:
+                _embedding_cache.popitem(last=False)
+
+    return torch.stack(embeddings)
+
+def article_text(article: dict) -> str:
+    """
+    Text embedded for an article: the canonical text of its near-duplicate cluster, else title and description.
+    """
+    return article.get("canonical_text") or f"{article.get('title', '')}. {article.get('description', '')}"
+
+def index_articles(articles, embeddings=None):
+    """
+    Add articles to the local article index (no-op when the index is disabled).
+    Articles need title/description/source/url/publishedAt; missing embeddings are computed.
+    """
+    index = get_article_index()
+    if index is None or not articles:
+        return 0
+    if embeddings is None:
+        embeddings = encode_texts([f"{a.get('title', '')}. {a.get('description', '')}" for a in articles])
+    return index.add(articles, embeddings.cpu().numpy())
+
+def _published_at(article: dict):
+    """
+    An article's publish time as a naive UTC datetime, or None if it is missing or unparseable.
+    """
+    try:
+        published = datetime.fromisoformat(str(article.get("publishedAt", "")).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if published.tzinfo is not None:
+        published = published.astimezone(timezone.utc).replace(tzinfo=None)
+    return published
+
+def _search_local_index(topic: str, similarity_threshold: float, days_back: int = 7, exclude_urls=(), k: int = 10):
+    """
+    Top-k articles for the topic from the local index, with their similarities.
+    Only articles published within `days_back` days and not in `exclude_urls` count.
+    Returns (None, None) if the index is disabled or has too few relevant articles.
+    """
+    index = get_article_index()
+    if index is None or len(index) == 0:
+        return None, None
+    topic_embedding = encode_texts([topic])[0].cpu().numpy()
+    # Over-fetch: old articles and the excluded ones are dropped below
+    articles, _, similarities = index.search(topic_embedding, k=k * 4)
+    oldest = datetime.utcnow() - timedelta(days=days_back)
+    keep = [i for i, article in enumerate(articles)
+            if article.get("url") not in exclude_urls
+            and (_published_at(article) or datetime.min) >= oldest][:k]
+    articles, similarities = [articles[i] for i in keep], similarities[keep]
+    if int((similarities >= similarity_threshold).sum()) < LOCAL_MIN_MATCHES:
+        return None, None
+    return articles, torch.from_numpy(similarities)
+
+def _search_headline_corpus(topic: str, similarity_threshold: float, exclude_urls=(), k: int = 10):
+    """
+    Top-k articles for the topic from the prefetched headline corpus, with their similarities.
+    Returns (None, None) if the corpus is empty or has too few relevant articles.
+    """
+    if len(headline_corpus) == 0:
+        return None, None
+    articles, similarities = headline_corpus.search(encode_texts([topic])[0], k=k)
+    keep = [i for i, article in enumerate(articles) if article.get("url") not in exclude_urls]
+    articles, similarities = [articles[i] for i in keep], similarities[keep]
+    if int((similarities >= similarity_threshold).sum()) < LOCAL_MIN_MATCHES:
+        return None, None
+    return articles, similarities
 
-def verify_news_topic(topic: str, days_back: int = 7, similarity_threshold: float = 0.5):
+@stage("verification")
+@timed("stage_seconds", stage="verification")
+def verify_news_topic(topic: str, days_back: int = 7, similarity_threshold: float = 0.5,
+                      search_results: Optional[dict] = None, social_signals: Optional[dict] = None,
+                      exclude_urls=()):
     """
     Verify a news topic against current and recent news using semantic similarity and source credibility.
+    Already fetched search_news / get_social_signals results for the topic can be passed in.
+    Articles at `exclude_urls` (the article being analyzed) never corroborate it.
     """
     try:
-        search_results = search_news(topic)  # Removed days_back because your current search_news() doesn’t use it
+        # Twitter and the news search are independent, so overlap the two calls
+        social_future = None
+        if social_signals is None:
+            social_future = submit_in_context(io_executor, get_social_signals, topic)
 
-        if search_results["status"] != "success":
-            return {
-                "status": "error",
-                "message": "Could not verify against news sources"
-            }
+        # Try the local article index first, fall back to the World News API
+        articles, similarities = None, None
+        if search_results is None:
+            articles, similarities = _search_local_index(topic, similarity_threshold, days_back, exclude_urls)
+        verified_with = "local_index"
+        if articles is None and search_results is None:
+            articles, similarities = _search_headline_corpus(topic, similarity_threshold, exclude_urls)
+            verified_with = "headline_corpus"
+        if articles is None:
+            verified_with = "news_api"
+            # Removed days_back because your current search_news() doesn’t use it
+            if search_results is None:
+                search_results = search_news(topic, collapse_duplicates=True)
+
+            if search_results["status"] != "success":
+                if social_future is not None:
+                    social_future.cancel()
+                if search_results.get("rate_limited"):
+                    return {
+                        "status": "error",
+                        "rate_limited": True,
+                        "message": "Could not verify against news sources: news API rate limit reached, retry later"
+                    }
+                return {
+                    "status": "error",
+                    "message": "Could not verify against news sources"
+                }
+            articles = [article for article in search_results["articles"] if article.get("url") not in exclude_urls]
 
-        articles = search_results["articles"]
+        # Unique stories; syndicated copies are counted in each article's cluster_size
         total_matches = len(articles)
+        raw_matches = sum(article.get("cluster_size", 1) for article in articles)
 
-        topic_embedding = embedding_model.encode(topic, convert_to_tensor=True)
+        texts = [f"{article.get('title', '')}. {article.get('description', '')}" for article in articles]
+        domains = [extract_domain(article.get('url', 'unknown')) for article in articles]
+        source_scores = [source_credibility(article.get('url', '')) for article in articles]  # Default to 0.5 if unknown
 
         relevant_articles = []
-        source_scores = []
+        relevant_matches = 0
+        if articles:
+            if similarities is None:
+                # One batched encode for topic + articles, then a single matrix similarity.
+                # Near-duplicates of stories seen before reuse that story's cached embedding.
+                embeddings = encode_texts([topic] + [article_text(article) for article in articles])
+                # Persisting is off the request path; the index only feeds later verifications
+                io_executor.submit(index_articles, articles, embeddings[1:])
+                embeddings = torch.nn.functional.normalize(embeddings, dim=1)
+                similarities = embeddings[1:] @ embeddings[0]
 
-        for article in articles:
-            text = f"{article.get('title', '')}. {article.get('description', '')}"
-            article_embedding = embedding_model.encode(text, convert_to_tensor=True)
-            similarity = util.pytorch_cos_sim(topic_embedding, article_embedding).item()
+            # Vectorized thresholding and ranking (most similar first)
+            relevant = torch.nonzero(similarities >= similarity_threshold).flatten()
+            ranked = relevant[torch.argsort(similarities[relevant], descending=True)]
+            relevant_matches = len(ranked)
 
-            domain = extract_domain(article.get('url', 'unknown'))
-            credibility = SOURCE_CREDIBILITY.get(domain, 0.5)  # Default to 0.5 if unknown
-            source_scores.append(credibility)
-
-            sentiment = analyze_sentiment(text)
-
-            if similarity >= similarity_threshold:
+            # Only the top 5 are returned, so only those get sentiment-scored;
+            # articles from search_news already carry their score
+            for i in ranked[:5].tolist():
+                article = articles[i]
+                similarity = similarities[i].item()
                 relevant_articles.append({
                     "title": article["title"],
-                    "source": article.get("source") or article.get("author") or domain,
+                    "source": article.get("source") or article.get("author") or domains[i],
                     "url": article["url"],
                     "published_at": article["publishedAt"],
                     "description": article.get("description", ""),
                     "similarity_score": round(similarity, 2),
-                    "source_credibility": credibility,
-                    "sentiment": sentiment,
+                    "source_credibility": source_scores[i],
+                    "sentiment": article.get("sentiment") or analyze_sentiment(texts[i]),
+                    "cluster_size": article.get("cluster_size", 1),
                     "relevance": "High" if similarity > 0.7 else "Medium"
                 })
 
         avg_source_credibility = round(sum(source_scores) / len(source_scores), 2) if source_scores else 0.5
 
-        # Now get social signals from Twitter for the same topic
-        social_signals = get_social_signals(topic)
+        # Social signals from Twitter for the same topic (fetched in the background above)
+        if social_future is not None:
+            social_signals = social_future.result()
 
         # Calculate social score from tweets (likes + retweets), normalize roughly to 0-1 scale
         social_score = 0
         if social_signals.get("status") == "success":
-            tweets = social_signals.get("tweets", [])
-            social_engagement = sum(tweet["likes"] + tweet["retweets"] for tweet in tweets[:10])  # top 10 tweets
+            # The social aggregator keeps the top-10 engagement sum up to date
+            social_engagement = social_signals.get("top_engagement")
+            if social_engagement is None:
+                tweets = social_signals.get("tweets", [])
+                social_engagement = sum(tweet["likes"] + tweet["retweets"] for tweet in tweets[:10])  # top 10 tweets
             social_score = min(social_engagement / 500, 1.0)  # Example normalization factor
 
         # Combine news credibility and social score (weights can be adjusted)
@@ -165,10 +373,12 @@ def verify_news_topic(topic: str, days_back: int = 7, similarity_threshold: floa
 
         return {
              "status": "success",
-             "found_matches": len(relevant_articles) > 0,
-             "related_articles": sorted(relevant_articles, key=lambda x: x["similarity_score"], reverse=True)[:5],
+             "verified_with": verified_with,
+             "found_matches": relevant_matches > 0,
+             "related_articles": relevant_articles,
              "total_matches": total_matches,
-             "relevant_matches": len(relevant_articles),
+             "raw_matches": raw_matches,
+             "relevant_matches": relevant_matches,
              "avg_source_credibility": avg_source_credibility,
              "social_signals": social_signals,
              "social_score": round(social_score, 2),
@@ -176,19 +386,24 @@ def verify_news_topic(topic: str, days_back: int = 7, similarity_threshold: floa
              "assessment": assessment
         }
 
+    except Overloaded:
+        raise
     except Exception as e:
         return {
             "status": "error",
             "message": f"Error during verification: {str(e)}"
         }
 
-def analyze_news_credibility(text: str, topic: str):
+def analyze_news_credibility(text: str, topic: str, verification: Optional[dict] = None,
+                             fake_news_result: Optional[dict] = None):
     """
     Analyze news credibility by comparing with current and recent news
     and apply fake news detection classifier.
+    Already computed verification / fake news results can be passed in.
     """
     # Get verification from news sources
-    verification = verify_news_topic(topic)
+    if verification is None:
+        verification = verify_news_topic(topic)
     
     if verification["status"] == "success":
         # Calculate credibility score based on matches and relevance
@@ -212,7 +427,8 @@ def analyze_news_credibility(text: str, topic: str):
             message = "Limited or no coverage found in reliable sources"
         
         # 🔥 Add fake news classification
-        fake_news_result = classify_fake_news(text)
+        if fake_news_result is None:
+            fake_news_result = classify_fake_news(text)
         
         return {
             "credibility_score": credibility_score,
@@ -222,6 +438,12 @@ def analyze_news_credibility(text: str, topic: str):
             "fake_news_detection": fake_news_result
         }
     
+    if verification.get("rate_limited"):
+        return {
+            "status": "error",
+            "rate_limited": True,
+            "message": verification["message"]
+        }
     return {
         "status": "error",
         "message": verification["message"]
@@ -231,7 +453,8 @@ def get_comprehensive_analysis(topic, text):
     Get comprehensive analysis including related tweets and news verification
     """
     news_verification = verify_news_topic(topic)
-    social_signals = get_social_signals(topic)
+    # Verification already fetched the tweets for this topic
+    social_signals = news_verification.get("social_signals") or get_social_signals(topic)
     
     return {
         "topic": topic,
@@ -0,0 +1,167 @@
+import os
+import asyncio
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from PIL import Image, ImageOps
+import pytesseract
+from metrics import timer, cache_result
+
+# OCR runs in worker processes so tesseract never blocks the event loop
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+OCR_LANG = os.getenv("OCR_LANG", "eng+hin")
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "2400"))  # px; screenshots rarely need more
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", "2048"))
+# Max Hamming distance between 256-bit perceptual hashes to reuse another image's text.
+# 0 (the default) disables near matches: screenshots with different text can be a few bits apart.
+OCR_PERCEPTUAL_DISTANCE = int(os.getenv("OCR_PERCEPTUAL_DISTANCE", "0"))
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}  # EXIF orientations that swap width and height
+
+
+def _otsu_threshold(gray: Image.Image) -> int:
+    """
+    Otsu's threshold computed from the grayscale histogram.
+    """
+    histogram = gray.histogram()[:256]
+    total = sum(histogram)
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    sum_background, weight_background = 0, 0
+    best_threshold, best_variance = 127, 0.0
+    for i, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += i * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = i, variance
+    return best_threshold
+
+
+def _target_size(image: Image.Image):
+    width, height = image.size
+    scale = min(1.0, OCR_MAX_SIDE / max(width, height))
+    dpi = image.info.get("dpi")
+    if dpi and dpi[0] and dpi[0] > OCR_TARGET_DPI:
+        scale = min(scale, OCR_TARGET_DPI / float(dpi[0]))
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def preprocess_for_ocr(image_bytes: bytes) -> Image.Image:
+    """
+    Decode an image at the resolution OCR needs: JPEGs are decoded in draft mode
+    (reduced-scale DCT, grayscale), large images are downscaled to ~OCR_TARGET_DPI,
+    then the image is converted to grayscale and binarized with Otsu's threshold.
+    """
+    image = Image.open(BytesIO(image_bytes))
+    # The target comes from the original size and DPI; draft() changes the size but not the DPI
+    target = _target_size(image)
+    if image.format == "JPEG":
+        image.draft("L", target)
+    if image.getexif().get(0x0112) in ROTATED_ORIENTATIONS:
+        target = target[::-1]
+    image = ImageOps.exif_transpose(image).convert("L")
+    if image.size != target:  # draft mode only gets within 2x of the target
+        image = image.resize(target, Image.LANCZOS)
+    threshold = _otsu_threshold(image)
+    return image.point(lambda value: 255 if value > threshold else 0, mode="1")
+
+
+def run_ocr(image_bytes: bytes, lang: str = OCR_LANG) -> str:
+    """
+    Preprocess and OCR one image. Runs inside the OCR worker processes.
+    """
+    image = preprocess_for_ocr(image_bytes)
+    return pytesseract.image_to_string(image, lang=lang, config=f"--dpi {OCR_TARGET_DPI}")
+
+
+def perceptual_hash(image_bytes: bytes) -> int:
+    """
+    256-bit difference hash, stable across re-encoding and resizing of the same screenshot.
+    """
+    image = Image.open(BytesIO(image_bytes))
+    image.draft("L", (64, 64))
+    pixels = list(image.convert("L").resize((17, 16), Image.BILINEAR).getdata())
+    bits = 0
+    for row in range(16):
+        for col in range(16):
+            left, right = pixels[row * 17 + col], pixels[row * 17 + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+class OCRCache:
+    """
+    LRU cache of OCR text keyed by exact content hash. With a positive
+    max_distance, a perceptual-hash match also hits, so re-compressed re-shares
+    of a screenshot skip OCR (at the risk of matching a similar-looking image).
+    """
+
+    def __init__(self, max_items: int = OCR_CACHE_SIZE, max_distance: int = OCR_PERCEPTUAL_DISTANCE):
+        self.max_items = max_items
+        self.max_distance = max_distance
+        self._entries = OrderedDict()  # (content hash, lang) -> (perceptual hash, text)
+        self._lock = threading.Lock()
+
+    def get(self, content_hash: str, phash: int, lang: str):
+        with self._lock:
+            key = (content_hash, lang)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][1]
+            if self.max_distance <= 0 or phash is None:
+                return None
+            for (_, entry_lang), (entry_phash, text) in self._entries.items():
+                if entry_lang == lang and bin(entry_phash ^ phash).count("1") <= self.max_distance:
+                    return text
+            return None
+
+    def put(self, content_hash: str, phash: int, lang: str, text: str):
+        with self._lock:
+            self._entries[(content_hash, lang)] = (phash, text)
+            self._entries.move_to_end((content_hash, lang))
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+
+ocr_cache = OCRCache()
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: never fork a parent that already holds model threads
+                _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+async def ocr_image(image_bytes: bytes, lang: str = OCR_LANG) -> str:
+    """
+    OCR an image without blocking the event loop, skipping OCR for images seen before.
+    """
+    content_hash = hashlib.sha256(image_bytes).hexdigest()
+    loop = asyncio.get_running_loop()
+    phash = None
+    if ocr_cache.max_distance > 0:
+        # Decoding for the hash is real work too; keep it off the event loop
+        phash = await loop.run_in_executor(None, perceptual_hash, image_bytes)
+    text = ocr_cache.get(content_hash, phash, lang)
+    cache_result("ocr", text is not None)
+    if text is None:
+        with timer("stage_seconds", stage="ocr"):
+            text = await loop.run_in_executor(_get_pool(), run_ocr, image_bytes, lang)
+        ocr_cache.put(content_hash, phash, lang, text)
+    return text
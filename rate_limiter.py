@@ -0,0 +1,206 @@
+import os
+import time
+import heapq
+import random
+import itertools
+import threading
+from email.utils import parsedate_to_datetime
+from admission import request_priority, request_deadline, INTERACTIVE, STANDARD, BATCH
+from metrics import observe, inc, register_gauges
+
+# Outbound quota per upstream provider, "provider=requests/seconds", set to the
+# plan actually subscribed to, e.g. "world_news=60/60,twitter=450/900" for the
+# free tiers. Unset (the default), calls pass straight through and only the
+# upstream's own 429s and rate-limit headers slow them down.
+UPSTREAM_RATE_LIMITS = os.getenv("UPSTREAM_RATE_LIMITS", "")
+UPSTREAM_BURST = int(os.getenv("UPSTREAM_BURST", "10"))  # bucket size, capped at the quota
+# Longest a call waits for a token, even without a deadline (keeps I/O workers from parking)
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "30"))
+
+# Retries of 429/5xx responses and connection errors
+HTTP_MAX_ATTEMPTS = int(os.getenv("HTTP_MAX_ATTEMPTS", "3"))
+HTTP_RETRY_BASE_DELAY = float(os.getenv("HTTP_RETRY_BASE_DELAY", "0.5"))
+HTTP_RETRY_MAX_DELAY = float(os.getenv("HTTP_RETRY_MAX_DELAY", "10"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+LANES = {INTERACTIVE: "interactive", STANDARD: "standard", BATCH: "batch"}
+
+
+def _parse_quotas(spec: str) -> dict:
+    quotas = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        name, quota = item.split("=", 1)
+        requests, seconds = quota.split("/", 1)
+        quotas[name.strip()] = (int(requests), float(seconds))
+    return quotas
+
+
+class TokenBucket:
+    """
+    Token bucket for one provider with priority lanes: callers wait in
+    (priority, arrival) order, so interactive requests get the next token
+    ahead of standard and batch work. A 429 or an exhausted quota reported by
+    the upstream pauses the bucket until the upstream's reset time.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: int):
+        self.name = name
+        self.rate = rate  # tokens per second
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._waiting = []  # heap of (priority, sequence)
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def _wait_time(self, now: float, ahead: int) -> float:
+        start = max(now, self.paused_until)
+        missing = ahead + 1 - self.tokens
+        return start - now + max(missing, 0) / self.rate
+
+    def acquire(self, priority: int = STANDARD, deadline: float = None) -> bool:
+        """
+        Take a token, waiting in priority order. Returns False without waiting
+        when no token can be had before `deadline` (monotonic time).
+        """
+        entry = (priority, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._waiting[0] == entry and now >= self.paused_until and self.tokens >= 1:
+                        self.tokens -= 1
+                        return True
+                    ahead = sum(1 for other in self._waiting if other < entry)
+                    wait = self._wait_time(now, ahead)
+                    if deadline is not None and now + wait > deadline:
+                        return False
+                    self._cond.wait(min(max(wait, 0.005), 1.0))
+            finally:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    def pause(self, seconds: float):
+        """
+        Hand out no tokens for `seconds`; the upstream's own window is authoritative.
+        """
+        with self._cond:
+            until = time.monotonic() + seconds
+            if until > self.paused_until:
+                self.paused_until = until
+                self.tokens = 0.0
+                self.updated = until
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiting)
+
+
+_buckets = {
+    name: TokenBucket(name, requests / seconds, max(1, min(UPSTREAM_BURST, requests)))
+    for name, (requests, seconds) in _parse_quotas(UPSTREAM_RATE_LIMITS).items()
+}
+
+
+def get_bucket(provider: str):
+    return _buckets.get(provider)
+
+
+def acquire(provider: str) -> bool:
+    """
+    Wait for a token of `provider` in the current request's priority lane.
+    Returns False when the token would only come after the request's deadline.
+    """
+    bucket = _buckets.get(provider)
+    if bucket is None:
+        return True
+    lane = LANES.get(request_priority.get(), "standard")
+    start = time.monotonic()
+    deadline = start + RATE_LIMIT_MAX_WAIT
+    if request_deadline.get() is not None:
+        deadline = min(deadline, request_deadline.get())
+    acquired = bucket.acquire(request_priority.get(), deadline)
+    observe("rate_limit_wait_seconds", time.monotonic() - start, provider=provider, lane=lane)
+    if not acquired:
+        inc("rate_limit_rejections_total", help="Upstream calls dropped for lack of quota before the deadline",
+            provider=provider, lane=lane)
+    return acquired
+
+
+def _header(headers: dict, name: str):
+    for key, value in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def retry_after(headers: dict):
+    """
+    Seconds to wait according to Retry-After (seconds or HTTP date) or an
+    x-rate-limit-reset / x-ratelimit-reset epoch timestamp; None if neither is sent.
+    """
+    value = _header(headers, "retry-after")
+    if value is not None:
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            try:
+                return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                pass
+    reset = _header(headers, "x-rate-limit-reset") or _header(headers, "x-ratelimit-reset")
+    if reset is not None:
+        try:
+            return max(float(reset) - time.time(), 0.0)
+        except ValueError:
+            pass
+    return None
+
+
+def record_response(provider: str, status_code: int, headers: dict):
+    """
+    Sync the provider's bucket with the upstream: pause it after a 429 or when
+    the upstream reports no calls left in its window.
+    """
+    bucket = _buckets.get(provider)
+    if bucket is None:
+        return
+    remaining = _header(headers, "x-rate-limit-remaining") or _header(headers, "x-ratelimit-remaining")
+    if status_code == 429 or (remaining is not None and remaining.isdigit() and int(remaining) == 0):
+        wait = retry_after(headers)
+        bucket.pause(wait if wait is not None else HTTP_RETRY_BASE_DELAY * 2 ** HTTP_MAX_ATTEMPTS)
+
+
+def backoff(attempt: int, headers: dict = None) -> float:
+    """
+    Delay before retry number `attempt` (1-based): Retry-After when the upstream
+    sent one, otherwise exponential backoff with full jitter.
+    """
+    wait = retry_after(headers)
+    if wait is not None:
+        return wait + random.uniform(0, HTTP_RETRY_BASE_DELAY)
+    return random.uniform(0, min(HTTP_RETRY_MAX_DELAY, HTTP_RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+
+def _bucket_gauges():
+    gauges = []
+    for name, bucket in list(_buckets.items()):
+        with bucket._cond:
+            bucket._refill(time.monotonic())
+            tokens = bucket.tokens
+        gauges.append(("rate_limit_tokens", {"provider": name}, round(tokens, 2)))
+        gauges.append(("rate_limit_queue_depth", {"provider": name}, bucket.queue_depth))
+    return gauges
+
+register_gauges(_bucket_gauges)
@@ -0,0 +1,89 @@
+"""
+Request-scoped computation graph.
+
+Each request gets a RequestGraph; functions decorated with @stage are
+memoized in it by their arguments, so a news search, tweet fetch or topic
+verification needed by several consumers in one request (verification,
+credibility, comprehensive analysis) runs once and is shared. Concurrent
+consumers of the same node wait for the first one instead of recomputing.
+Outside a request scope the functions run normally.
+"""
+import threading
+import contextvars
+from concurrent.futures import Future
+from contextlib import contextmanager
+from functools import wraps
+from metrics import inc
+
+current_graph = contextvars.ContextVar("current_graph", default=None)
+
+
+class RequestGraph:
+    """
+    Memoized stage results for one request, keyed by (stage, arguments).
+    """
+
+    def __init__(self):
+        self._nodes = {}
+        self._lock = threading.Lock()
+
+    def compute(self, name: str, key, func, *args, **kwargs):
+        with self._lock:
+            node = self._nodes.get((name, key))
+            owner = node is None
+            if owner:
+                node = self._nodes[(name, key)] = Future()
+        inc("request_graph_nodes_total", help="Request graph stage lookups by result",
+            stage=name, result="computed" if owner else "reused")
+        if not owner:
+            return node.result()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            node.set_exception(e)
+            raise
+        node.set_result(result)
+        return result
+
+    def __len__(self):
+        return len(self._nodes)
+
+
+def _node_key(args, kwargs):
+    return args, tuple(sorted(kwargs.items()))
+
+
+@contextmanager
+def request_scope():
+    """
+    Run the block with a fresh graph, unless one is already active.
+    """
+    if current_graph.get() is not None:
+        yield current_graph.get()
+        return
+    graph = RequestGraph()
+    token = current_graph.set(graph)
+    try:
+        yield graph
+    finally:
+        current_graph.reset(token)
+
+
+def stage(name: str):
+    """
+    Memoize a function in the current request graph by its arguments.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            graph = current_graph.get()
+            if graph is None:
+                return func(*args, **kwargs)
+            key = _node_key(args, kwargs)
+            try:
+                hash(key)
+            except TypeError:
+                return func(*args, **kwargs)
+            return graph.compute(name, key, func, *args, **kwargs)
+        return wrapper
+    return decorator
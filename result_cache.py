@@ -0,0 +1,218 @@
+"""
+Persistent cache of full analysis results.
+
+Results are keyed by a hash of the normalized text plus a fingerprint of the
+model/config setup, and stored in SQLite so they survive restarts and are
+shared by every worker on the host. Model-derived fields (classification,
+summary, interpretation, fake news detection) and the time-sensitive topic
+verification are stored with their own timestamps: a hit with stale
+verification only re-runs verification. The database is kept under a size
+budget by evicting the least recently used results.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from concurrent.futures import Future
+from model_backends import backend_for
+from model_registry import enabled_models
+from model_utils import NEWS_LABELS, LONG_DOCUMENT_MODE, SUMMARY_CHUNK_TOKENS, SUMMARY_MAX_CHUNKS
+from cascade import CASCADE_MODE, CASCADE_CLASSIFY_CONFIDENCE, CASCADE_FAKE_NEWS_CONFIDENCE
+from metrics import register_gauges
+
+# Opt-in: set RESULT_CACHE_PATH to a database file to enable the cache
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "")
+RESULT_CACHE_MAX_MB = float(os.getenv("RESULT_CACHE_MAX_MB", "256"))
+RESULT_CACHE_MODEL_TTL = float(os.getenv("RESULT_CACHE_MODEL_TTL", str(7 * 24 * 3600)))
+RESULT_CACHE_VERIFICATION_TTL = float(os.getenv("RESULT_CACHE_VERIFICATION_TTL", "900"))  # news and tweets move fast
+RESULT_CACHE_VERSION = os.getenv("RESULT_CACHE_VERSION", "2")  # bump to invalidate every cached result
+
+EVICTION_CHECK_EVERY = 64  # writes between size checks
+ACCESS_UPDATE_INTERVAL = 300  # seconds; LRU order only needs access times this coarse
+
+
+def _is_error(section) -> bool:
+    return isinstance(section, dict) and ("error" in section or section.get("status") == "error")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form of a submission: Unicode NFKC with whitespace collapsed.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text or "").split())
+
+
+def config_fingerprint() -> str:
+    """
+    Hash of everything that changes model output: models and backends, labels, long-document and cascade settings.
+    """
+    config = {
+        "version": RESULT_CACHE_VERSION,
+        "models": {name: backend_for(name) for name in sorted(enabled_models())},
+        "labels": NEWS_LABELS,
+        "long_document": [LONG_DOCUMENT_MODE, SUMMARY_CHUNK_TOKENS, SUMMARY_MAX_CHUNKS],
+        "cascade": [CASCADE_MODE, CASCADE_CLASSIFY_CONFIDENCE, CASCADE_FAKE_NEWS_CONFIDENCE],
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class ResultCache:
+    """
+    SQLite-backed cache of model fields and verification per analyzed text.
+    """
+
+    def __init__(self, path: str, max_bytes: int, model_ttl: float, verification_ttl: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.model_ttl = model_ttl
+        self.verification_ttl = verification_ttl
+        self._fingerprint = None
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                model_fields TEXT NOT NULL,
+                model_at REAL NOT NULL,
+                topic TEXT,
+                verification TEXT,
+                verification_at REAL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at)")
+
+    def key(self, text: str, labels=None) -> str:
+        # Fingerprinted lazily so every model is registered by the time it is computed
+        if self._fingerprint is None:
+            self._fingerprint = config_fingerprint()
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        if labels:
+            # Custom classification labels give different model fields
+            digest += ":" + hashlib.sha256(json.dumps(list(labels)).encode()).hexdigest()[:16]
+        return f"{self._fingerprint}:{digest}"
+
+    def get(self, key: str):
+        """
+        (model_fields, topic, verification) for a key, with verification None when
+        stale; None when missing or the model fields have expired.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT model_fields, model_at, topic, verification, verification_at, accessed_at "
+                "FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.model_ttl:
+                return None
+            # Hits only take the write lock when the stored access time is getting old
+            if now - row[5] > ACCESS_UPDATE_INTERVAL:
+                self._db.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+        model_fields, _, topic, verification, verification_at, _ = row
+        if verification is None or now - verification_at > self.verification_ttl:
+            return json.loads(model_fields), topic, None
+        return json.loads(model_fields), topic, json.loads(verification)
+
+    def put(self, key: str, model_fields: dict, topic: str = None, verification: dict = None):
+        """
+        Store a result. Results with a failed section (e.g. a model error) are not stored.
+        """
+        if any(_is_error(section) for section in model_fields.values()):
+            return
+        now = time.time()
+        model_json = json.dumps(model_fields)
+        verification_json = json.dumps(verification) if verification is not None else None
+        size = len(key) + len(model_json) + len(verification_json or "") + len(topic or "")
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model_json, now, topic, verification_json, now if verification is not None else None, now, size))
+            self._writes += 1
+            if self._writes % EVICTION_CHECK_EVERY == 0:
+                self._evict()
+
+    def put_verification(self, key: str, topic: str, verification: dict):
+        now = time.time()
+        verification_json = json.dumps(verification)
+        with self._lock:
+            self._db.execute(
+                "UPDATE results SET topic = ?, verification = ?, verification_at = ?, accessed_at = ?, "
+                "size = length(key) + length(model_fields) + ? WHERE key = ?",
+                (topic, verification_json, now, now, len(verification_json) + len(topic or ""), key))
+
+    def _evict(self):
+        # Drop least recently used results until 90% of the budget
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        target = self.max_bytes * 0.9
+        if total <= target:
+            return
+        victims = []
+        for key, size in self._db.execute("SELECT key, size FROM results ORDER BY accessed_at"):
+            victims.append((key,))
+            total -= size
+            if total <= target:
+                break
+        self._db.executemany("DELETE FROM results WHERE key = ?", victims)
+
+    def single_flight(self, key: str, compute):
+        """
+        Run compute() once for concurrent callers with the same key.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            result = compute()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return {"entries": count, "bytes": total}
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """
+    The shared result cache, or None when RESULT_CACHE_PATH is empty.
+    """
+    global _result_cache
+    if not RESULT_CACHE_PATH:
+        return None
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = ResultCache(RESULT_CACHE_PATH, int(RESULT_CACHE_MAX_MB * 1024 * 1024),
+                                            RESULT_CACHE_MODEL_TTL, RESULT_CACHE_VERIFICATION_TTL)
+    return _result_cache
+
+
+def _collect_gauges():
+    if _result_cache is None:
+        return []
+    stats = _result_cache.stats()
+    return [("result_cache_entries", {}, stats["entries"]), ("result_cache_bytes", {}, stats["bytes"])]
+
+
+register_gauges(_collect_gauges)
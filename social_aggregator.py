@@ -0,0 +1,207 @@
+import os
+import time
+import heapq
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from executors import io_executor, submit_in_context
+from admission import request_priority, request_deadline, BATCH
+from metrics import inc
+
+# Rolling per-topic social signals: the first lookup of a topic searches Twitter,
+# later lookups are answered from memory and refreshed in the background with
+# since_id, so only new tweets are fetched and quota is spent on live topics only.
+SOCIAL_AGGREGATOR = os.getenv("SOCIAL_AGGREGATOR", "1") == "1"
+SOCIAL_POLL_INTERVAL = float(os.getenv("SOCIAL_POLL_INTERVAL", "120"))  # seconds before a topic is refreshed
+SOCIAL_MAX_TOPICS = int(os.getenv("SOCIAL_MAX_TOPICS", "2000"))
+SOCIAL_TOP_TWEETS = int(os.getenv("SOCIAL_TOP_TWEETS", "20"))
+SOCIAL_SCORE_TWEETS = 10  # top_engagement sums the top 10 tweets, like the plain search path
+SOCIAL_FETCH_SIZE = int(os.getenv("SOCIAL_FETCH_SIZE", "20"))
+SOCIAL_WINDOW_HOURS = int(os.getenv("SOCIAL_WINDOW_HOURS", "24"))
+# Background refreshes stop when fewer calls than this are left in the rate-limit window
+SOCIAL_RATE_LIMIT_RESERVE = int(os.getenv("SOCIAL_RATE_LIMIT_RESERVE", "20"))
+RATE_LIMITED_BACKOFF = 60.0  # seconds to wait after a 429 without a reset header
+
+
+def _tweet_id(tweet: dict) -> int:
+    value = str(tweet.get("id", ""))
+    return int(value) if value.isdigit() else 0
+
+
+class TopicSignals:
+    """
+    Compact state for one topic: the newest tweet id seen, a min-heap of the
+    top tweets by engagement, and hourly tweet/engagement counters over the
+    rolling window. Top tweets carry the hour they were fetched in and age out
+    of the window with the counters. Refreshes only fetch tweets newer than
+    since_id, so a tweet's likes and retweets are those seen when it was first
+    fetched and are never re-read.
+    """
+
+    __slots__ = ("topic", "since_id", "top", "buckets", "polled_at", "refreshing")
+
+    def __init__(self, topic: str):
+        self.topic = topic
+        self.since_id = None
+        self.top = []  # (engagement, tweet id, hour, tweet)
+        self.buckets = deque()  # [hour, tweets, engagement]
+        self.polled_at = 0.0
+        self.refreshing = False
+
+    def _expire(self, hour: int):
+        oldest = hour - SOCIAL_WINDOW_HOURS
+        while self.buckets and self.buckets[0][0] <= oldest:
+            self.buckets.popleft()
+        if self.top and min(entry[2] for entry in self.top) <= oldest:
+            self.top = [entry for entry in self.top if entry[2] > oldest]
+            heapq.heapify(self.top)
+
+    def add(self, tweets, newest_id, now: float):
+        hour = int(now // 3600)
+        self._expire(hour)
+        if not self.buckets or self.buckets[-1][0] != hour:
+            self.buckets.append([hour, 0, 0])
+
+        for tweet in tweets:
+            tweet_id = _tweet_id(tweet)
+            if self.since_id and tweet_id <= int(self.since_id):
+                continue
+            engagement = tweet["likes"] + tweet["retweets"]
+            self.buckets[-1][1] += 1
+            self.buckets[-1][2] += engagement
+            entry = (engagement, tweet_id, hour, tweet)
+            if len(self.top) < SOCIAL_TOP_TWEETS:
+                heapq.heappush(self.top, entry)
+            elif engagement > self.top[0][0]:
+                heapq.heapreplace(self.top, entry)
+
+        ids = [_tweet_id(tweet) for tweet in tweets]
+        newest = newest_id or (str(max(ids)) if ids else None)
+        if newest and (not self.since_id or int(newest) > int(self.since_id)):
+            self.since_id = str(newest)
+        self.polled_at = now
+
+    def snapshot(self, now: float) -> dict:
+        self._expire(int(now // 3600))
+        ranked = sorted(self.top, key=lambda entry: entry[:2], reverse=True)
+        return {
+            "status": "success",
+            "tweets": [entry[3] for entry in ranked],
+            "top_engagement": sum(entry[0] for entry in ranked[:SOCIAL_SCORE_TWEETS]),
+            "window_tweets": sum(bucket[1] for bucket in self.buckets),
+            "window_engagement": sum(bucket[2] for bucket in self.buckets),
+            "polled_at": self.polled_at
+        }
+
+
+class SocialAggregator:
+    """
+    LRU map of topic -> TopicSignals, bounded to `max_topics`, fed by `fetch`
+    (topic, max_results, since_id) -> search result.
+    """
+
+    def __init__(self, fetch, poll_interval: float = SOCIAL_POLL_INTERVAL, max_topics: int = SOCIAL_MAX_TOPICS):
+        self.fetch = fetch
+        self.poll_interval = poll_interval
+        self.max_topics = max_topics
+        self._topics = OrderedDict()
+        self._pending = {}  # topic -> Future for first lookups in flight
+        self._lock = threading.Lock()
+        self._remaining = None
+        self._reset_at = 0.0
+
+    @staticmethod
+    def _key(topic: str) -> str:
+        return " ".join(topic.lower().split())
+
+    def _update_rate_limit(self, result: dict):
+        rate_limit = result.get("rate_limit") or {}
+        with self._lock:
+            if rate_limit.get("remaining") is not None:
+                self._remaining = rate_limit["remaining"]
+            if rate_limit.get("reset") is not None:
+                self._reset_at = rate_limit["reset"]
+            if result.get("status_code") == 429:
+                self._remaining = 0
+                if self._reset_at <= time.time():
+                    self._reset_at = time.time() + RATE_LIMITED_BACKOFF
+
+    def _calls_left(self, reserve: int = 0) -> bool:
+        if self._remaining is None or time.time() >= self._reset_at:
+            return True
+        return self._remaining > reserve
+
+    def _poll(self, entry: TopicSignals):
+        try:
+            inc("social_polls_total", help="Twitter searches made by the social aggregator",
+                kind="refresh" if entry.since_id else "cold")
+            result = self.fetch(entry.topic, SOCIAL_FETCH_SIZE, since_id=entry.since_id)
+            self._update_rate_limit(result)
+            if result.get("status") == "success":
+                with self._lock:
+                    entry.add(result["tweets"], result.get("newest_id"), time.time())
+            return result
+        finally:
+            entry.refreshing = False
+
+    def _refresh(self, entry: TopicSignals):
+        # Background work: batch lane, and not bound to the deadline of the request that triggered it
+        request_priority.set(BATCH)
+        request_deadline.set(None)
+        return self._poll(entry)
+
+    def _first_lookup(self, key: str, topic: str) -> dict:
+        with self._lock:
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            if not self._calls_left():
+                result = {"status": "error", "message": "Twitter rate limit reached"}
+            else:
+                entry = TopicSignals(topic)
+                result = self._poll(entry)
+                if result.get("status") == "success":
+                    with self._lock:
+                        self._topics[key] = entry
+                        while len(self._topics) > self.max_topics:
+                            self._topics.popitem(last=False)
+                            inc("social_topics_evicted_total", help="Cold topics evicted from the social aggregator")
+                        result = entry.snapshot(time.time())
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def signals(self, topic: str) -> dict:
+        """
+        Current signals for a topic. Known topics are answered from memory in
+        O(1) (top tweets are at most SOCIAL_TOP_TWEETS long) and refreshed in
+        the background once stale, while rate-limit budget remains.
+        """
+        key = self._key(topic)
+        with self._lock:
+            entry = self._topics.get(key)
+            if entry is not None:
+                self._topics.move_to_end(key)
+                now = time.time()
+                snapshot = entry.snapshot(now)
+                stale = now - entry.polled_at >= self.poll_interval
+                refresh = stale and not entry.refreshing and self._calls_left(SOCIAL_RATE_LIMIT_RESERVE)
+                if refresh:
+                    entry.refreshing = True
+        if entry is None:
+            return self._first_lookup(key, topic)
+        if refresh:
+            submit_in_context(io_executor, self._refresh, entry)
+        return snapshot
+
+    def __len__(self):
+        return len(self._topics)
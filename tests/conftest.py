@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Offline defaults: stub models, no persistent caches, no upstream quotas
+os.environ.setdefault("MODEL_BACKEND", "stub")
+os.environ.setdefault("RESULT_CACHE_PATH", "")
+os.environ.setdefault("STUB_CALL_LATENCY_MS", "50")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,28 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+import analysis_pipeline
+
+
+def _batch_sizes(model):
+    with metrics._lock:
+        series = metrics._histograms.get("model_batch_size", {})
+        for labels, values in series.items():
+            if dict(labels).get("model") == model:
+                return values[-2], values[-1]  # sum, count
+    return 0, 0
+
+
+def test_concurrent_analyses_share_batches(monkeypatch):
+    monkeypatch.setattr(analysis_pipeline, "verify_news_topic", lambda topic, **kwargs: {"status": "error", "message": "offline"})
+    before_sum, before_count = _batch_sizes("summarizer")
+
+    texts = [f"The city council met on day {i} to vote on the budget for schools and roads." for i in range(32)]
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        results = list(pool.map(lambda text: analysis_pipeline.run_analysis(text, topic="budget"), texts))
+    assert len(results) == 32
+
+    total, count = _batch_sizes("summarizer")
+    batches, items = count - before_count, total - before_sum
+    assert items == 32
+    assert items / batches > 1
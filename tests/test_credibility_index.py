@@ -0,0 +1,75 @@
+import os
+import random
+from urllib.parse import urlparse
+
+from credibility_index import (CredibilityIndex, ReloadingCredibilityIndex, build_index, candidate_domains,
+                               read_ratings_csv, source_credibility)
+from source_credibility import SOURCE_CREDIBILITY
+
+
+def _dict_lookup(url):
+    # The plain dict lookup source credibility used before the compiled index
+    domain = urlparse(url).netloc.replace("www.", "").lower()
+    return SOURCE_CREDIBILITY.get(domain, 0.5)
+
+
+def test_matches_the_source_table_lookup():
+    for domain in SOURCE_CREDIBILITY:
+        for url in (f"https://{domain}/story", f"https://www.{domain}/story", f"http://{domain.upper()}/"):
+            assert source_credibility(url) == _dict_lookup(url)
+    for url in ("https://unknown-site.example/a", "https://bbc.co.uk/news", "not a url", ""):
+        assert source_credibility(url) == 0.5
+
+
+def test_large_tables_match_dict_lookups():
+    rng = random.Random(0)
+    ratings = {f"site{i}.{rng.choice(['com', 'org', 'co.uk', 'com.au'])}": round(rng.random(), 4) for i in range(5000)}
+    index = CredibilityIndex.from_ratings(ratings)
+    assert len(index) == len(ratings)
+    for domain, score in ratings.items():
+        assert index.lookup(f"https://{domain}/x") == score
+    assert index.lookup("https://site-missing.com/") is None
+
+
+def test_multi_label_public_suffixes():
+    assert candidate_domains("https://feeds.bbc.co.uk/news") == ["feeds.bbc.co.uk", "bbc.co.uk"]
+    assert candidate_domains("https://www.example.com.au:8080/") == ["example.com.au"]
+    assert candidate_domains("https://a.b.example.com") == ["a.b.example.com", "b.example.com", "example.com"]
+    assert candidate_domains("") == []
+
+    index = CredibilityIndex.from_ratings({"bbc.co.uk": 0.9, "co.uk": 0.1})
+    assert index.lookup("https://feeds.bbc.co.uk/news") == 0.9
+    # A rating on the public suffix itself never applies to unrelated registrants
+    assert index.lookup("https://other.co.uk/") is None
+
+
+def test_subdomains_fall_back_to_the_most_specific_rated_parent():
+    index = CredibilityIndex.from_ratings({"cnn.com": 0.8, "opinion.cnn.com": 0.4})
+    assert index.lookup("https://edition.cnn.com/world") == 0.8
+    assert index.lookup("https://live.opinion.cnn.com/") == 0.4
+    assert index.lookup("https://notcnn.com/") is None
+
+
+def test_index_file_is_reopened_when_rebuilt(tmp_path):
+    path = str(tmp_path / "credibility.crix")
+    build_index({"example.com": 0.3}, path)
+    index = ReloadingCredibilityIndex(path, interval=0)
+    assert index.lookup("https://news.example.com/") == 0.3
+
+    build_index({"example.com": 0.7, "other.org": 0.6}, path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))  # coarse-mtime filesystems
+    assert index.lookup("https://news.example.com/") == 0.7
+    assert index.lookup("https://other.org/") == 0.6
+
+
+def test_missing_file_falls_back_to_the_builtin_table(tmp_path):
+    index = ReloadingCredibilityIndex(str(tmp_path / "missing.crix"), interval=0)
+    assert index.lookup("https://www.reuters.com/") == SOURCE_CREDIBILITY["reuters.com"]
+    assert index.lookup("https://unknown.example/", default=0.4) == 0.4
+
+
+def test_ratings_csv(tmp_path):
+    path = tmp_path / "ratings.csv"
+    path.write_text("domain,score\n# comment,1\nexample.com,0.25\nbad.com,high\n", encoding="utf-8")
+    assert read_ratings_csv(str(path)) == {"example.com": 0.25}
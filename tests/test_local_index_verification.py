@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+import news_verification
+from article_index import ArticleIndex
+
+
+def _article(i, published):
+    return {"title": "Flooding closes the river bridge", "description": "The bridge is closed after floods.",
+            "source": "example", "url": f"https://news.example/{i}", "publishedAt": published}
+
+
+def _index(tmp_path, monkeypatch, articles):
+    embeddings = news_verification.encode_texts([news_verification.article_text(a) for a in articles])
+    index = ArticleIndex(str(tmp_path), dim=embeddings.shape[1])
+    index.add(articles, embeddings.cpu().numpy())
+    monkeypatch.setattr(news_verification, "get_article_index", lambda: index)
+
+
+def test_old_articles_do_not_count(tmp_path, monkeypatch):
+    old = (datetime.utcnow() - timedelta(days=30)).isoformat()
+    _index(tmp_path, monkeypatch, [_article(i, old) for i in range(5)])
+    topic = news_verification.article_text(_article(0, old))
+    assert news_verification._search_local_index(topic, 0.5, days_back=7) == (None, None)
+    articles, _ = news_verification._search_local_index(topic, 0.5, days_back=60)
+    assert len(articles) == 5
+
+
+def test_unknown_dates_do_not_count(tmp_path, monkeypatch):
+    _index(tmp_path, monkeypatch, [_article(i, "Unknown date") for i in range(5)])
+    topic = news_verification.article_text(_article(0, ""))
+    assert news_verification._search_local_index(topic, 0.5) == (None, None)
+
+
+def test_analyzed_article_does_not_corroborate_itself(tmp_path, monkeypatch):
+    recent = (datetime.utcnow() - timedelta(hours=1)).strftime("%Y-%m-%d %H:%M:%S")
+    _index(tmp_path, monkeypatch, [_article(i, recent) for i in range(3)])
+    topic = news_verification.article_text(_article(0, recent))
+    articles, _ = news_verification._search_local_index(topic, 0.5)
+    assert len(articles) == 3
+    # With its own copy excluded only two matches are left, below LOCAL_MIN_MATCHES
+    assert news_verification._search_local_index(topic, 0.5, exclude_urls={"https://news.example/0"}) == (None, None)
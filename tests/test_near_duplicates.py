@@ -0,0 +1,73 @@
+import numpy as np
+
+import near_duplicates
+from near_duplicates import NearDuplicateIndex, collapse_near_duplicates, minhash_signature
+
+STORY = ("Heavy rain flooded the lower town on Tuesday night, forcing the council to close the river bridge "
+         "and open two emergency shelters while crews pumped water out of the main square and cleared debris.")
+OTHER = ("The central bank held interest rates steady on Wednesday, citing slowing inflation and a weaker "
+         "labour market, and signalled that cuts could come later in the year if prices keep easing.")
+
+
+def _article(title, text, source):
+    return {"title": title, "description": text, "source": source, "url": f"https://{source}/story"}
+
+
+def _similarity(a, b):
+    return float(np.mean(minhash_signature(a) == minhash_signature(b)))
+
+
+def test_constants_are_consistent():
+    assert near_duplicates.MINHASH_PERMUTATIONS % near_duplicates.LSH_BANDS == 0
+    assert near_duplicates.SHINGLE_SIZE == 3
+    # The banding's candidate curve must rise (at (1/bands)^(1/rows)) below the duplicate threshold
+    rows = near_duplicates.MINHASH_PERMUTATIONS // near_duplicates.LSH_BANDS
+    assert (1 / near_duplicates.LSH_BANDS) ** (1 / rows) <= near_duplicates.DUPLICATE_THRESHOLD
+
+
+def test_signature_is_deterministic_and_case_insensitive():
+    assert np.array_equal(minhash_signature(STORY), minhash_signature(STORY.upper()))
+    assert _similarity(STORY, STORY) == 1.0
+    assert _similarity(STORY, OTHER) < 0.2
+
+
+def test_syndicated_copies_collapse_to_one_story():
+    syndicated = STORY.replace("Tuesday night", "Tuesday evening") + " Reporting by staff."
+    articles = [
+        _article("Floods close river bridge", STORY, "agency.example"),
+        _article("Floods close river bridge", syndicated, "paper.example"),
+        _article("Floods close river bridge", STORY, "portal.example"),
+        _article("Rates on hold", OTHER, "finance.example"),
+    ]
+    collapsed = collapse_near_duplicates(articles, NearDuplicateIndex())
+    assert [article["source"] for article in collapsed] == ["agency.example", "finance.example"]
+    assert [article["cluster_size"] for article in collapsed] == [3, 1]
+    assert collapsed[0]["canonical_text"] == f"Floods close river bridge. {STORY}"
+
+
+def test_distinct_stories_are_kept_apart():
+    reopened = ("The river bridge reopened on Friday after engineers inspected the supports "
+                "and found no structural damage from the floods.")
+    articles = [
+        _article("Floods close river bridge", STORY, "a.example"),
+        _article("Rates on hold", OTHER, "b.example"),
+        _article("Bridge reopens", reopened, "c.example"),
+    ]
+    collapsed = collapse_near_duplicates(articles, NearDuplicateIndex())
+    assert len(collapsed) == 3
+    assert all(article["cluster_size"] == 1 for article in collapsed)
+
+
+def test_canonical_text_is_shared_across_calls_and_index_is_bounded():
+    index = NearDuplicateIndex(max_items=2)
+    first = collapse_near_duplicates([_article("Floods", STORY, "a.example")], index)
+    again = collapse_near_duplicates([_article("Floods!", STORY, "b.example")], index)
+    assert again[0]["canonical_text"] == first[0]["canonical_text"]
+
+    collapse_near_duplicates([_article("Rates", OTHER, "c.example"),
+                              _article("Other", "Something else entirely happened at the zoo today.", "d.example")],
+                             index)
+    assert len(index) == 2
+    # The flood story was evicted, so it becomes its own canonical copy again
+    evicted = collapse_near_duplicates([_article("Floods!", STORY, "b.example")], index)
+    assert evicted[0]["canonical_text"] == f"Floods!. {STORY}"
@@ -0,0 +1,29 @@
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+from ocr_utils import preprocess_for_ocr
+
+
+def _encode(image, format):
+    buffer = BytesIO()
+    image.save(buffer, format=format, dpi=(600, 600))
+    return buffer.getvalue()
+
+
+def test_jpeg_and_png_are_downscaled_to_the_same_size():
+    image = Image.new("RGB", (4000, 3000), "white")
+    ImageDraw.Draw(image).rectangle((400, 400, 3600, 2600), outline="black", width=40)
+
+    png = preprocess_for_ocr(_encode(image, "PNG"))
+    jpeg = preprocess_for_ocr(_encode(image, "JPEG"))
+    assert png.size == jpeg.size == (2000, 1500)
+
+
+def test_rotated_jpeg_keeps_its_target_size():
+    image = Image.new("RGB", (4000, 3000), "white")
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90 degrees on display
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", dpi=(600, 600), exif=exif)
+    assert preprocess_for_ocr(buffer.getvalue()).size == (1500, 2000)
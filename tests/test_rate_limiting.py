@@ -0,0 +1,197 @@
+import time
+import threading
+from email.utils import formatdate
+
+import pytest
+import requests
+
+import http_client
+import rate_limiter
+from admission import request_deadline, INTERACTIVE, STANDARD, BATCH
+from http_client import HTTPResult
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    bucket = rate_limiter.TokenBucket("test", rate=10.0, capacity=1)
+    monkeypatch.setattr(rate_limiter, "_buckets", {"test": bucket})
+    return bucket
+
+
+def test_waiters_get_tokens_in_priority_order(bucket):
+    bucket.tokens = 0.0
+    order = []
+
+    def take(lane, priority):
+        assert bucket.acquire(priority)
+        order.append(lane)
+
+    threads = []
+    for lane, priority in (("batch", BATCH), ("standard", STANDARD), ("interactive", INTERACTIVE)):
+        threads.append(threading.Thread(target=take, args=(lane, priority)))
+        threads[-1].start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join(5)
+    assert order == ["interactive", "standard", "batch"]
+
+
+def test_acquire_refuses_without_waiting_when_the_deadline_is_too_close(bucket):
+    bucket.tokens = 0.0
+    start = time.monotonic()
+    assert not bucket.acquire(STANDARD, deadline=start + 0.05)  # the next token is 0.1 s away
+    assert time.monotonic() - start < 0.05
+    assert bucket.acquire(STANDARD, deadline=time.monotonic() + 1.0)
+
+
+def test_429_pauses_the_bucket_until_retry_after(bucket):
+    rate_limiter.record_response("test", 429, {"Retry-After": "2"})
+    assert bucket.paused_until == pytest.approx(time.monotonic() + 2, abs=0.1)
+    assert bucket.tokens == 0.0
+    assert not bucket.acquire(STANDARD, deadline=time.monotonic() + 1.0)
+
+
+def test_exhausted_quota_header_pauses_the_bucket(bucket):
+    rate_limiter.record_response("test", 200, {"x-rate-limit-remaining": "5"})
+    assert bucket.paused_until == 0.0
+    rate_limiter.record_response("test", 200, {"x-rate-limit-remaining": "0",
+                                               "x-rate-limit-reset": str(time.time() + 3)})
+    assert bucket.paused_until == pytest.approx(time.monotonic() + 3, abs=0.1)
+
+
+def test_unconfigured_providers_pass_through(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_buckets", {})
+    assert rate_limiter.acquire("world_news")
+    assert rate_limiter._parse_quotas("") == {}
+    assert rate_limiter._parse_quotas("world_news=60/60, twitter=450/900") == {
+        "world_news": (60, 60.0), "twitter": (450, 900.0)}
+
+
+def test_retry_after_formats():
+    assert rate_limiter.retry_after({"Retry-After": "3"}) == 3.0
+    assert rate_limiter.retry_after({"retry-after": formatdate(time.time() + 10, usegmt=True)}) == \
+        pytest.approx(10, abs=1.5)
+    assert rate_limiter.retry_after({"x-rate-limit-reset": str(int(time.time()) + 20)}) == pytest.approx(20, abs=1.5)
+    assert rate_limiter.retry_after({"X-RateLimit-Reset": str(time.time() - 5)}) == 0.0
+    assert rate_limiter.retry_after({"Retry-After": "soon"}) is None
+    assert rate_limiter.retry_after({}) is None
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_buckets", {})
+    monkeypatch.setattr(rate_limiter, "backoff", lambda attempt, headers=None: 0.0)
+    http_client.clear_cache()
+
+
+def test_fetch_gives_up_after_max_attempts(no_backoff, monkeypatch):
+    calls = []
+
+    def fetch_once(endpoint, url, params, headers, timeout):
+        calls.append(timeout)
+        return HTTPResult(503, {"detail": "unavailable"}, {})
+    monkeypatch.setattr(http_client, "_fetch_once", fetch_once)
+    result = http_client._fetch("world_news_search", "http://upstream/search", {}, {})
+    assert result.status_code == 503
+    assert len(calls) == rate_limiter.HTTP_MAX_ATTEMPTS
+
+
+def test_fetch_reraises_connection_errors_after_max_attempts(no_backoff, monkeypatch):
+    calls = []
+
+    def fetch_once(*args):
+        calls.append(args)
+        raise requests.ConnectionError("refused")
+    monkeypatch.setattr(http_client, "_fetch_once", fetch_once)
+    with pytest.raises(requests.ConnectionError):
+        http_client._fetch("world_news_search", "http://upstream/search", {}, {})
+    assert len(calls) == rate_limiter.HTTP_MAX_ATTEMPTS
+
+
+def test_fetch_does_not_call_upstream_after_the_deadline(no_backoff, monkeypatch):
+    monkeypatch.setattr(http_client, "_fetch_once", lambda *args: pytest.fail("called upstream"))
+    request_deadline.set(time.monotonic() - 1)
+    try:
+        result = http_client._fetch("world_news_search", "http://upstream/search", {}, {})
+    finally:
+        request_deadline.set(None)
+    assert result.status_code == 504 and result.data["reason"] == "deadline"
+
+
+def _coalesced(monkeypatch, first_result, budgets=(5.0, 5.0)):
+    """
+    Leader and follower get_json calls for the same request; the leader's
+    fetch returns `first_result` once the follower is waiting on it.
+    """
+    leader_started, follower_waiting = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch(endpoint, url, params, headers):
+        calls.append(threading.current_thread().name)
+        if len(calls) == 1:
+            leader_started.set()
+            follower_waiting.wait(5)
+            return first_result
+        return HTTPResult(200, {"news": []}, {})
+    monkeypatch.setattr(http_client, "_fetch", fetch)
+
+    original_inc = http_client.inc
+
+    def inc(name, *args, **kwargs):
+        if name == "http_coalesced_total":
+            follower_waiting.set()
+        return original_inc(name, *args, **kwargs)
+    monkeypatch.setattr(http_client, "inc", inc)
+
+    results = {}
+
+    def call(name, budget):
+        request_deadline.set(time.monotonic() + budget)
+        results[name] = http_client.get_json("world_news_search", "http://upstream/search", {"text": "floods"})
+
+    leader = threading.Thread(target=call, args=("leader", budgets[0]), name="leader")
+    leader.start()
+    leader_started.wait(5)
+    follower = threading.Thread(target=call, args=("follower", budgets[1]), name="follower")
+    follower.start()
+    leader.join(5)
+    follower.join(5)
+    return results, calls
+
+
+@pytest.mark.parametrize("reason, status", [("deadline", 504), ("rate_limited", 503)])
+def test_follower_retries_once_after_a_local_leader_failure(no_backoff, monkeypatch, reason, status):
+    results, calls = _coalesced(monkeypatch, http_client._local_failure(status, "leader gave up", reason))
+    assert results["leader"].status_code == status
+    assert results["follower"].status_code == 200
+    assert calls == ["leader", "follower"]
+
+
+def test_follower_shares_an_upstream_failure(no_backoff, monkeypatch):
+    results, calls = _coalesced(monkeypatch, HTTPResult(500, {"detail": "upstream broke"}, {}))
+    assert results["leader"].status_code == results["follower"].status_code == 500
+    assert calls == ["leader"]
+
+
+def test_follower_stops_waiting_at_its_own_deadline(no_backoff, monkeypatch):
+    release = threading.Event()
+
+    def fetch(endpoint, url, params, headers):
+        release.wait(5)
+        return HTTPResult(200, {"news": []}, {})
+    monkeypatch.setattr(http_client, "_fetch", fetch)
+
+    leader = threading.Thread(target=http_client.get_json, args=("world_news_search", "http://upstream/search",
+                                                                  {"text": "storms"}))
+    leader.start()
+    time.sleep(0.05)
+    request_deadline.set(time.monotonic() + 0.1)
+    try:
+        start = time.monotonic()
+        result = http_client.get_json("world_news_search", "http://upstream/search", {"text": "storms"})
+    finally:
+        request_deadline.set(None)
+        release.set()
+        leader.join(5)
+    assert result.status_code == 504 and result.data["reason"] == "deadline"
+    assert time.monotonic() - start < 1.0
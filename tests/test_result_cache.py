@@ -0,0 +1,107 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+import analysis_pipeline
+import result_cache
+from result_cache import ResultCache
+
+MODEL_FIELDS = {"classification": {"labels": ["politics"], "scores": [0.9]}, "summary": "Council votes on budget.",
+                "interpretation": "Routine.", "fake_news_detection": {"label": "REAL", "score": 0.8}}
+VERIFICATION = {"status": "success", "relevant_matches": 2}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(result_cache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(str(tmp_path / "results.sqlite"), 1 << 20, model_ttl=1000, verification_ttl=100)
+
+
+def _accessed_at(cache, key):
+    return cache._db.execute("SELECT accessed_at FROM results WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_cache_is_off_unless_a_path_is_set():
+    env = {key: value for key, value in os.environ.items() if key != "RESULT_CACHE_PATH"}
+    output = subprocess.run([sys.executable, "-c", "import result_cache; print(result_cache.get_result_cache())"],
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env=env,
+                            capture_output=True, text=True, check=True).stdout
+    assert output.strip().splitlines()[-1] == "None"
+
+
+def test_failed_results_are_not_stored(cache, clock):
+    key = cache.key("Some text")
+    cache.put(key, {**MODEL_FIELDS, "summary": {"error": "model unavailable"}}, "topic", VERIFICATION)
+    assert cache.get(key) is None
+    cache.put(key, {**MODEL_FIELDS, "fake_news_detection": {"status": "error", "message": "overloaded"}})
+    assert cache.get(key) is None
+    cache.put(key, MODEL_FIELDS, "topic", VERIFICATION)
+    assert cache.get(key) == (MODEL_FIELDS, "topic", VERIFICATION)
+
+
+def test_model_fields_and_verification_expire_separately(cache, clock):
+    key = cache.key("Some text")
+    cache.put(key, MODEL_FIELDS, "topic", VERIFICATION)
+    clock.now += 101
+    assert cache.get(key) == (MODEL_FIELDS, "topic", None)
+    cache.put_verification(key, "topic", VERIFICATION)
+    assert cache.get(key) == (MODEL_FIELDS, "topic", VERIFICATION)
+    clock.now += 900
+    assert cache.get(key) is None
+
+
+def test_keys_normalize_text_and_separate_labels(cache):
+    assert cache.key("Council  votes\non budget") == cache.key("Council votes on budget")
+    assert cache.key("Council votes", ["a", "b"]) != cache.key("Council votes")
+
+
+def test_access_time_is_updated_coarsely(cache, clock):
+    key = cache.key("Some text")
+    cache.put(key, MODEL_FIELDS)
+    stored = _accessed_at(cache, key)
+    clock.now += result_cache.ACCESS_UPDATE_INTERVAL - 1
+    cache.get(key)
+    assert _accessed_at(cache, key) == stored
+    clock.now += 2
+    cache.get(key)
+    assert _accessed_at(cache, key) == clock.now
+
+
+def test_cached_hit_reverifies_when_the_derived_topic_changes(cache, monkeypatch):
+    calls = []
+
+    def verify(topic, **kwargs):
+        calls.append(topic)
+        return {**VERIFICATION, "topic": topic}
+    monkeypatch.setattr(analysis_pipeline, "verify_news_topic", verify)
+
+    text = "The council voted on the budget."
+    key = cache.key(text)
+    cache.put(key, MODEL_FIELDS, "old topic", {**VERIFICATION, "topic": "old topic"})
+
+    model_fields, topic, verification = analysis_pipeline._run_cached(
+        cache, text, None, lambda summary: "old topic", "concurrent", {})
+    assert (model_fields, topic, calls) == (MODEL_FIELDS, "old topic", [])
+    assert verification["topic"] == "old topic"
+
+    model_fields, topic, verification = analysis_pipeline._run_cached(
+        cache, text, None, lambda summary: "new topic", "concurrent", {})
+    assert (model_fields, topic, calls) == (MODEL_FIELDS, "new topic", ["new topic"])
+    assert verification["topic"] == "new topic"
+    assert cache.get(key)[1:] == ("new topic", {**VERIFICATION, "topic": "new topic"})
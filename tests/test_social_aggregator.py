@@ -0,0 +1,151 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import social_aggregator
+from social_aggregator import SocialAggregator, TopicSignals
+
+HOUR = 3600.0
+
+
+def _tweet(tweet_id, likes, retweets=0):
+    return {"id": str(tweet_id), "text": f"tweet {tweet_id}", "likes": likes, "retweets": retweets}
+
+
+class FakeTwitter:
+    """
+    Injected fetch: returns the tweets newer than since_id, with optional rate-limit state.
+    """
+
+    def __init__(self, tweets=(), rate_limit=None, status_code=200):
+        self.tweets = list(tweets)
+        self.rate_limit = rate_limit or {}
+        self.status_code = status_code
+        self.calls = []
+
+    def __call__(self, topic, max_results, since_id=None):
+        self.calls.append((topic, since_id))
+        if self.status_code != 200:
+            return {"status": "error", "status_code": self.status_code, "rate_limit": self.rate_limit}
+        tweets = [t for t in self.tweets if since_id is None or int(t["id"]) > int(since_id)]
+        newest = str(max(int(t["id"]) for t in tweets)) if tweets else None
+        return {"status": "success", "tweets": tweets, "newest_id": newest, "rate_limit": self.rate_limit}
+
+
+def test_since_id_skips_tweets_already_counted():
+    signals = TopicSignals("floods")
+    signals.add([_tweet(1, 5), _tweet(2, 7)], "2", 10 * HOUR)
+    signals.add([_tweet(2, 7), _tweet(3, 1)], "3", 10 * HOUR)
+    snapshot = signals.snapshot(10 * HOUR)
+    assert signals.since_id == "3"
+    assert snapshot["window_tweets"] == 3
+    assert snapshot["window_engagement"] == 13
+    assert [t["id"] for t in snapshot["tweets"]] == ["2", "1", "3"]
+
+
+def test_heap_keeps_the_top_tweets_and_scores_the_top_ten(monkeypatch):
+    monkeypatch.setattr(social_aggregator, "SOCIAL_TOP_TWEETS", 3)
+    monkeypatch.setattr(social_aggregator, "SOCIAL_SCORE_TWEETS", 2)
+    signals = TopicSignals("floods")
+    signals.add([_tweet(1, 5), _tweet(2, 1), _tweet(3, 9)], None, 0)
+    signals.add([_tweet(4, 3, 4), _tweet(5, 0)], None, 0)  # 7 replaces the 1; 0 is not kept
+    snapshot = signals.snapshot(0)
+    assert [t["id"] for t in snapshot["tweets"]] == ["3", "4", "1"]
+    assert snapshot["top_engagement"] == 9 + 7
+    assert snapshot["window_tweets"] == 5
+    assert snapshot["window_engagement"] == 5 + 1 + 9 + 7 + 0
+
+
+def test_counters_and_top_tweets_expire_with_the_window(monkeypatch):
+    monkeypatch.setattr(social_aggregator, "SOCIAL_WINDOW_HOURS", 24)
+    signals = TopicSignals("floods")
+    signals.add([_tweet(1, 50)], None, 0)
+    signals.add([_tweet(2, 3)], None, 20 * HOUR)
+    assert signals.snapshot(20 * HOUR)["top_engagement"] == 53
+
+    snapshot = signals.snapshot(24 * HOUR)  # the hour-0 bucket has left the window
+    assert [t["id"] for t in snapshot["tweets"]] == ["2"]
+    assert (snapshot["top_engagement"], snapshot["window_tweets"], snapshot["window_engagement"]) == (3, 1, 3)
+
+    snapshot = signals.snapshot(44 * HOUR)
+    assert (snapshot["tweets"], snapshot["top_engagement"], snapshot["window_tweets"]) == ([], 0, 0)
+
+
+def test_least_recently_used_topics_are_evicted():
+    fetch = FakeTwitter([_tweet(1, 5)])
+    aggregator = SocialAggregator(fetch, poll_interval=3600, max_topics=2)
+    aggregator.signals("a")
+    aggregator.signals("b")
+    aggregator.signals("A ")  # known topic (normalized key): moves to the end, no fetch
+    aggregator.signals("c")
+    assert len(aggregator) == 2
+    assert [topic for topic, _ in fetch.calls] == ["a", "b", "c"]
+    aggregator.signals("a")  # "b" was evicted, "a" was not
+    aggregator.signals("b")
+    assert [topic for topic, _ in fetch.calls] == ["a", "b", "c", "b"]
+
+
+def test_concurrent_first_lookups_share_one_search():
+    release = threading.Event()
+    fetch = FakeTwitter([_tweet(1, 5)])
+
+    def slow_fetch(*args, **kwargs):
+        release.wait(5)
+        return fetch(*args, **kwargs)
+
+    aggregator = SocialAggregator(slow_fetch, poll_interval=3600)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(aggregator.signals, "floods") for _ in range(8)]
+        time.sleep(0.1)
+        release.set()
+        results = [future.result() for future in futures]
+    assert len(fetch.calls) == 1
+    assert all(result["status"] == "success" and result["tweets"][0]["id"] == "1" for result in results)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_stale_topics_refresh_with_since_id():
+    fetch = FakeTwitter([_tweet(1, 5)])
+    aggregator = SocialAggregator(fetch, poll_interval=0)
+    aggregator.signals("floods")
+    fetch.tweets.append(_tweet(2, 8))
+    aggregator.signals("floods")
+    assert _wait_for(lambda: len(fetch.calls) == 2)
+    assert fetch.calls[1] == ("floods", "1")
+    assert _wait_for(lambda: aggregator.signals("floods")["window_tweets"] == 2)
+
+
+def test_rate_limit_reserve_and_429(monkeypatch):
+    monkeypatch.setattr(social_aggregator, "SOCIAL_RATE_LIMIT_RESERVE", 20)
+    reset = time.time() + 600
+    fetch = FakeTwitter([_tweet(1, 5)], rate_limit={"remaining": 5, "reset": reset})
+    aggregator = SocialAggregator(fetch, poll_interval=0)
+
+    aggregator.signals("floods")
+    # Few calls left: first lookups still search, but background refreshes stop
+    assert aggregator._calls_left() and not aggregator._calls_left(social_aggregator.SOCIAL_RATE_LIMIT_RESERVE)
+    aggregator.signals("floods")
+    time.sleep(0.1)
+    assert len(fetch.calls) == 1
+
+    fetch.status_code, fetch.rate_limit = 429, {}
+    assert aggregator.signals("storms")["status"] == "error"
+    assert not aggregator._calls_left()
+    assert aggregator.signals("fires") == {"status": "error", "message": "Twitter rate limit reached"}
+    assert len(fetch.calls) == 2
+
+
+def test_429_without_reset_backs_off(monkeypatch):
+    fetch = FakeTwitter(status_code=429)
+    aggregator = SocialAggregator(fetch)
+    aggregator.signals("floods")
+    assert not aggregator._calls_left()
+    assert aggregator._reset_at == pytest.approx(time.time() + social_aggregator.RATE_LIMITED_BACKOFF, abs=5)
@@ -0,0 +1,84 @@
+import os
+
+import pytest
+import requests
+
+import url_fetcher
+
+HTML = ("<html><head><title>Bridge closed</title></head><body><article><h1>Bridge closed</h1>"
+        "<p>The river bridge was closed on Tuesday after heavy rain flooded the lower town and the council "
+        "opened two emergency shelters for residents.</p></article></body></html>")
+
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.calls.append(headers or {})
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(url_fetcher, "URL_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(url_fetcher, "domain_limiter", url_fetcher.DomainLimiter(delay=0))
+    return tmp_path
+
+
+def _expire_ttl(monkeypatch):
+    monkeypatch.setattr(url_fetcher, "URL_CACHE_TTL", 0)
+
+
+def test_cache_is_off_without_a_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(url_fetcher, "URL_CACHE_DIR", "")
+    monkeypatch.setattr(url_fetcher, "session", FakeSession(FakeResponse(200, HTML)))
+    article = url_fetcher.fetch_article("https://news.example/bridge")
+    assert article["title"] == "Bridge closed"
+    assert url_fetcher._read_cache(url_fetcher.canonical_url("https://news.example/bridge")) is None
+    assert url_fetcher.evict_cache() == 0
+
+
+def test_stale_copy_is_served_when_revalidation_fails(cache_dir, monkeypatch):
+    session = FakeSession(FakeResponse(200, HTML, {"ETag": '"v1"'}),
+                          requests.ConnectionError("down"),
+                          FakeResponse(503))
+    monkeypatch.setattr(url_fetcher, "session", session)
+    first = url_fetcher.fetch_article("https://news.example/bridge")
+    assert os.listdir(cache_dir)
+
+    _expire_ttl(monkeypatch)
+    assert url_fetcher.fetch_article("https://news.example/bridge") == first
+    assert url_fetcher.fetch_article("https://news.example/bridge") == first
+    assert session.calls[1]["If-None-Match"] == '"v1"'
+
+
+def test_failures_without_a_cached_copy_raise(cache_dir, monkeypatch):
+    monkeypatch.setattr(url_fetcher, "session", FakeSession(requests.ConnectionError("down"), FakeResponse(503)))
+    with pytest.raises(requests.ConnectionError):
+        url_fetcher.fetch_article("https://news.example/missing")
+    with pytest.raises(requests.HTTPError):
+        url_fetcher.fetch_article("https://news.example/missing")
+
+
+def test_not_modified_reuses_the_cached_article(cache_dir, monkeypatch):
+    session = FakeSession(FakeResponse(200, HTML, {"ETag": '"v1"'}), FakeResponse(304))
+    monkeypatch.setattr(url_fetcher, "session", session)
+    first = url_fetcher.fetch_article("https://news.example/bridge?utm_source=feed")
+    _expire_ttl(monkeypatch)
+    assert url_fetcher.fetch_article("https://news.example/bridge") == first
@@ -0,0 +1,77 @@
+import pytest
+
+pytest.importorskip("transformers")
+tokenizers = pytest.importorskip("tokenizers")
+
+import torch
+from transformers import PreTrainedTokenizerFast, BartConfig, BartForSequenceClassification, pipeline
+
+import model_utils
+from zero_shot_engine import ZeroShotEngine
+
+WORDS = ("the council voted on budget for schools and roads storm hits city this example is "
+         "biased factual opinionated fake politics sports").split()
+TEXTS = ["the council voted on budget", "storm hits city and the roads for schools", "politics"]
+
+
+@pytest.fixture(scope="module")
+def nli_pipeline():
+    """
+    A tiny randomly initialized BART NLI pipeline with a BART-style pair layout
+    (<s> A </s></s> B </s>), built offline.
+    """
+    vocab = {token: i for i, token in enumerate(["<s>", "<pad>", "</s>", "<unk>"] + WORDS)}
+    backend = tokenizers.Tokenizer(tokenizers.models.WordLevel(vocab, unk_token="<unk>"))
+    backend.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+    backend.post_processor = tokenizers.processors.TemplateProcessing(
+        single="<s> $A </s>", pair="<s> $A </s> </s> $B </s>", special_tokens=[("<s>", 0), ("</s>", 2)])
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=backend, bos_token="<s>", eos_token="</s>",
+                                        pad_token="<pad>", unk_token="<unk>", model_max_length=64)
+    torch.manual_seed(0)
+    config = BartConfig(vocab_size=len(vocab), d_model=16, encoder_layers=1, decoder_layers=1,
+                        encoder_attention_heads=2, decoder_attention_heads=2, encoder_ffn_dim=32, decoder_ffn_dim=32,
+                        max_position_embeddings=128, init_std=0.5, pad_token_id=1, bos_token_id=0, eos_token_id=2,
+                        decoder_start_token_id=2, id2label={0: "contradiction", 1: "neutral", 2: "entailment"},
+                        label2id={"contradiction": 0, "neutral": 1, "entailment": 2})
+    model = BartForSequenceClassification(config).eval()
+    return pipeline("zero-shot-classification", model=model, tokenizer=tokenizer)
+
+
+def _assert_same(engine_result, pipeline_result):
+    assert engine_result["labels"] == pipeline_result["labels"]
+    assert engine_result["scores"] == pytest.approx(pipeline_result["scores"], abs=1e-5)
+
+
+def test_wrap_keeps_pipelines_without_an_nli_model():
+    from stub_models import StubPipeline
+    stub = StubPipeline("zero-shot-classification")
+    assert ZeroShotEngine.wrap(stub) is stub
+
+
+@pytest.mark.parametrize("multi_label", [False, True])
+def test_engine_matches_the_pipeline(nli_pipeline, multi_label):
+    engine = ZeroShotEngine.wrap(nli_pipeline)
+    assert isinstance(engine, ZeroShotEngine)
+    labels = model_utils.NEWS_LABELS
+    for engine_result, pipeline_result in zip(engine(TEXTS, labels, multi_label=multi_label),
+                                              nli_pipeline(TEXTS, labels, multi_label=multi_label)):
+        _assert_same(engine_result, pipeline_result)
+    _assert_same(engine(TEXTS[0], ["politics"]), nli_pipeline(TEXTS[0], ["politics"]))
+
+
+def test_classify_news_batch_matches_the_pipeline(nli_pipeline, monkeypatch):
+    monkeypatch.setattr(model_utils, "CASCADE_MODE", False)
+    label_sets = [None, ["politics", "sports"], []]
+
+    engine = ZeroShotEngine.wrap(nli_pipeline)
+    monkeypatch.setattr(model_utils, "get_model", lambda name: engine)
+    with_engine = model_utils.classify_news_batch(TEXTS, label_sets)
+    monkeypatch.setattr(model_utils, "get_model", lambda name: nli_pipeline)
+    with_pipeline = model_utils.classify_news_batch(TEXTS, label_sets)
+
+    for engine_result, pipeline_result in zip(with_engine, with_pipeline):
+        _assert_same(engine_result, pipeline_result)
+    assert sorted(with_engine[0]["labels"]) == sorted(model_utils.NEWS_LABELS)
+    assert sorted(with_engine[1]["labels"]) == ["politics", "sports"]
+    # An empty label list falls back to the default labels
+    assert sorted(with_engine[2]["labels"]) == sorted(model_utils.NEWS_LABELS)
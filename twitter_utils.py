@@ -1,12 +1,24 @@
 import os
-import requests
 from dotenv import load_dotenv
+from http_client import get_json, rate_limited
+from metrics import timed, register_gauges
+from request_graph import stage
+from social_aggregator import SocialAggregator, SOCIAL_AGGREGATOR, SOCIAL_TOP_TWEETS
 
 load_dotenv()
 
-def get_social_signals(topic: str, max_results: int = 20):
+TWITTER_API_URL = os.getenv("TWITTER_API_URL", "https://api.twitter.com")
+
+def _header(headers: dict, name: str):
+    for key, value in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+def search_recent_tweets(topic: str, max_results: int = 20, since_id: str = None):
     """
-    Fetch recent tweets as social signals for a given news topic.
+    One recent-search call. With since_id only newer tweets are returned.
+    The result carries "newest_id" and the rate-limit state from the response headers.
     """
     try:
         BEARER_TOKEN = "AAAAAAAAAAAAAAAAAAAAAPg12QEAAAAAHOX6jdmlAfxihE26dPgi1gGWiZI%3DWL5mldDvLh310IuVAqRmP07NlRIhJBAhqbM4KdOHdtyTQrcUcl"
@@ -16,22 +28,32 @@ def get_social_signals(topic: str, max_results: int = 20):
                 "message": "Twitter Bearer Token not found."
             }
         
-        search_url = "https://api.twitter.com/2/tweets/search/recent"
+        search_url = f"{TWITTER_API_URL}/2/tweets/search/recent"
         headers = {"Authorization": f"Bearer {BEARER_TOKEN}"}
         params = {
             "query": topic,
-            "max_results": min(max_results, 100),
+            "max_results": max(min(max_results, 100), 10),
             "tweet.fields": "created_at,public_metrics,text,author_id"
         }
+        if since_id:
+            params["since_id"] = since_id
 
-        response = requests.get(search_url, headers=headers, params=params)
-        data = response.json()
-        
-        if response.status_code == 200 and "data" in data:
+        response = get_json("twitter_search", search_url, params=params, headers=headers)
+        data = response.data
+        remaining = _header(response.headers, "x-rate-limit-remaining")
+        reset = _header(response.headers, "x-rate-limit-reset")
+        rate_limit = {
+            "remaining": int(remaining) if remaining is not None else None,
+            "reset": float(reset) if reset is not None else None
+        }
+
+        # No "data" just means no (new) tweets
+        if response.status_code == 200 and isinstance(data, dict):
             tweets = []
-            for tweet in data["data"]:
+            for tweet in data.get("data", []):
                 public_metrics = tweet.get("public_metrics", {})
                 tweets.append({
+                    "id": tweet.get("id", ""),
                     "text": tweet.get("text", ""),
                     "likes": public_metrics.get("like_count", 0),
                     "retweets": public_metrics.get("retweet_count", 0),
@@ -42,15 +64,34 @@ def get_social_signals(topic: str, max_results: int = 20):
             
             return {
                 "status": "success",
-                "tweets": sorted(tweets, key=lambda x: (x["likes"] + x["retweets"]), reverse=True)
+                "tweets": sorted(tweets, key=lambda x: (x["likes"] + x["retweets"]), reverse=True),
+                "newest_id": data.get("meta", {}).get("newest_id"),
+                "rate_limit": rate_limit
             }
         else:
             return {
                 "status": "error",
-                "message": data.get("detail", "Failed to fetch tweets.")
+                "status_code": response.status_code,
+                "rate_limited": rate_limited(response),
+                "message": data.get("detail", "Failed to fetch tweets.") if isinstance(data, dict) else "Failed to fetch tweets.",
+                "rate_limit": rate_limit
             }
     except Exception as e:
         return {
             "status": "error",
             "message": f"Error fetching social signals: {str(e)}"
         }
+
+social_aggregator = SocialAggregator(search_recent_tweets)
+register_gauges(lambda: [("social_topics", {}, len(social_aggregator))])
+
+@stage("social_signals")
+@timed("stage_seconds", stage="social_signals")
+def get_social_signals(topic: str):
+    """
+    Social signals (up to SOCIAL_TOP_TWEETS top tweets by engagement) for a given news topic.
+    Served from the rolling per-topic aggregator unless SOCIAL_AGGREGATOR=0.
+    """
+    if SOCIAL_AGGREGATOR:
+        return social_aggregator.signals(topic)
+    return search_recent_tweets(topic, SOCIAL_TOP_TWEETS)
@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import requests
+from newspaper import Article
+from http_client import session
+from metrics import timer, inc, cache_result
+
+# Article fetching: per-domain politeness, conditional GET and an on-disk cache of extracted text.
+# Opt-in: set URL_CACHE_DIR to a directory to enable the cache
+URL_CACHE_DIR = os.getenv("URL_CACHE_DIR", "")
+URL_CACHE_TTL = float(os.getenv("URL_CACHE_TTL", "21600"))  # serve without revalidating for 6h
+URL_CACHE_MAX_AGE = float(os.getenv("URL_CACHE_MAX_AGE", str(7 * 86400)))  # entries are deleted after this
+URL_CACHE_MAX_MB = float(os.getenv("URL_CACHE_MAX_MB", "256"))
+URL_CACHE_EVICT_EVERY = 64  # writes between eviction sweeps
+URL_FETCH_TIMEOUT = float(os.getenv("URL_FETCH_TIMEOUT", "15"))
+URL_FETCH_WORKERS = int(os.getenv("URL_FETCH_WORKERS", "8"))
+PER_DOMAIN_CONCURRENCY = int(os.getenv("PER_DOMAIN_CONCURRENCY", "2"))
+POLITENESS_DELAY = float(os.getenv("POLITENESS_DELAY", "0.5"))  # seconds between hits to one domain
+USER_AGENT = os.getenv("URL_FETCH_USER_AGENT", "Mozilla/5.0 (compatible; NewsAnalyzer/1.0)")
+
+TRACKING_PREFIXES = ("utm_",)
+TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref", "ref_src", "cmpid"}
+
+
+def canonical_url(url: str) -> str:
+    """
+    Canonical form of an article URL: lower-case scheme and host, no default
+    port, "www." or fragment, tracking parameters removed and the rest sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "https"
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+class DomainLimiter:
+    """
+    Caps concurrent requests per domain and spaces them out by a politeness delay.
+    """
+
+    def __init__(self, concurrency: int = PER_DOMAIN_CONCURRENCY, delay: float = POLITENESS_DELAY):
+        self.concurrency = concurrency
+        self.delay = delay
+        self._semaphores = {}
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, domain: str):
+        with self._lock:
+            semaphore = self._semaphores.setdefault(domain, threading.BoundedSemaphore(self.concurrency))
+        semaphore.acquire()
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(domain, now))
+            self._next_slot[domain] = slot + self.delay
+        if slot > now:
+            time.sleep(slot - now)
+
+    def release(self, domain: str):
+        self._semaphores[domain].release()
+
+
+domain_limiter = DomainLimiter()
+
+
+def _cache_path(url: str) -> str:
+    return os.path.join(URL_CACHE_DIR, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+
+def _read_cache(url: str):
+    if not URL_CACHE_DIR:
+        return None
+    path = _cache_path(url)
+    try:
+        if time.time() - os.path.getmtime(path) > URL_CACHE_MAX_AGE:
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(url: str, entry: dict):
+    if not URL_CACHE_DIR:
+        return
+    os.makedirs(URL_CACHE_DIR, exist_ok=True)
+    path = _cache_path(url)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, path)
+
+    global _writes
+    with _evict_lock:
+        _writes += 1
+        sweep = _writes % URL_CACHE_EVICT_EVERY == 1
+    if sweep:
+        evict_cache()
+
+
+_writes = 0
+_evict_lock = threading.Lock()
+
+
+def evict_cache(max_age: float = None, max_bytes: float = None):
+    """
+    Delete cached articles older than URL_CACHE_MAX_AGE, then the oldest ones
+    until the cache is under 90% of URL_CACHE_MAX_MB. Returns the number deleted.
+    """
+    max_age = URL_CACHE_MAX_AGE if max_age is None else max_age
+    max_bytes = URL_CACHE_MAX_MB * 1024 * 1024 if max_bytes is None else max_bytes
+    if not URL_CACHE_DIR:
+        return 0
+    entries = []
+    try:
+        with os.scandir(URL_CACHE_DIR) as scan:
+            for entry in scan:
+                if entry.name.endswith(".json"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+    except OSError:
+        return 0
+
+    now = time.time()
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    target = max_bytes * 0.9 if total > max_bytes else total
+    deleted = 0
+    for mtime, size, path in entries:  # oldest first
+        if now - mtime <= max_age and total <= target:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        deleted += 1
+    return deleted
+
+
+def _parse_article(url: str, html: str) -> dict:
+    article = Article(url)
+    article.download(input_html=html)
+    article.parse()
+    return {
+        "title": article.title or "",
+        "text": article.text,
+        "url": url,
+        "publishedAt": article.publish_date.isoformat() if article.publish_date else "Unknown date",
+        "source": ", ".join(article.authors) or "unknown"
+    }
+
+
+def _serve_stale(cached: dict, reason: str) -> dict:
+    inc("article_stale_served_total", help="Cached articles served because revalidation failed", reason=reason)
+    cache_result("article", True)
+    return cached["article"]
+
+
+def fetch_article(url: str) -> dict:
+    """
+    Fetch and extract an article, using the on-disk cache.
+    Fresh cache entries are returned as-is; stale ones are revalidated with a
+    conditional GET (ETag / Last-Modified) and only re-parsed if the page changed.
+    When revalidation fails (network error or 5xx) the stale copy is served.
+    """
+    key = canonical_url(url)
+    cached = _read_cache(key)
+    if cached and time.time() - cached["fetched_at"] < URL_CACHE_TTL:
+        cache_result("article", True)
+        return cached["article"]
+
+    headers = {"User-Agent": USER_AGENT}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    domain = urlsplit(key).hostname or ""
+    domain_limiter.acquire(domain)
+    try:
+        with timer("http_request_seconds", endpoint="article_fetch"):
+            response = session.get(url, headers=headers, timeout=URL_FETCH_TIMEOUT)
+    except requests.RequestException:
+        if cached:
+            return _serve_stale(cached, "connection")
+        raise
+    finally:
+        domain_limiter.release(domain)
+
+    if response.status_code >= 500 and cached:
+        return _serve_stale(cached, str(response.status_code))
+
+    if response.status_code == 304 and cached:
+        cache_result("article", True)
+        cached["fetched_at"] = time.time()
+        _write_cache(key, cached)
+        return cached["article"]
+    response.raise_for_status()
+
+    html = response.text
+    content_hash = hashlib.sha256(html.encode("utf-8")).hexdigest()
+    unchanged = cached is not None and cached.get("content_hash") == content_hash
+    cache_result("article", unchanged)
+    if unchanged:
+        article = cached["article"]
+    else:
+        with timer("stage_seconds", stage="article_parse"):
+            article = _parse_article(url, html)
+
+    _write_cache(key, {
+        "url": key,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "content_hash": content_hash,
+        "fetched_at": time.time(),
+        "article": article
+    })
+    return article
+
+
+def fetch_articles(urls):
+    """
+    Fetch many articles concurrently. Returns one result per URL, in order:
+    the article dict, or {"status": "error", "message": ...}.
+    """
+    def fetch(url):
+        try:
+            return fetch_article(url)
+        except Exception as e:
+            return {"status": "error", "message": f"Error processing URL: {str(e)}"}
+
+    with ThreadPoolExecutor(max_workers=URL_FETCH_WORKERS, thread_name_prefix="url-fetch") as pool:
+        return list(pool.map(fetch, urls))
@@ -1,7 +1,11 @@
-from newspaper import Article
+from url_fetcher import fetch_article
+
+def extract_article_from_url(url):
+    """
+    Download (or load from the article cache) and parse an article, returning
+    its text plus the metadata the article index needs.
+    """
+    return fetch_article(url)
 
 def extract_text_from_url(url):
-    article = Article(url)
-    article.download()
-    article.parse()
-    return article.text
+    return extract_article_from_url(url)["text"]
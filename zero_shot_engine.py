@@ -0,0 +1,139 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Upper bound on premise/hypothesis pairs per forward pass (memory cap for large batches)
+ZERO_SHOT_MAX_PAIRS = int(os.getenv("ZERO_SHOT_MAX_PAIRS", "32"))
+HYPOTHESIS_CACHE_SIZE = 1024
+DEFAULT_HYPOTHESIS_TEMPLATE = "This example is {}."
+
+
+class ZeroShotEngine:
+    """
+    NLI zero-shot classifier with the call signature and output format of the
+    transformers zero-shot pipeline.
+
+    Each text is tokenized and truncated once, hypothesis token ids are cached
+    per label, and the premise/hypothesis pairs of every text in the call are
+    scored in one padded forward pass (split only above ZERO_SHOT_MAX_PAIRS).
+    BART-MNLI is a cross-encoder, so every pair still needs its own pass
+    through the encoder; what is saved is the repeated tokenization, the
+    per-pair pipeline overhead and the extra forward passes.
+    """
+
+    def __init__(self, pipe, max_pairs: int = ZERO_SHOT_MAX_PAIRS):
+        import torch
+        self.torch = torch
+        self.pipe = pipe
+        self.model = pipe.model
+        self.tokenizer = pipe.tokenizer
+        self.max_pairs = max_pairs
+        self.max_length = min(getattr(self.tokenizer, "model_max_length", 1024), 1024)
+        self.entailment_id = self._entailment_id(self.model.config.label2id)
+        self.prefix, self.separator, self.suffix = self._pair_layout()
+        self._hypotheses = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entailment_id(label2id: dict) -> int:
+        for label, index in label2id.items():
+            if label.lower().startswith("entail"):
+                return index
+        return -1
+
+    def _pair_layout(self):
+        """
+        Special tokens around a premise/hypothesis pair, e.g. BART's <s> A </s></s> B </s>.
+        """
+        first = self.tokenizer("x", add_special_tokens=False)["input_ids"]
+        second = self.tokenizer("y", add_special_tokens=False)["input_ids"]
+        pair = list(self.tokenizer("x", "y")["input_ids"])
+        i = next(k for k in range(len(pair)) if pair[k:k + len(first)] == first)
+        j = next(k for k in range(i + len(first), len(pair)) if pair[k:k + len(second)] == second)
+        return pair[:i], pair[i + len(first):j], pair[j + len(second):]
+
+    @classmethod
+    def wrap(cls, pipe):
+        """
+        Engine around a loaded pipeline, or the pipeline itself when it has no
+        NLI model to drive directly (e.g. the stub backend).
+        """
+        config = getattr(getattr(pipe, "model", None), "config", None)
+        if config is None or getattr(pipe, "tokenizer", None) is None or not getattr(config, "label2id", None):
+            return pipe
+        return cls(pipe)
+
+    def _hypothesis_ids(self, label: str, template: str):
+        key = (template, label)
+        with self._lock:
+            ids = self._hypotheses.get(key)
+            if ids is not None:
+                self._hypotheses.move_to_end(key)
+                return ids
+        ids = self.tokenizer(template.format(label), add_special_tokens=False)["input_ids"]
+        with self._lock:
+            self._hypotheses[key] = ids
+            while len(self._hypotheses) > HYPOTHESIS_CACHE_SIZE:
+                self._hypotheses.popitem(last=False)
+        return ids
+
+    def _pairs(self, texts, labels, template):
+        hypotheses = [self._hypothesis_ids(label, template) for label in labels]
+        room = (self.max_length - len(self.prefix) - len(self.separator) - len(self.suffix)
+                - max(len(ids) for ids in hypotheses))
+        sequences = []
+        for text in texts:
+            # Tokenize and truncate the premise once for all labels
+            premise = self.tokenizer(text, add_special_tokens=False, truncation=True, max_length=room)["input_ids"]
+            for hypothesis in hypotheses:
+                sequences.append(self.prefix + premise + self.separator + hypothesis + self.suffix)
+        return sequences
+
+    def _entailment_logits(self, sequences):
+        torch = self.torch
+        pad_id = self.tokenizer.pad_token_id or 0
+        logits = []
+        # Similar lengths together keeps padding low when a call is split
+        order = sorted(range(len(sequences)), key=lambda i: len(sequences[i]))
+        for start in range(0, len(order), self.max_pairs):
+            chunk = [sequences[i] for i in order[start:start + self.max_pairs]]
+            width = max(len(ids) for ids in chunk)
+            input_ids = torch.full((len(chunk), width), pad_id, dtype=torch.long)
+            attention_mask = torch.zeros((len(chunk), width), dtype=torch.long)
+            for row, ids in enumerate(chunk):
+                input_ids[row, :len(ids)] = torch.tensor(ids)
+                attention_mask[row, :len(ids)] = 1
+            with torch.inference_mode():
+                output = self.model(input_ids=input_ids, attention_mask=attention_mask)
+            logits.append(output.logits.float())
+        logits = torch.cat(logits)
+        restored = torch.empty_like(logits)
+        restored[torch.tensor(order)] = logits
+        return restored
+
+    def __call__(self, sequences, candidate_labels, hypothesis_template: str = DEFAULT_HYPOTHESIS_TEMPLATE,
+                 multi_label: bool = False, **kwargs):
+        single = isinstance(sequences, str)
+        texts = [sequences] if single else list(sequences)
+        labels = [candidate_labels] if isinstance(candidate_labels, str) else list(candidate_labels)
+        if not texts:
+            return []
+
+        logits = self._entailment_logits(self._pairs(texts, labels, hypothesis_template))
+        logits = logits.view(len(texts), len(labels), -1)
+        if multi_label or len(labels) == 1:
+            contradiction_id = -1 if self.entailment_id == 0 else 0
+            pair = logits[..., [contradiction_id, self.entailment_id]]
+            scores = pair.softmax(dim=-1)[..., 1]
+        else:
+            scores = logits[..., self.entailment_id].softmax(dim=-1)
+
+        results = []
+        for text, row in zip(texts, scores.tolist()):
+            ranked = sorted(zip(labels, row), key=lambda item: item[1], reverse=True)
+            results.append({
+                "sequence": text,
+                "labels": [label for label, _ in ranked],
+                "scores": [score for _, score in ranked]
+            })
+        return results[0] if single else results